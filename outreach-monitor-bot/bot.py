@@ -1,8 +1,10 @@
 import json
 import os
 import re
+import sys
 import time
 from datetime import datetime, timezone
+from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple
 
 import requests
@@ -15,6 +17,20 @@ except Exception:
     credentials = None
     firestore = None
 
+# Pooled keep-alive session from tools/reddit_common when the repo is checked out;
+# standalone deploys fall back to a plain Session (still reuses connections)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+try:
+    from reddit_common.http_client import create_session
+except Exception:
+    create_session = None
+try:
+    from reddit_common.scheduler import AdaptiveScheduler
+except Exception:
+    AdaptiveScheduler = None
+
+HTTP = create_session() if create_session else requests.Session()
+
 
 SUBREDDITS = [
     # Reptiles
@@ -120,7 +136,7 @@ def reddit_public_new_posts(subreddit: str, limit: int = 25) -> List[dict]:
     url = f"https://www.reddit.com/r/{subreddit}/new.json"
     params = {"limit": str(limit)}
 
-    resp = requests.get(url, headers=headers, params=params, timeout=30)
+    resp = HTTP.get(url, headers=headers, params=params, timeout=30)
     resp.raise_for_status()
     data = resp.json()
     children = data.get("data", {}).get("children", [])
@@ -233,7 +249,7 @@ RESPONSE_TEMPLATES = {
     "empathetic": "i built something for exactly this... free meal plans + shoppable ingredient lists for {species}. trying to make feeding less stressful.\n\nhttps://paws-and-plates.vercel.app\n\nlmk if it helps",
     "time_saving": "if meal prep / schedules are the hard part, i built a free tool that makes meal plans + a shoppable ingredient list for {species}.\n\nhttps://paws-and-plates.vercel.app\n\nhope it saves you time",
     "direct": "quick idea: i made a free meal planner + shoppable ingredient list for {species}. might help answer the "
-    "what/how much" stuff without guesswork.\n\nhttps://paws-and-plates.vercel.app\n\nlmk if you want me to sanity check what you're feeding",
+    "'what/how much' stuff without guesswork.\n\nhttps://paws-and-plates.vercel.app\n\nlmk if you want me to sanity check what you're feeding",
     "general": "i made a free meal plan + ingredient list tool for {species} (helps with portions + safe foods).\n\nhttps://paws-and-plates.vercel.app\n\nhope it helps",
 }
 
@@ -305,7 +321,7 @@ def reddit_get_token() -> str:
     data = {"grant_type": "client_credentials"}
     headers = {"User-Agent": user_agent}
 
-    resp = requests.post("https://www.reddit.com/api/v1/access_token", auth=auth, data=data, headers=headers, timeout=30)
+    resp = HTTP.post("https://www.reddit.com/api/v1/access_token", auth=auth, data=data, headers=headers, timeout=30)
     resp.raise_for_status()
     return resp.json()["access_token"]
 
@@ -317,7 +333,7 @@ def reddit_search_new_posts(token: str, subreddit: str, limit: int = 25) -> List
     url = f"https://oauth.reddit.com/r/{subreddit}/new"
     params = {"limit": str(limit)}
 
-    resp = requests.get(url, headers=headers, params=params, timeout=30)
+    resp = HTTP.get(url, headers=headers, params=params, timeout=30)
     resp.raise_for_status()
     data = resp.json()
     children = data.get("data", {}).get("children", [])
@@ -435,20 +451,35 @@ def main() -> None:
     if auth_mode not in {"oauth", "public"}:
         raise RuntimeError("REDDIT_AUTH_MODE must be 'oauth' or 'public'")
 
+    # Adaptive per-subreddit intervals when tools/reddit_common is available;
+    # otherwise every subreddit is polled each POLL_INTERVAL_SECONDS as before
+    scheduler = None
+    if AdaptiveScheduler:
+        default_budget = len(SUBREDDITS) * 3600 / interval_seconds / 2
+        scheduler = AdaptiveScheduler(
+            poll_budget_per_hour=float(os.environ.get("POLL_BUDGET_PER_HOUR", default_budget)),
+            min_interval=int(os.environ.get("MIN_POLL_INTERVAL_SECONDS", "120")),
+            max_interval=int(os.environ.get("MAX_POLL_INTERVAL_SECONDS", "3600")),
+            initial_interval=interval_seconds,
+        )
+        scheduler.sync(SUBREDDITS)
+
     db = init_firestore()
     seen = load_seen_ids(seen_path)
 
     while True:
+        due = scheduler.due(horizon=30) if scheduler else list(SUBREDDITS)
         try:
-            token = reddit_get_token() if auth_mode == "oauth" else ""
+            token = reddit_get_token() if auth_mode == "oauth" and due else ""
             new_seen = set(seen)
 
-            for sub in SUBREDDITS:
+            for sub in due:
                 posts = (
                     reddit_search_new_posts(token, sub, limit=25)
                     if auth_mode == "oauth"
                     else reddit_public_new_posts(sub, limit=25)
                 )
+                matched = 0
 
                 for post in posts:
                     post_id = str(post.get("id") or "")
@@ -460,10 +491,14 @@ def main() -> None:
 
                     if doc:
                         firestore_upsert_outreach_post(db, doc)
+                        matched += 1
 
                     # keep a small delay to reduce rate limiting / blocks
                     time.sleep(0.15)
 
+                if scheduler:
+                    scheduler.record(sub, [p.get("created_utc") for p in posts], leads=matched)
+
                 # respect ~1 request/sec to Reddit regardless of mode
                 time.sleep(1.0)
 
@@ -473,7 +508,7 @@ def main() -> None:
         except Exception as e:
             print(f"[{now_iso()}] error: {e}")
 
-        time.sleep(interval_seconds)
+        time.sleep(max(1.0, scheduler.seconds_until_due()) if scheduler else interval_seconds)
 
 
 if __name__ == "__main__":
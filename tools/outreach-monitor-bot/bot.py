@@ -1,12 +1,19 @@
 import os
+import sys
 import json
 import time
 import re
 from datetime import datetime
+from pathlib import Path
 from typing import List, Dict, Optional
 import requests
 from dataclasses import dataclass, asdict
 
+# Shared Reddit helpers live in tools/reddit_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from reddit_common.http_client import create_session
+from reddit_common.ratelimit import RateLimiter
+
 """
 Multi-Platform Pet Help Monitor Bot
 Monitors Reddit, Instagram, TikTok, Facebook, Pinterest for pet feeding help posts.
@@ -190,6 +197,8 @@ class RedditMonitor:
     def __init__(self):
         self.token = None
         self.seen_ids = set()
+        self.rate_limiter = RateLimiter(requests_per_minute=60)
+        self.http = create_session(user_agent=REDDIT_USER_AGENT)
     
     def get_token(self) -> bool:
         """Get Reddit OAuth token"""
@@ -202,8 +211,8 @@ class RedditMonitor:
         headers = {'User-Agent': REDDIT_USER_AGENT}
         
         try:
-            response = requests.post('https://www.reddit.com/api/v1/access_token',
-                                   auth=auth, data=data, headers=headers)
+            response = self.http.post('https://www.reddit.com/api/v1/access_token',
+                                      auth=auth, data=data, headers=headers, timeout=10)
             response.raise_for_status()
             self.token = response.json()['access_token']
             return True
@@ -229,7 +238,8 @@ class RedditMonitor:
                 url = f'https://oauth.reddit.com/r/{subreddit}/new'
                 params = {'limit': 25}
                 
-                response = requests.get(url, headers=headers, params=params, timeout=10)
+                response = self.rate_limiter.request(self.http.get, url, headers=headers,
+                                                     params=params, timeout=10)
                 response.raise_for_status()
                 data = response.json()
                 
@@ -271,8 +281,6 @@ class RedditMonitor:
                         
                         self.seen_ids.add(post_id)
                 
-                time.sleep(1)  # Rate limiting
-                
             except Exception as e:
                 print(f"⚠️  Error searching r/{subreddit}: {e}")
         
@@ -285,6 +293,7 @@ class FirestoreClient:
         self.project_id = FIREBASE_PROJECT_ID
         self.api_key = FIREBASE_API_KEY
         self.base_url = f'https://firestore.googleapis.com/v1/projects/{self.project_id}/databases/(default)/documents'
+        self.http = create_session()
     
     def save_post(self, post: Post) -> bool:
         """Save post to Firestore"""
@@ -314,7 +323,7 @@ class FirestoreClient:
             }
             
             url = f'{self.base_url}/outreach_posts?documentId={post.id}&key={self.api_key}'
-            response = requests.patch(url, json=doc, timeout=10)
+            response = self.http.patch(url, json=doc, timeout=10)
             response.raise_for_status()
             return True
             
@@ -5,13 +5,19 @@ Monitors Reddit, Quora, Stack Exchange, and more for pet feeding help posts
 """
 
 import os
+import sys
 import json
 import time
-import requests
 import feedparser
 from datetime import datetime
+from pathlib import Path
 from typing import List, Dict, Any
 
+# Shared Reddit helpers live next door in tools/reddit_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from reddit_common.conditional import ValidatorCache, conditional_get
+from reddit_common.http_client import create_session
+
 # Keywords to monitor
 HELP_KEYWORDS = [
     "how do i feed", "what should i feed", "meal plan for",
@@ -27,6 +33,8 @@ class MultiPlatformPetMonitor:
         self.seen_posts = self.load_seen_posts()
         self.found_posts = []
         self.user_agent = 'PetHelpMonitor-Multi/1.0'
+        self.http = create_session(user_agent=self.user_agent)
+        self.validators = ValidatorCache('http_validators_multi.json')
 
     def load_seen_posts(self) -> Dict[str, set]:
         """Load previously seen post IDs by platform"""
@@ -42,6 +50,7 @@ class MultiPlatformPetMonitor:
         data = {platform: list(posts) for platform, posts in self.seen_posts.items()}
         with open('seen_posts_multi.json', 'w') as f:
             json.dump(data, f, indent=2)
+        self.validators.save()
 
     # REDDIT MONITORING
     def search_reddit_rss(self) -> List[Dict]:
@@ -58,8 +67,12 @@ class MultiPlatformPetMonitor:
             try:
                 url = f'https://www.reddit.com/r/{subreddit}/new/.rss'
                 headers = {'User-Agent': self.user_agent}
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
+                response = conditional_get(self.http.get, url, self.validators,
+                                           headers=headers, timeout=10)
+                if response is None:
+                    # Feed unchanged since the last poll
+                    time.sleep(2)
+                    continue
 
                 feed = feedparser.parse(response.content)
                 for entry in feed.entries:
@@ -84,6 +97,7 @@ class MultiPlatformPetMonitor:
                 time.sleep(2)  # Rate limiting
 
             except Exception as e:
+                self.validators.forget(url)
                 print(f"Reddit RSS error for r/{subreddit}: {e}")
 
         return found
@@ -135,7 +149,7 @@ class MultiPlatformPetMonitor:
                     'Upgrade-Insecure-Requests': '1',
                 }
 
-                response = requests.get(url, params=params, headers=headers, timeout=15)
+                response = self.http.get(url, params=params, headers=headers, timeout=15)
                 response.raise_for_status()
 
                 # Parse the HTML response to extract questions
@@ -228,7 +242,7 @@ class MultiPlatformPetMonitor:
                     'key': os.getenv('STACK_EXCHANGE_KEY', '')  # Optional API key
                 }
 
-                response = requests.get(url, params=params, timeout=10)
+                response = self.http.get(url, params=params, timeout=10)
                 response.raise_for_status()
                 data = response.json()
 
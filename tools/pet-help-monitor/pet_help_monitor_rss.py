@@ -1,11 +1,17 @@
 import os
+import sys
 import json
 import time
 from datetime import datetime
-import requests
+from pathlib import Path
 import feedparser
 from typing import List, Dict
 
+# Shared Reddit helpers live next door in tools/reddit_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from reddit_common.conditional import ValidatorCache, conditional_get
+from reddit_common.http_client import create_session
+
 """
 Pet Help Post Monitor Bot - RSS Version
 Monitors Reddit RSS feeds for help-seeking posts about pet nutrition/feeding.
@@ -63,6 +69,8 @@ class PetHelpMonitorRSS:
         self.seen_posts = self.load_seen_posts()
         self.found_posts = []
         self.user_agent = 'PetHelpMonitor-RSS/1.0'
+        self.http = create_session(user_agent=self.user_agent)
+        self.validators = ValidatorCache('http_validators_rss.json')
 
     def load_seen_posts(self) -> set:
         """Load previously seen post IDs to avoid duplicates"""
@@ -76,6 +84,7 @@ class PetHelpMonitorRSS:
         """Save seen post IDs"""
         with open('seen_posts_rss.json', 'w') as f:
             json.dump(list(self.seen_posts), f)
+        self.validators.save()
 
     def parse_rss_feed(self, subreddit: str) -> List[Dict]:
         """Parse RSS feed for a subreddit"""
@@ -87,8 +96,11 @@ class PetHelpMonitorRSS:
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            # Skip parsing when the feed hasn't changed since the last poll
+            response = conditional_get(self.http.get, url, self.validators,
+                                       headers=headers, timeout=10)
+            if response is None:
+                return []
 
             # Parse RSS feed
             feed = feedparser.parse(response.content)
@@ -126,6 +138,7 @@ class PetHelpMonitorRSS:
             return posts
 
         except Exception as e:
+            self.validators.forget(url)
             print(f"Error fetching RSS for r/{subreddit}: {e}")
             return []
 
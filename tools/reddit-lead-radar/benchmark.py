@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Ingestion benchmark for Reddit Lead Radar
+Runs full run_ingestion_cycle passes against replay.py's synthetic Reddit (no
+network, no credentials) for corpora of increasing size and reports items/sec,
+peak RSS and SQLite write time, so a change can be compared against the
+previous commit on the same machine.
+
+    python benchmark.py                      # 1k, 10k and 100k posts
+    python benchmark.py --sizes 1000 10000 --output bench.json
+    python benchmark.py --sizes 1000 --workers 4 --check-shards
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+HERE = Path(__file__).resolve().parent
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# What --check-shards compares per table: the key plus what scoring decided
+CHECKED_COLUMNS = {
+    'posts': ('id', 'subreddit', 'species', 'final_score'),
+    'comments': ('id', 'post_id', 'species', 'final_score'),
+    'leads': ('id', 'post_id', 'comment_id', 'species', 'intent_matches', 'score'),
+}
+
+# Freshness decays between the two runs, so scores only have to agree this closely
+SCORE_TOLERANCE = 0.01
+
+
+def start_server(posts: int, comments_per_post: int, seed: int) -> subprocess.Popen:
+    """Synthetic Reddit in its own process, so serving doesn't share the radar's CPU time accounting"""
+    server = subprocess.Popen(
+        [sys.executable, str(HERE / 'replay.py'), 'serve', '--synthetic', str(posts),
+         '--comments-per-post', str(comments_per_post), '--seed', str(seed), '--port', '0'],
+        cwd=HERE, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if ' at http' not in line:
+        server.kill()
+        raise RuntimeError(f"replay server failed to start: {line!r}")
+    server.url = line.rsplit(' at ', 1)[1].strip()
+    return server
+
+
+def run_one(base_url: str, cycles: int, include_comments: bool, workers: int = 1) -> Dict[str, Any]:
+    """Run the radar in the current directory (a scratch dir) and measure it"""
+    from reddit_lead_radar import RedditLeadRadar
+    from reddit_common.conditional import ValidatorCache
+
+    quiet = io.StringIO()
+    with contextlib.redirect_stdout(quiet):
+        radar = RedditLeadRadar(backfill=True)
+        radar.use_reddit_at(base_url)
+        # Measure the pipeline, not the politeness settings (shard workers read the config)
+        radar.rate_limiter.default_rate = radar.rate_limiter.rate = 1e6
+        radar.rate_limiter.capacity = 1000
+        radar.subreddits_config['fetch'] = dict(radar.subreddits_config.get('fetch', {}),
+                                                requests_per_minute=6e7, burst=1000)
+        radar.subreddits_config['include_comments'] = include_comments
+        # Keep the real caches and schedule untouched
+        radar.validators = ValidatorCache()
+        radar.scheduler.state_path = None
+        if workers > 1:
+            radar.start_shards(workers)
+
+    results = []
+    try:
+        for cycle in range(cycles):
+            start_flush = radar.store.flush_seconds
+            start_requests = _requests_sent(radar)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(quiet):
+                metrics = radar.run_ingestion_cycle()
+            elapsed = time.perf_counter() - start
+            results.append({
+                'cycle': cycle + 1,
+                'seconds': round(elapsed, 3),
+                'items': metrics['total_processed'],
+                'items_per_second': round(metrics['total_processed'] / elapsed, 1) if elapsed else 0.0,
+                'leads': metrics['leads_found'],
+                'http_requests': _requests_sent(radar) - start_requests,
+                'sqlite_write_seconds': round(radar.store.flush_seconds - start_flush, 3),
+            })
+    finally:
+        with contextlib.redirect_stdout(quiet):
+            radar.close()
+
+    return {
+        'workers': workers,
+        'cycles': results,
+        'peak_rss_mb': round(_peak_rss_bytes(resource.RUSAGE_SELF) / 1e6, 1),
+        # Largest single shard worker, not their sum
+        'worker_peak_rss_mb': round(_peak_rss_bytes(resource.RUSAGE_CHILDREN) / 1e6, 1),
+        'db_mb': round(os.path.getsize('leads.db') / 1e6, 1),
+    }
+
+
+def _requests_sent(radar) -> int:
+    """HTTP requests so far (from the merged http_fetch timings when sharded: the limiters live in the workers)"""
+    if radar.shard_pool is None:
+        return radar.rate_limiter.requests_sent
+    return sum(h.count for key, h in radar.timings.total.get('http_fetch', {}).items()
+               if dict(key).get('endpoint') != 'token')
+
+
+def _peak_rss_bytes(who: int) -> int:
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB
+
+
+def run_child(base_url: str, args, workers: int, workdir: str) -> Dict[str, Any]:
+    """run_one in a separate radar process (clean peak RSS), leaving leads.db in workdir"""
+    command = [sys.executable, str(HERE / 'benchmark.py'), '--run-one', base_url,
+               '--cycles', str(args.cycles), '--workers', str(workers)]
+    if args.no_comments:
+        command.append('--no-comments')
+    child = subprocess.run(command, cwd=workdir, capture_output=True, text=True)
+    if child.returncode != 0:
+        raise RuntimeError(f"benchmark run failed:\n{child.stderr}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def bench_size(posts: int, args) -> Dict[str, Any]:
+    """One corpus size: fresh server, fresh database, separate radar process"""
+    server = start_server(posts, args.comments_per_post, args.seed)
+    try:
+        with tempfile.TemporaryDirectory(prefix='radar-bench-') as workdir:
+            result = run_child(server.url, args, args.workers, workdir)
+    finally:
+        server.terminate()
+        server.wait()
+    result['posts'] = posts
+    return result
+
+
+def _table_rows(db_path: str, table: str) -> Dict[str, Tuple]:
+    columns = CHECKED_COLUMNS[table]
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table}").fetchall()
+    finally:
+        conn.close()
+    return {row[0]: row[1:] for row in rows}
+
+
+def _same_row(a: Tuple, b: Tuple) -> bool:
+    return all(abs(x - y) <= SCORE_TOLERANCE if isinstance(x, float) and isinstance(y, float) else x == y
+               for x, y in zip(a, b))
+
+
+def compare_databases(expected: str, actual: str) -> Dict[str, Dict[str, List[str]]]:
+    """Per table, IDs missing from actual, extra in actual, and stored with different values"""
+    differences = {}
+    for table in CHECKED_COLUMNS:
+        want, got = _table_rows(expected, table), _table_rows(actual, table)
+        differences[table] = {
+            'missing': sorted(set(want) - set(got)),
+            'extra': sorted(set(got) - set(want)),
+            'changed': sorted(item_id for item_id in set(want) & set(got)
+                              if not _same_row(want[item_id], got[item_id])),
+        }
+    return differences
+
+
+def check_shards(posts: int, args) -> bool:
+    """Replay one corpus in one process and with --workers, and check both store the same rows"""
+    server = start_server(posts, args.comments_per_post, args.seed)
+    try:
+        with tempfile.TemporaryDirectory(prefix='radar-single-') as single, \
+                tempfile.TemporaryDirectory(prefix='radar-sharded-') as sharded:
+            runs = {workers: run_child(server.url, args, workers, workdir)
+                    for workers, workdir in ((1, single), (args.workers, sharded))}
+            differences = compare_databases(os.path.join(single, 'leads.db'),
+                                            os.path.join(sharded, 'leads.db'))
+    finally:
+        server.terminate()
+        server.wait()
+
+    for workers, result in runs.items():
+        cycles = result['cycles']
+        print(f"  {workers} worker(s): {sum(c['items'] for c in cycles)} items, "
+              f"{sum(c['leads'] for c in cycles)} leads, {sum(c['http_requests'] for c in cycles)} requests")
+    same = True
+    for table, found in differences.items():
+        counts = {kind: len(ids) for kind, ids in found.items()}
+        if any(counts.values()):
+            same = False
+            examples = ', '.join(ids[0] for ids in found.values() if ids)
+            print(f"  {table}: {counts['missing']} missing, {counts['extra']} extra, "
+                  f"{counts['changed']} changed (e.g. {examples})")
+    print(f"  {'same rows' if same else 'ROWS DIFFER'} with {args.workers} workers")
+    return same
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or 'unknown'
+    except Exception:
+        return 'unknown'
+
+
+def print_table(results: List[Dict[str, Any]]):
+    print(f"{'posts':>8} {'cycle':>5} {'items':>8} {'items/s':>9} {'leads':>6} {'requests':>8} "
+          f"{'seconds':>8} {'sqlite s':>8} {'peak RSS':>9}")
+    for result in results:
+        for cycle in result['cycles']:
+            print(f"{result['posts']:>8} {cycle['cycle']:>5} {cycle['items']:>8} "
+                  f"{cycle['items_per_second']:>9.1f} {cycle['leads']:>6} {cycle['http_requests']:>8} "
+                  f"{cycle['seconds']:>8.2f} {cycle['sqlite_write_seconds']:>8.2f} "
+                  f"{result['peak_rss_mb']:>7.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full ingestion cycles on synthetic corpora")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Corpus sizes in posts (default: 1000 10000 100000)")
+    parser.add_argument('--cycles', type=int, default=2,
+                        help="Cycles per size; the first is a backfill, later ones are incremental (default: 2)")
+    parser.add_argument('--comments-per-post', type=int, default=2)
+    parser.add_argument('--no-comments', action='store_true', help="Skip the per-post comment fetches")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Shard fetching and scoring across this many processes (default: 1)")
+    parser.add_argument('--output', help="Also write the results as JSON to this file")
+    parser.add_argument('--check-shards', action='store_true',
+                        help="Instead of timing, check that --workers stores the same rows as one process")
+    parser.add_argument('--run-one', metavar='URL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, args.cycles, not args.no_comments, args.workers)))
+        return
+
+    if args.check_shards:
+        if args.workers < 2:
+            parser.error("--check-shards needs --workers 2 or more")
+        same = True
+        for posts in args.sizes:
+            print(f"{posts} posts:", flush=True)
+            same = check_shards(posts, args) and same
+        sys.exit(0 if same else 1)
+
+    revision = git_revision()
+    print(f"Benchmarking revision {revision}: sizes {args.sizes}, {args.cycles} cycles each, "
+          f"{args.workers} worker process(es)")
+    results = []
+    for posts in args.sizes:
+        print(f"  {posts} posts...", flush=True)
+        results.append(bench_size(posts, args))
+    print()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'revision': revision, 'generated_at': time.time(), 'results': results}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Comment-tree walker for Reddit Lead Radar
+Expands a thread's `more` stubs with batched /api/morechildren calls (and
+"continue this thread" stubs with a sub-thread fetch), skipping comment IDs the
+caller has already seen. Reddit comment IDs are base36 and increase over time,
+so a thread's high-water ID from the last complete walk also rules out every
+older branch without a lookup.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+MORECHILDREN_URL = 'https://oauth.reddit.com/api/morechildren'
+
+# /api/morechildren accepts at most 100 IDs per call
+MORECHILDREN_BATCH = 100
+
+# Prefix of the entries in a seen set that mark "continue this thread" branches as followed
+CONTINUE_MARKER = '>'
+
+
+def branch_markers(seen: Set[str]) -> Set[str]:
+    """What a seen set still needs once the high-water mark covers every comment ID in it"""
+    return {item for item in seen if item.startswith(CONTINUE_MARKER)}
+
+
+def comment_id_value(comment_id: str) -> int:
+    """Numeric value of a base36 comment ID (0 if it isn't one)"""
+    try:
+        return int(comment_id, 36)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass
+class TreeWalk:
+    """Result of walking one thread"""
+    comments: List[Dict[str, Any]] = field(default_factory=list)  # unseen t1 data dicts
+    requests: int = 0
+    deferred: int = 0  # unseen IDs left unexpanded because the request budget ran out
+    newest_id: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return self.deferred == 0
+
+
+class CommentTreeWalker:
+    """Walks a thread's full comment tree within a per-walk request budget"""
+
+    def __init__(self, get: Callable[..., Any], max_more_requests: int = 20,
+                 listing_limit: int = 500, depth: int = 10,
+                 parse_json: Callable[[Any], Any] = lambda response: response.json()):
+        self.get = get
+        self.parse_json = parse_json
+        self.max_more_requests = max(0, max_more_requests)
+        self.listing_limit = listing_limit
+        self.depth = depth
+
+    def walk(self, post_id: str, subreddit: str, headers: Dict[str, str], seen: Set[str],
+             high_water_id: Optional[str] = None) -> TreeWalk:
+        """Fetch the comments of a thread that aren't in ``seen`` (which is updated in place).
+
+        IDs at or below ``high_water_id`` are treated as seen. ``more`` stubs are only
+        expanded for IDs that are neither.
+        """
+        result = TreeWalk()
+        high_water = comment_id_value(high_water_id) if high_water_id else 0
+        newest = high_water
+        more_ids: List[str] = []
+        continue_parents: List[str] = []
+
+        def is_known(comment_id: str) -> bool:
+            return comment_id in seen or comment_id_value(comment_id) <= high_water
+
+        def collect(things: Iterable[Dict[str, Any]]):
+            nonlocal newest
+            stack = list(things)
+            while stack:
+                thing = stack.pop()
+                kind, data = thing.get('kind'), thing.get('data') or {}
+                if kind == 't1':
+                    comment_id = data.get('id')
+                    if not comment_id:
+                        continue
+                    if not is_known(comment_id):
+                        result.comments.append(data)
+                    seen.add(comment_id)
+                    newest = max(newest, comment_id_value(comment_id))
+                    replies = data.get('replies')
+                    if isinstance(replies, dict):
+                        stack.extend(replies.get('data', {}).get('children', []))
+                elif kind == 'more':
+                    children = data.get('children') or []
+                    if children:
+                        more_ids.extend(c for c in children if not is_known(c))
+                    elif data.get('parent_id', '').startswith('t1_'):
+                        # "Continue this thread": the branch is too deep for the listing.
+                        # Followed once per branch (marked in seen), or again if its parent is new
+                        parent = data['parent_id'][3:]
+                        marker = f'{CONTINUE_MARKER}{parent}'
+                        if parent not in continue_parents and (
+                                marker not in seen or comment_id_value(parent) > high_water):
+                            continue_parents.append(parent)
+
+        url = f"https://oauth.reddit.com/r/{subreddit}/comments/{post_id}"
+        params = {'limit': self.listing_limit, 'depth': self.depth, 'sort': 'new'}
+        response = self.get(url, headers=headers, params=params, timeout=15)
+        response.raise_for_status()
+        result.requests += 1
+        data = self.parse_json(response)
+        if len(data) >= 2:
+            collect(data[1].get('data', {}).get('children', []))
+
+        requests_left = self.max_more_requests
+        while (more_ids or continue_parents) and requests_left > 0:
+            if more_ids:
+                # Dedupe and drop IDs that turned up in an earlier batch
+                batch = [c for c in dict.fromkeys(more_ids) if c not in seen][:MORECHILDREN_BATCH]
+                more_ids = [c for c in more_ids if c not in seen and c not in batch]
+                if not batch:
+                    continue
+                response = self.get(MORECHILDREN_URL, headers=headers, params={
+                    'api_type': 'json',
+                    'link_id': f't3_{post_id}',
+                    'children': ','.join(batch),
+                    'sort': 'new',
+                    'limit_children': 'false'
+                }, timeout=15)
+                response.raise_for_status()
+                collect(self.parse_json(response).get('json', {}).get('data', {}).get('things', []))
+                # Deleted or removed IDs come back as nothing; don't ask for them again
+                seen.update(batch)
+            else:
+                parent = continue_parents.pop()
+                response = self.get(f"{url}/_/{parent}", headers=headers,
+                                    params={'depth': self.depth, 'sort': 'new'}, timeout=15)
+                response.raise_for_status()
+                seen.add(f'{CONTINUE_MARKER}{parent}')
+                data = self.parse_json(response)
+                if len(data) >= 2:
+                    collect(data[1].get('data', {}).get('children', []))
+            result.requests += 1
+            requests_left -= 1
+
+        result.deferred = len({c for c in more_ids if c not in seen}) + len(continue_parents)
+        if newest > high_water:
+            result.newest_id = _to_base36(newest)
+        elif high_water_id:
+            result.newest_id = high_water_id
+        return result
+
+
+def _to_base36(value: int) -> str:
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while value:
+        value, remainder = divmod(value, 36)
+        out = digits[remainder] + out
+    return out or '0'
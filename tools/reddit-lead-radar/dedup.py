@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Dedup index for Reddit Lead Radar
+Answers "have we already processed this post/comment ID?" from a bounded LRU of
+recent IDs, falling back to primary-key lookups in leads.db (including the IDs of
+archived rows). IDs that haven't been flushed to leads.db yet are also kept
+outside the LRU, so evicting them can't let an item be processed twice. Nothing
+is loaded at startup, so startup time and memory don't grow with the database.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Union
+
+from storage import connect
+
+# SQLite caps bound parameters per statement; stay well below it
+LOOKUP_BATCH = 500
+
+
+class DedupIndex:
+    """Thread-safe set-like view of processed IDs (recent ones in memory, the rest in SQLite)"""
+
+    def __init__(self, db_path: Union[str, Path], capacity: int = 50000):
+        self.capacity = max(1, capacity)
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        # Added but not in leads.db yet: never evicted, dropped once their rows are written
+        self._unflushed: Set[str] = set()
+        self._lock = threading.Lock()
+        # Own connection: lookups come from fetch threads while the store writes
+        self._conn = connect(db_path, check_same_thread=False)
+
+        self.hits = 0
+        self.db_lookups = 0
+
+    def _remember(self, item_id: str):
+        """Mark an ID as recently seen (caller holds the lock)"""
+        self._recent[item_id] = None
+        self._recent.move_to_end(item_id)
+        if len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+
+    def _lookup(self, ids: List[str]) -> Set[str]:
+        """IDs already stored in posts or comments, or archived (caller holds the lock)"""
+        found: Set[str] = set()
+        for start in range(0, len(ids), LOOKUP_BATCH):
+            batch = ids[start:start + LOOKUP_BATCH]
+            placeholders = ', '.join('?' * len(batch))
+            rows = self._conn.execute(
+                f'SELECT id FROM posts WHERE id IN ({placeholders}) '
+                f'UNION ALL SELECT id FROM comments WHERE id IN ({placeholders}) '
+                f'UNION ALL SELECT id FROM archived_ids WHERE id IN ({placeholders})',
+                batch + batch + batch
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        self.db_lookups += 1
+        return found
+
+    def seen_among(self, ids: Iterable[str]) -> Set[str]:
+        """Subset of ids already processed, with one database query for the cache misses"""
+        ids = [item_id for item_id in dict.fromkeys(ids) if item_id]
+        with self._lock:
+            seen = {item_id for item_id in ids
+                    if item_id in self._recent or item_id in self._unflushed}
+            self.hits += len(seen)
+            misses = [item_id for item_id in ids if item_id not in seen]
+            if misses:
+                seen |= self._lookup(misses)
+            for item_id in seen:
+                self._remember(item_id)
+        return seen
+
+    def __contains__(self, item_id: str) -> bool:
+        return bool(item_id) and item_id in self.seen_among([item_id])
+
+    def add(self, item_id: str):
+        """Record an ID as processed (it reaches the database with the next flush)"""
+        with self._lock:
+            self._remember(item_id)
+            self._unflushed.add(item_id)
+
+    def flushed(self, ids: Optional[Iterable[str]] = None):
+        """Forget the pending status of IDs now in leads.db (all of them if ids is None)"""
+        with self._lock:
+            if ids is None:
+                self._unflushed.clear()
+            else:
+                self._unflushed.difference_update(ids)
+
+    def comment_ids_for_post(self, post_id: str) -> Set[str]:
+        """IDs of every stored comment on one post (seeds a thread's seen set)"""
+        with self._lock:
+            rows = self._conn.execute('SELECT id FROM comments WHERE post_id = ?',
+                                      (post_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def __len__(self) -> int:
+        """Number of IDs held in memory (not the total processed)"""
+        return len(self._recent)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Entity extraction for Reddit Lead Radar
+Pulls a pet's age, weight, health conditions and diet type out of a post or
+comment. The age and weight patterns are compiled once at import into one
+alternation regex each. Condition and diet keywords are added to the matcher's
+Aho-Corasick automaton, so they are found in the pass that already scans every
+text for intent phrases and species. Results are stored as typed columns.
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from matcher import KeywordAutomaton
+
+# Checked in this order: conditions are listed in it, the first diet found wins
+HEALTH_KEYWORDS = (
+    'diarrhea', 'constipation', 'vomiting', 'arthritis', 'joint pain',
+    'skin issues', 'itching', 'allergies', 'ear infection', 'uti',
+    'kidney disease', 'diabetes', 'thyroid', 'cancer', 'obesity',
+    'underweight', 'picky eater', 'food refusal', 'weight loss', 'weight gain'
+)
+
+DIET_KEYWORDS = (
+    'raw', 'kibble', 'wet food', 'dry food', 'homemade', 'cooked',
+    'grain free', 'limited ingredient', 'prescription diet', 'hypoallergenic'
+)
+
+# Matcher payload kinds for the keywords above
+ENTITY_KEYWORDS = {'condition': HEALTH_KEYWORDS, 'diet': DIET_KEYWORDS}
+
+_HEALTH_ORDER = {keyword: i for i, keyword in enumerate(HEALTH_KEYWORDS)}
+_DIET_ORDER = {keyword: i for i, keyword in enumerate(DIET_KEYWORDS)}
+
+AGE_UNITS = 'year|yr|month|mo|week|wk'
+
+# "3 years old" (any unit) wins over "age 3", which is read as years. The "age N"
+# branch refuses to start where "N <unit> old" follows, so "age 6 months old" keeps
+# its unit. ``\s`` never matches the \x00 that joins texts in a batch.
+AGE_PATTERN = re.compile(
+    rf'(?P<old>\d+)\s*(?P<unit>{AGE_UNITS})s?\s*old'
+    rf'|age\s*(?P<age>\d+)(?!\s*(?:{AGE_UNITS})s?\s*old)'
+)
+
+# Alternation order matters: "lbs" is reported as "lb", "pounds" as "pound"
+WEIGHT_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(lb|lbs|pound|pounds|kg|kgs|kilogram|kilograms|oz|ounces)'
+)
+
+# Typed columns on posts, comments and leads (see storage migration 4)
+ENTITY_COLUMNS = ('age_value', 'age_unit', 'weight', 'weight_unit', 'conditions', 'diet_type')
+
+# Stand-alone keyword scan for texts that didn't go through the matcher
+_KEYWORD_AUTOMATON = KeywordAutomaton(
+    (keyword, (kind, keyword)) for kind, keywords in ENTITY_KEYWORDS.items() for keyword in keywords)
+
+
+@dataclass
+class Entities:
+    """Age, weight, conditions and diet type mentioned in one text"""
+    age_value: Optional[int] = None
+    age_unit: Optional[str] = None
+    weight: Optional[float] = None
+    weight_unit: Optional[str] = None
+    conditions: List[str] = field(default_factory=list)
+    diet_type: Optional[str] = None
+
+    @property
+    def age(self) -> Optional[str]:
+        """Display form, e.g. "3 years" or "1 month" """
+        if self.age_value is None:
+            return None
+        return f"{self.age_value} {self.age_unit}{'s' if self.age_value != 1 else ''}"
+
+    def columns(self) -> Dict[str, Any]:
+        """Values for the ENTITY_COLUMNS of a row"""
+        return {
+            'age_value': self.age_value,
+            'age_unit': self.age_unit,
+            'weight': self.weight,
+            'weight_unit': self.weight_unit,
+            # Keywords never contain commas
+            'conditions': ','.join(self.conditions) or None,
+            'diet_type': self.diet_type,
+        }
+
+    @classmethod
+    def from_columns(cls, row: Mapping[str, Any]) -> "Entities":
+        """Rebuild from a row's ENTITY_COLUMNS"""
+        conditions = row.get('conditions')
+        return cls(
+            age_value=row.get('age_value'),
+            age_unit=row.get('age_unit'),
+            weight=row.get('weight'),
+            weight_unit=row.get('weight_unit'),
+            conditions=conditions.split(',') if conditions else [],
+            diet_type=row.get('diet_type'),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Shape the dashboard and lead_queue.json use"""
+        return {
+            'age': self.age,
+            'weight': self.weight,
+            'weight_unit': self.weight_unit,
+            'conditions': list(self.conditions),
+            'allergies': [],
+            'diet_type': self.diet_type
+        }
+
+
+def _keyword_hits(text_lower: str) -> Tuple[Set[str], Set[str]]:
+    conditions, diets = set(), set()
+    for kind, keyword in _KEYWORD_AUTOMATON.find(text_lower):
+        (conditions if kind == 'condition' else diets).add(keyword)
+    return conditions, diets
+
+
+def _build(age_match: Optional[re.Match], weight_match: Optional[re.Match],
+           conditions: Set[str], diets: Set[str]) -> Entities:
+    entities = Entities(conditions=sorted(conditions, key=_HEALTH_ORDER.__getitem__))
+    if age_match:
+        if age_match.group('old'):
+            entities.age_value, entities.age_unit = int(age_match.group('old')), age_match.group('unit')
+        else:
+            entities.age_value, entities.age_unit = int(age_match.group('age')), 'year'
+    if weight_match:
+        entities.weight, entities.weight_unit = float(weight_match.group(1)), weight_match.group(2)
+    if diets:
+        entities.diet_type = min(diets, key=_DIET_ORDER.__getitem__)
+    return entities
+
+
+def _preferred_age(current: Optional[re.Match], match: re.Match) -> re.Match:
+    """Keep the first "N units old" match, else the first "age N" match"""
+    if current is None or (current.group('old') is None and match.group('old') is not None):
+        return match
+    return current
+
+
+def extract_entities(text_lower: str, conditions: Optional[Set[str]] = None,
+                     diets: Optional[Set[str]] = None) -> Entities:
+    """Entities in one lowercased text.
+
+    ``conditions`` and ``diets`` are the condition and diet keywords the matcher
+    already found (TextHits); without them the text is scanned here.
+    """
+    if conditions is None or diets is None:
+        conditions, diets = _keyword_hits(text_lower)
+
+    age_match = None
+    if any(ch.isdigit() for ch in text_lower):
+        for match in AGE_PATTERN.finditer(text_lower):
+            age_match = _preferred_age(age_match, match)
+            if match.group('old') is not None:
+                break
+        weight_match = WEIGHT_PATTERN.search(text_lower)
+    else:
+        weight_match = None
+    return _build(age_match, weight_match, conditions, diets)
+
+
+def extract_entities_batch(texts_lower: Sequence[str],
+                           keyword_hits: Optional[Sequence[Tuple[Set[str], Set[str]]]] = None
+                           ) -> List[Entities]:
+    """Entities for many lowercased texts, with one regex scan per pattern for the whole batch.
+
+    The texts are joined with \\x00 (which no pattern can match across) and each
+    match is mapped back to its text by offset. ``keyword_hits`` is an optional
+    (conditions, diets) pair per text from the matcher.
+    """
+    if not texts_lower:
+        return []
+    starts = []
+    offset = 0
+    for text in texts_lower:
+        starts.append(offset)
+        offset += len(text) + 1
+    joined = '\x00'.join(texts_lower)
+
+    ages: Dict[int, re.Match] = {}
+    for match in AGE_PATTERN.finditer(joined):
+        index = bisect_right(starts, match.start()) - 1
+        ages[index] = _preferred_age(ages.get(index), match)
+    weights: Dict[int, re.Match] = {}
+    for match in WEIGHT_PATTERN.finditer(joined):
+        weights.setdefault(bisect_right(starts, match.start()) - 1, match)
+
+    results = []
+    for i, text in enumerate(texts_lower):
+        conditions, diets = keyword_hits[i] if keyword_hits is not None else _keyword_hits(text)
+        results.append(_build(ages.get(i), weights.get(i), conditions, diets))
+    return results
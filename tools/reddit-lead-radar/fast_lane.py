@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Emergency fast lane for Reddit Lead Radar
+A background thread polls /new for the configured subreddits every 30-60
+seconds and runs only the keyword matcher over what it finds. A post that
+mentions an emergency keyword or an intent phrase is alerted right away: it is
+appended to alerts.jsonl, pushed to live dashboards and POSTed to an optional
+webhook. The fast lane never writes to leads.db or marks posts as processed,
+so the full cycle still scores, stores and queues every post.
+"""
+
+import calendar
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Union
+
+import feedparser
+import requests
+
+from reddit_common.conditional import conditional_get
+
+DEFAULT_INTERVAL_SECONDS = 45
+
+# Posts already older than this when first seen aren't alerted (e.g. the backlog at startup)
+DEFAULT_MAX_AGE_SECONDS = 900
+
+# Subreddits per /r/a+b+c/new request, which keeps URLs well under Reddit's limit
+MULTIREDDIT_CHUNK = 50
+
+# Post IDs remembered between polls so nothing is alerted twice
+SEEN_CAPACITY = 5000
+
+ALERT_KINDS = ('emergency', 'intent')
+
+# Fraction of the client's rate limit reserved for fast-lane polls (fast_lane.rate_share);
+# ingestion cycles get the rest. A poll is usually one request every 45 seconds.
+DEFAULT_RATE_SHARE = 0.1
+
+# Overrides fast_lane.webhook_url, so the URL can stay out of the config file
+WEBHOOK_ENV = 'RADAR_ALERT_WEBHOOK'
+
+
+def alert_text(alert: Dict[str, Any]) -> str:
+    """One-line summary for chat webhooks"""
+    return f"[{alert['kind'].upper()}] r/{alert['subreddit']}: {alert['title']} {alert['url']}"
+
+
+class AlertSink:
+    """Delivers alerts to alerts.jsonl, live dashboards (SSE) and an optional webhook"""
+
+    def __init__(self, path: Union[str, Path], events=None, webhook_url: Optional[str] = None,
+                 timeout: float = 5.0):
+        self.path = Path(path)
+        self.events = events
+        self.webhook_url = webhook_url
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.sent = 0
+        self.webhook_failures = 0
+
+    def recent_ids(self, since: float) -> Set[str]:
+        """IDs alerted since a timestamp (so a restart doesn't repeat them)"""
+        ids = set()
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        alert = json.loads(line)
+                    except ValueError:
+                        continue
+                    if alert.get('detected_at', 0) >= since:
+                        ids.add(alert['id'])
+        except OSError:
+            pass
+        return ids
+
+    def send(self, alert: Dict[str, Any]):
+        """Record an alert and push it out; a failing webhook doesn't stop the others"""
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert) + '\n')
+        if self.events is not None:
+            self.events.publish('alert', alert)
+        if self.webhook_url:
+            try:
+                response = self.http.post(self.webhook_url, json=dict(alert, text=alert_text(alert)),
+                                          timeout=self.timeout)
+                response.raise_for_status()
+            except Exception as e:
+                self.webhook_failures += 1
+                print(f"Alert webhook failed for {alert['id']}: {e}")
+        self.sent += 1
+
+    def close(self):
+        self.http.close()
+
+
+class FastLane:
+    """Polls /new between full cycles and alerts on emergency and intent keywords"""
+
+    def __init__(self, radar, config: Dict[str, Any]):
+        self.radar = radar
+        self.interval = max(float(config.get('interval_seconds', DEFAULT_INTERVAL_SECONDS)), 10.0)
+        self.max_age = float(config.get('max_age_seconds', DEFAULT_MAX_AGE_SECONDS))
+        self.alert_on = set(config.get('alert_on', ALERT_KINDS))
+        self.limit = min(int(config.get('max_posts', 100)), 100)
+        self.rate_share = min(max(float(config.get('rate_share', DEFAULT_RATE_SHARE)), 0.01), 0.5)
+        # Its own slice of the quota, so polls neither wait behind cycle fetches nor add to them
+        self.rate_limiter = radar.build_rate_limiter(radar.subreddits_config.get('fetch', {}),
+                                                     share=self.rate_share)
+        self.sink = AlertSink(radar.db_path.parent / config.get('alerts_file', 'alerts.jsonl'),
+                              events=radar.events,
+                              webhook_url=os.getenv(WEBHOOK_ENV) or config.get('webhook_url'))
+
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        for post_id in self.sink.recent_ids(time.time() - self.max_age):
+            self._remember(post_id)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+
+    @property
+    def subreddits(self) -> List[str]:
+        """Subreddits the full cycle polls (read-only ones are never engaged with)"""
+        return [policy.name for policy in self.radar.policies if not policy.read_only]
+
+    def start(self):
+        """Poll on a daemon thread until stop()"""
+        self._thread = threading.Thread(target=self._run, name='fast-lane', daemon=True)
+        self._thread.start()
+        webhook = "webhook + " if self.sink.webhook_url else ""
+        print(f"Fast lane: r/new every {self.interval:.0f} seconds with {self.rate_share:.0%} of the "
+              f"rate limit, alerting on {', '.join(sorted(self.alert_on))} to {webhook}{self.sink.path}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.sink.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Fast lane poll failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _remember(self, post_id: str):
+        self._seen[post_id] = None
+        if len(self._seen) > SEEN_CAPACITY:
+            self._seen.popitem(last=False)
+
+    def poll_once(self) -> List[Dict[str, Any]]:
+        """Fetch new posts once and send an alert for each match; returns the alerts"""
+        posts = []
+        with self.radar.timings.time('fast_lane'):
+            names = self.subreddits
+            for i in range(0, len(names), MULTIREDDIT_CHUNK):
+                posts.extend(self.fetch_new(names[i:i + MULTIREDDIT_CHUNK]))
+        alerts = []
+        for post in posts:
+            alert = self.check(post)
+            if alert:
+                self.sink.send(alert)
+                self.radar.timings.observe('alert_latency', alert['latency_seconds'], kind=alert['kind'])
+                print(f"ALERT {alert_text(alert)}")
+                alerts.append(alert)
+        self.polls += 1
+        return alerts
+
+    def fetch_new(self, names: Sequence[str]) -> List[Dict[str, Any]]:
+        """Newest posts across some subreddits, via the API or the RSS feed without credentials"""
+        radar = self.radar
+        multireddit = '+'.join(names)
+        get = partial(radar._reddit_get, limiter=self.rate_limiter)
+        headers = {'User-Agent': 'RedditLeadRadar/1.0'}
+        # Checked directly: get_reddit_access_token() would complain every poll without them
+        if radar.reddit_client_id and radar.reddit_client_secret:
+            access_token = radar.get_reddit_access_token()
+            if access_token:
+                url = f'https://oauth.reddit.com/r/{multireddit}/new'
+                headers['Authorization'] = f'bearer {access_token}'
+                response = conditional_get(get, url, radar.validators, headers=headers,
+                                           params={'limit': self.limit}, timeout=10)
+                if response is None:
+                    return []
+                children = radar._parse_json(response).get('data', {}).get('children', [])
+                return [{
+                    'id': post['id'],
+                    'subreddit': post.get('subreddit') or names[0],
+                    'author': post.get('author', ''),
+                    'title': post.get('title', ''),
+                    'body': post.get('selftext', ''),
+                    'url': f"https://reddit.com{post.get('permalink', '')}",
+                    'created_utc': post.get('created_utc', 0)
+                } for post in (child['data'] for child in children)]
+
+        url = f'https://www.reddit.com/r/{multireddit}/new/.rss'
+        response = conditional_get(get, url, radar.validators, headers=headers, timeout=10)
+        if response is None:
+            return []
+        with radar.timings.time('parse', format='rss', endpoint='rss'):
+            feed = feedparser.parse(response.content)
+        posts = []
+        for entry in feed.entries:
+            post_id = radar.extract_post_id(entry)
+            if not post_id:
+                continue
+            # Multireddit feeds tag each entry with its subreddit
+            tags = getattr(entry, 'tags', None) or [{}]
+            published = getattr(entry, 'published_parsed', None)
+            posts.append({
+                'id': post_id,
+                'subreddit': tags[0].get('term') or names[0],
+                'author': getattr(entry, 'author', ''),
+                'title': getattr(entry, 'title', ''),
+                'body': getattr(entry, 'summary', ''),
+                'url': getattr(entry, 'link', ''),
+                'created_utc': calendar.timegm(published) if published else time.time()
+            })
+        return posts
+
+    def check(self, post: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Alert for a post not seen before that matches an emergency keyword or intent phrase"""
+        if post['id'] in self._seen:
+            return None
+        self._remember(post['id'])
+        now = time.time()
+        if now - post['created_utc'] > self.max_age:
+            return None
+
+        radar = self.radar
+        analysis = radar.analyze(f"{post['title']} {post['body']}")
+        if radar.is_blacklisted(analysis, post['author']):
+            return None
+        hits = analysis.hits
+        if hits.is_emergency and 'emergency' in self.alert_on:
+            kind = 'emergency'
+        elif hits.intent_ids and 'intent' in self.alert_on:
+            kind = 'intent'
+        else:
+            return None
+
+        phrases = radar.matcher.intent_phrases
+        return {
+            'id': post['id'],
+            'kind': kind,
+            'subreddit': post['subreddit'],
+            'author': post['author'],
+            'title': post['title'],
+            'url': post['url'],
+            'species': hits.first_species(),
+            'emergency_keywords': sorted(hits.emergency_keywords),
+            'intent_matches': sorted(phrases[i] for i in hits.intent_ids if i < len(phrases)),
+            'created_utc': post['created_utc'],
+            'detected_at': now,
+            'latency_seconds': round(now - post['created_utc'], 1)
+        }
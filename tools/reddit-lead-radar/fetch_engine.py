@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Concurrent fetch engine for Reddit Lead Radar
+Keeps a bounded number of HTTP requests in flight under one global rate limiter.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Any, Optional
+
+from reddit_common.ratelimit import RateLimiter
+
+
+class FetchEngine:
+    """Bounded thread pool that runs fetch functions concurrently"""
+
+    def __init__(self, max_in_flight: int = 8, rate_limiter: Optional[RateLimiter] = None):
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                            thread_name_prefix='radar-fetch')
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedule a fetch function; its result is collected by the caller"""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, cancel_pending: bool = False):
+        """Stop the worker threads, optionally dropping queued fetches"""
+        self._executor.shutdown(wait=not cancel_pending, cancel_futures=cancel_pending)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Precompiled phrase matching for Reddit Lead Radar
+One Aho-Corasick pass over the text finds every intent phrase, blacklist term,
+emergency keyword, species keyword and condition/diet keyword at once, so
+scoring cost stays flat as the phrase lists grow.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Species detection keywords, checked in this order (first species with a hit wins)
+SPECIES_KEYWORDS = {
+    'reptiles': ['reptile', 'lizard', 'gecko', 'snake', 'dragon', 'beardie', 'turtle', 'tortoise'],
+    'birds': ['bird', 'parrot', 'budgie', 'cockatiel', 'conure', 'chicken', 'duck', 'goose'],
+    'pocket_pets': ['rabbit', 'bunny', 'guinea pig', 'hamster', 'rat', 'ferret', 'hedgehog', 'gerbil'],
+    'dogs': ['dog', 'puppy', 'canine'],
+    'cats': ['cat', 'kitten', 'feline']
+}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lowercase keywords.
+
+    Matching is substring-based (same semantics as ``keyword in text``) and finds
+    overlapping keywords in a single left-to-right pass.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+        self._delta: List[Dict[str, int]] = []
+        self.size = 0
+
+        for keyword, payload in entries:
+            if keyword:
+                self._insert(keyword, payload)
+        self._build_failure_links()
+        self._build_transitions()
+
+    def _insert(self, keyword: str, payload: Any):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(payload)
+        self.size += 1
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Inherit matches that end at the failure state
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def _build_transitions(self):
+        """Resolve failure links into direct transitions so scanning never backtracks.
+
+        Only transitions that differ from the root's are stored; scanning falls back
+        to the root table, which keeps the tables small for large keyword lists.
+        """
+        root = self._goto[0]
+        delta: List[Dict[str, int]] = [{} for _ in self._goto]
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            queue.extend(self._goto[state].values())
+            transitions = dict(delta[self._fail[state]])
+            transitions.update(self._goto[state])
+            delta[state] = {char: target for char, target in transitions.items()
+                            if root.get(char, 0) != target}
+        delta[0] = root
+        self._delta = delta
+
+    def iter_matches(self, text: str) -> Iterator[Any]:
+        """Yield the payload of every keyword occurrence in text"""
+        delta, out = self._delta, self._out
+        root_get = delta[0].get
+        state = 0
+        for char in text:
+            state = delta[state].get(char) or root_get(char, 0)
+            if out[state]:
+                yield from out[state]
+
+    def find(self, text: str) -> Set[Any]:
+        """Payloads of every keyword present in text"""
+        delta, out = self._delta, self._out
+        root_get = delta[0].get
+        found: Set[Any] = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char) or root_get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+@dataclass
+class TextHits:
+    """Everything the matcher found in one pass over a lowercased text"""
+    intent_ids: Set[int] = field(default_factory=set)
+    blacklist_terms: Set[str] = field(default_factory=set)
+    emergency_keywords: Set[str] = field(default_factory=set)
+    species: Set[str] = field(default_factory=set)
+    conditions: Set[str] = field(default_factory=set)
+    diets: Set[str] = field(default_factory=set)
+
+    @property
+    def is_blacklisted(self) -> bool:
+        return bool(self.blacklist_terms)
+
+    @property
+    def is_emergency(self) -> bool:
+        return bool(self.emergency_keywords)
+
+    def first_species(self) -> Optional[str]:
+        """First species in SPECIES_KEYWORDS order that was mentioned"""
+        for species in SPECIES_KEYWORDS:
+            if species in self.species:
+                return species
+        return None
+
+
+class CompiledMatcher:
+    """Intent, blacklist, emergency, species and entity matching compiled from the radar configs"""
+
+    def __init__(self, intent_phrases: List[str], blacklist: Dict[str, List[str]],
+                 emergency_keywords: List[str],
+                 species_keywords: Optional[Dict[str, List[str]]] = None,
+                 entity_keywords: Optional[Dict[str, Iterable[str]]] = None):
+        self.intent_phrases = list(intent_phrases)
+        self.intent_phrases_lower = [phrase.lower() for phrase in self.intent_phrases]
+        species_keywords = species_keywords if species_keywords is not None else SPECIES_KEYWORDS
+
+        entries: List[Tuple[str, Tuple[str, Any]]] = []
+        for phrase_id, phrase in enumerate(self.intent_phrases_lower):
+            entries.append((phrase, ('intent', phrase_id)))
+        for term in blacklist.get("banned_words", []) + blacklist.get("banned_substrings", []):
+            entries.append((term.lower(), ('blacklist', term)))
+        for keyword in emergency_keywords:
+            entries.append((keyword.lower(), ('emergency', keyword)))
+        for species, keywords in species_keywords.items():
+            for keyword in keywords:
+                entries.append((keyword.lower(), ('species', species)))
+        # {'condition': [...], 'diet': [...]} from entities.py
+        for kind, keywords in (entity_keywords or {}).items():
+            for keyword in keywords:
+                entries.append((keyword.lower(), (kind, keyword)))
+
+        self.text_automaton = KeywordAutomaton(entries)
+        self.author_automaton = KeywordAutomaton(
+            (user.lower(), user) for user in blacklist.get("banned_users", []))
+
+        # Word -> intent phrases containing it, for overlap-based fuzzy matching
+        self.phrase_words = [set(phrase.split()) for phrase in self.intent_phrases_lower]
+        self.phrase_min_overlap = [max(1, len(words) * 0.6) for words in self.phrase_words]
+        self.word_index: Dict[str, List[int]] = {}
+        for phrase_id, words in enumerate(self.phrase_words):
+            for word in words:
+                self.word_index.setdefault(word, []).append(phrase_id)
+
+    def scan(self, text_lower: str) -> TextHits:
+        """Find every configured keyword in a lowercased text in one pass"""
+        hits = TextHits()
+        for kind, value in self.text_automaton.find(text_lower):
+            if kind == 'intent':
+                hits.intent_ids.add(value)
+            elif kind == 'blacklist':
+                hits.blacklist_terms.add(value)
+            elif kind == 'emergency':
+                hits.emergency_keywords.add(value)
+            elif kind == 'species':
+                hits.species.add(value)
+            elif kind == 'condition':
+                hits.conditions.add(value)
+            else:
+                hits.diets.add(value)
+        return hits
+
+    def is_banned_author(self, author_lower: str) -> bool:
+        """True if a banned user name appears in the author name"""
+        for _ in self.author_automaton.iter_matches(author_lower):
+            return True
+        return False
+
+    def fuzzy_intent_ids(self, token_set: Set[str], exclude: Set[int] = frozenset()) -> Set[int]:
+        """Intent phrases sharing at least 60% of their words with the text"""
+        overlaps: Dict[int, int] = {}
+        for token in token_set:
+            for phrase_id in self.word_index.get(token, ()):
+                overlaps[phrase_id] = overlaps.get(phrase_id, 0) + 1
+        return {
+            phrase_id for phrase_id, overlap in overlaps.items()
+            if phrase_id not in exclude and overlap >= self.phrase_min_overlap[phrase_id]
+        }
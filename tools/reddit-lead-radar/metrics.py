@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Stage timings for Reddit Lead Radar
+Latency histograms per ingestion stage (HTTP fetch per endpoint, JSON/RSS parsing,
+each scorer, SQLite writes, queue generation, per-subreddit fetches and rate-limit
+waits), kept both for the current cycle and since startup. Exported as a
+Prometheus textfile and as a JSON sidecar next to lead_queue.json.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from publisher import atomic_write_json
+
+# Upper bounds in seconds, from sub-millisecond scoring to slow Reddit responses
+# and minutes-long post-to-alert latencies
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+           120.0, 300.0)
+
+PROMETHEUS_PREFIX = 'reddit_lead_radar'
+
+# Help text per timed stage (also the Prometheus metric families)
+STAGES = {
+    'http_fetch': 'Reddit HTTP request latency per endpoint, excluding rate-limit waits',
+    'parse': 'Response parsing time per format',
+    'score': 'Scoring time per scorer and batch',
+    'sqlite_write': 'Time per leads.db flush transaction',
+    'queue_generation': 'Time to build and publish lead_queue.json',
+    'source_fetch': 'Wall time of one fetch task per pipeline stage and source',
+    'rate_limit_wait': 'Time fetch threads waited for the rate limiter, per source',
+    'fast_lane': 'Wall time of one fast-lane /new poll',
+    'alert_latency': 'Time from a post being created to its fast-lane alert, per alert kind',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "Histogram"):
+        """Add another histogram's observations to this one"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class StageTimings:
+    """Thread-safe registry of stage histograms for the current cycle and since startup"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cycle: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.total: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.started_at = time.time()
+
+    def observe(self, stage: str, seconds: float, /, **labels: str):
+        key = tuple(sorted((name, str(value)) for name, value in labels.items()))
+        with self._lock:
+            for histograms in (self.cycle, self.total):
+                histogram = histograms.setdefault(stage, {}).get(key)
+                if histogram is None:
+                    histogram = histograms[stage][key] = Histogram()
+                histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str, /, **labels: str) -> Iterator[None]:
+        """Time the enclosed block into a stage histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def merge(self, cycle: Dict[str, Dict[LabelKey, Histogram]]):
+        """Fold another process's cycle histograms (its ``cycle``) into this cycle and the totals"""
+        with self._lock:
+            for histograms in (self.cycle, self.total):
+                for stage, by_labels in cycle.items():
+                    for key, other in by_labels.items():
+                        histogram = histograms.setdefault(stage, {}).get(key)
+                        if histogram is None:
+                            histogram = histograms[stage][key] = Histogram()
+                        histogram.merge(other)
+
+    def reset_cycle(self):
+        with self._lock:
+            self.cycle = {}
+
+    def stage_totals(self) -> List[Tuple[str, Histogram]]:
+        """This cycle's stages, each merged across labels, slowest first"""
+        merged = []
+        with self._lock:
+            for stage, histograms in self.cycle.items():
+                combined = Histogram()
+                for histogram in histograms.values():
+                    combined.merge(histogram)
+                merged.append((stage, combined))
+        return sorted(merged, key=lambda item: item[1].sum, reverse=True)
+
+    def slowest(self, stage: str, limit: int = 3) -> List[Tuple[Dict[str, str], Histogram]]:
+        """This cycle's label sets with the most total time in one stage"""
+        with self._lock:
+            items = [(dict(key), histogram) for key, histogram in self.cycle.get(stage, {}).items()]
+        return sorted(items, key=lambda item: item[1].sum, reverse=True)[:limit]
+
+    def to_json(self, cycle: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """This cycle's stage summaries, for the JSON sidecar"""
+        with self._lock:
+            stages = {
+                stage: [dict(labels=dict(key), **histogram.summary())
+                        for key, histogram in sorted(histograms.items(), key=lambda i: -i[1].sum)]
+                for stage, histograms in self.cycle.items()
+            }
+        return {'generated_at': time.time(), 'cycle': cycle or {}, 'stages': stages}
+
+    def to_prometheus(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """Since-startup histograms (plus gauges: name -> (help, value)) in text exposition format"""
+        lines = []
+        with self._lock:
+            for stage, histograms in sorted(self.total.items()):
+                family = f'{PROMETHEUS_PREFIX}_{stage}_seconds'
+                lines.append(f'# HELP {family} {STAGES.get(stage, stage)}')
+                lines.append(f'# TYPE {family} histogram')
+                for key, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{family}_bucket{_labels(key, le=le)} {cumulative}')
+                    lines.append(f'{family}_sum{_labels(key)} {histogram.sum:.6f}')
+                    lines.append(f'{family}_count{_labels(key)} {histogram.count}')
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            family = f'{PROMETHEUS_PREFIX}_{name}'
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} gauge')
+            lines.append(f'{family} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, prometheus_path: Optional[Union[str, Path]], json_path: Optional[Union[str, Path]],
+               cycle: Dict[str, Any], gauges: Dict[str, Tuple[str, float]]):
+        """Write both exports atomically (the textfile collector may read at any time)"""
+        if prometheus_path:
+            path = Path(prometheus_path)
+            tmp_path = path.with_name(f'.{path.name}.tmp')
+            with open(tmp_path, 'w') as f:
+                f.write(self.to_prometheus(gauges))
+            os.replace(tmp_path, path)
+        if json_path:
+            atomic_write_json(json_path, self.to_json(cycle))
+
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def endpoint_name(url: str) -> str:
+    """Coarse endpoint label for a Reddit URL (keeps label cardinality low)"""
+    if url.endswith('.rss'):
+        return 'rss'
+    if '/api/morechildren' in url:
+        return 'morechildren'
+    if '/comments/' in url:
+        return 'comments'
+    if '/search' in url:
+        return 'subreddit_search' if '/r/' in url else 'sitewide_search'
+    if 'access_token' in url:
+        return 'token'
+    return 'other'
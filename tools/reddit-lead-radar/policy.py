@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Per-subreddit policy table for Reddit Lead Radar
+subreddits.json is compiled once into immutable SubredditPolicy records keyed by
+lowercase subreddit name, so scoring and queue generation do a dict lookup
+instead of scanning the config list for every item.
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# Score multipliers by tag, applied in this order
+TAG_MULTIPLIERS = (
+    ("allowed_link", 1.2),  # Boost for link-allowed subreddits
+    ("no_promo", 0.8),      # Penalty for no-promo subreddits
+)
+
+
+@dataclass(frozen=True)
+class SubredditPolicy:
+    """Pre-resolved scoring and engagement settings for one subreddit"""
+    name: str
+    tags: Tuple[str, ...]
+    multipliers: Tuple[float, ...]  # Applied to the final score in TAG_MULTIPLIERS order
+    engagement_mode: str
+    min_score_threshold: float
+    read_only: bool
+
+    @property
+    def is_no_promo(self) -> bool:
+        return self.engagement_mode == "no_promo"
+
+
+def compile_policy(name: str, tags, min_score_threshold: float) -> SubredditPolicy:
+    """Resolve one subreddit's tags into a policy"""
+    tags = tuple(tags or ())
+    return SubredditPolicy(
+        name=name,
+        tags=tags,
+        multipliers=tuple(multiplier for tag, multiplier in TAG_MULTIPLIERS if tag in tags),
+        engagement_mode="no_promo" if "no_promo" in tags else "link_ok",
+        min_score_threshold=min_score_threshold,
+        read_only="read_only" in tags
+    )
+
+
+class PolicyTable:
+    """Immutable lowercase-name -> SubredditPolicy mapping with a default for unknown subreddits"""
+
+    def __init__(self, subreddits_config: Dict[str, Any], scoring_config: Dict[str, Any]):
+        default_threshold = scoring_config.get("min_score_threshold", 0.6)
+        policies = {}
+        for subreddit_config in subreddits_config.get("subreddits", []):
+            name = subreddit_config["name"]
+            policies[name.lower()] = compile_policy(
+                name,
+                subreddit_config.get("tags", []),
+                subreddit_config.get("min_score_threshold", default_threshold)
+            )
+        self._policies: Mapping[str, SubredditPolicy] = MappingProxyType(policies)
+        self.default = compile_policy("", (), default_threshold)
+
+    def get(self, subreddit: Optional[str]) -> SubredditPolicy:
+        """Policy for a subreddit (case-insensitive); the default policy if it isn't configured"""
+        if not subreddit:
+            return self.default
+        return self._policies.get(subreddit.lower(), self.default)
+
+    def __iter__(self):
+        return iter(self._policies.values())
+
+    def __len__(self) -> int:
+        return len(self._policies)
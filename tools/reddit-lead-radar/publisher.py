@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Lead queue publisher for Reddit Lead Radar
+Writes lead_queue.json atomically (temp file, fsync, rename), so the dashboard
+never reads a half-written snapshot, and appends sequence-numbered add / update /
+review / remove events to lead_changes.jsonl so it can fetch only what changed
+since the last sequence number it saw.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+# Compact separators: the queue is re-downloaded by every open dashboard
+COMPACT = (',', ':')
+
+
+def _fsync_dir(path: Path):
+    """Persist a rename by syncing the containing directory (no-op where unsupported)"""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: Union[str, Path], data: Any):
+    """Write JSON to a temp file, fsync it and rename it over path"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=COMPACT)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent.resolve())
+
+
+def lead_fingerprint(lead: Dict[str, Any]) -> str:
+    """Stable hash of a lead's published fields, used to detect updates"""
+    payload = json.dumps(lead, sort_keys=True, separators=COMPACT)
+    return hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+
+
+class LeadQueuePublisher:
+    """Publishes lead queue snapshots plus an append-only change feed"""
+
+    def __init__(self, snapshot_path: Union[str, Path] = 'lead_queue.json',
+                 feed_path: Union[str, Path] = 'lead_changes.jsonl',
+                 max_feed_events: int = 2000, keep_feed_events: int = 500):
+        self.snapshot_path = Path(snapshot_path)
+        self.feed_path = Path(feed_path)
+        self.max_feed_events = max_feed_events
+        self.keep_feed_events = min(keep_feed_events, max_feed_events)
+
+        self.seq = 0
+        self._published: Dict[str, str] = {}  # lead id -> fingerprint
+        self._feed_events = 0
+        self._restore()
+
+    def _restore(self):
+        """Pick up the last published state so a restart doesn't re-announce every lead"""
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            self.seq = int(snapshot.get('seq', 0))
+            self._published = {lead['id']: lead_fingerprint(lead)
+                               for lead in snapshot.get('leads', []) if 'id' in lead}
+        except Exception:
+            pass
+
+        if self.feed_path.exists():
+            with open(self.feed_path, 'r') as f:
+                lines = [line for line in f if line.endswith('\n')]
+            self._feed_events = len(lines)
+            if lines:
+                try:
+                    self.seq = max(self.seq, int(json.loads(lines[-1])['seq']))
+                except (ValueError, KeyError):
+                    pass
+
+    def diff(self, leads: List[Dict[str, Any]],
+             reviewed_lookup: Callable[[List[str]], Set[str]]) -> List[Dict[str, Any]]:
+        """Events turning the published queue into this one (seq numbers not yet assigned)"""
+        events = []
+        current = set()
+        for lead in leads:
+            lead_id = lead['id']
+            current.add(lead_id)
+            fingerprint = lead_fingerprint(lead)
+            previous = self._published.get(lead_id)
+            if previous is None:
+                events.append({'type': 'add', 'id': lead_id, 'lead': lead})
+            elif previous != fingerprint:
+                events.append({'type': 'update', 'id': lead_id, 'lead': lead})
+
+        gone = [lead_id for lead_id in self._published if lead_id not in current]
+        if gone:
+            reviewed = reviewed_lookup(gone)
+            for lead_id in gone:
+                events.append({'type': 'review' if lead_id in reviewed else 'remove', 'id': lead_id})
+        return events
+
+    def _append_events(self, events: Iterable[Dict[str, Any]]):
+        """Append events to the feed and make them durable before the snapshot points past them"""
+        lines = ''.join(json.dumps(event, separators=COMPACT) + '\n' for event in events)
+        with open(self.feed_path, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact_feed(self):
+        """Keep only the newest events; clients that fall behind reload the snapshot"""
+        with open(self.feed_path, 'r') as f:
+            lines = [line for line in f if line.endswith('\n')]
+        kept = lines[-self.keep_feed_events:] if self.keep_feed_events else []
+        tmp_path = self.feed_path.with_name(f".{self.feed_path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.writelines(kept)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.feed_path)
+        _fsync_dir(self.feed_path.parent.resolve())
+        self._feed_events = len(kept)
+
+    def publish(self, leads: List[Dict[str, Any]], stats: Dict[str, Any],
+                reviewed_lookup: Callable[[List[str]], Set[str]]) -> int:
+        """Publish a new queue: change events first, then the snapshot. Returns the event count."""
+        now = time.time()
+        events = self.diff(leads, reviewed_lookup)
+        events.append({'type': 'stats', 'stats': stats})
+        for event in events:
+            self.seq += 1
+            event['seq'] = self.seq
+            event['ts'] = now
+
+        self._append_events(events)
+        self._feed_events += len(events)
+        if self._feed_events > self.max_feed_events:
+            self._compact_feed()
+
+        atomic_write_json(self.snapshot_path, {
+            'seq': self.seq,
+            'feed_offset': self.feed_path.stat().st_size,
+            'leads': leads,
+            'generated_at': now,
+            'stats': stats
+        })
+        self._published = {lead['id']: lead_fingerprint(lead) for lead in leads}
+        return len(events) - 1
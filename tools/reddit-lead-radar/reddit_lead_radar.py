@@ -5,28 +5,102 @@ A sophisticated system for monitoring Reddit for pet feeding help opportunities.
 """
 
 import os
+import sys
+import argparse
 import json
-import sqlite3
 import time
 import hashlib
-import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Collection, List, Dict, Any, Optional, Set, Union
 import requests
 import feedparser
 from pathlib import Path
 import base64
+import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+try:
+    import numpy as np
+except ImportError:  # batch scoring falls back to per-item math
+    np = None
+
+# Shared Reddit helpers live next door in tools/reddit_common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from reddit_common.conditional import ValidatorCache, conditional_get
+from reddit_common.http_client import create_session
+from reddit_common.ratelimit import RateLimiter
+from reddit_common.scheduler import AdaptiveScheduler
+from storage import LeadStore, LEAD_COLUMNS, connect, explain_queries
+from fetch_engine import FetchEngine
+from comment_tree import CommentTreeWalker, branch_markers
+from publisher import LeadQueuePublisher
+from search import SEARCH_TARGETS, days_ago, search
+from server import MAX_REVIEW_IDS, EventBroker, LeadServer
+from rescore import rescore_database
+from retention import RetentionEngine, RetentionPolicy
+from sharding import ShardPool
+from fast_lane import FastLane
+from replay import FixtureServer, RecordedFixtures, record_to, redirect_to
+from dedup import DedupIndex
+from policy import PolicyTable, SubredditPolicy
+from matcher import CompiledMatcher
+from entities import ENTITY_KEYWORDS, Entities, extract_entities, extract_entities_batch
+from metrics import StageTimings, endpoint_name
+from text_analysis import AnalyzedText, TextInput, analyze_text
+from semantic import create_engine
+
+# Cursor source used for sitewide searches (subreddit searches use the subreddit name)
+SITEWIDE_CURSOR_SOURCE = "sitewide"
+
+# Cursor source prefix for per-thread comment high-water marks ("thread:<post_id>")
+THREAD_CURSOR_PREFIX = "thread:"
+
+# Configs compiled into the keyword matcher; edits are picked up between cycles
+MATCHER_CONFIGS = ("intent_phrases.json", "blacklist.json", "seed_questions.json")
+
+# Seed-question indexes (TF-IDF vectorizer, embeddings) are cached here, next to the script
+SEMANTIC_CACHE_DIR = "cache"
+
+# ETag / Last-Modified / body hash per polled RSS URL, kept across runs
+VALIDATOR_CACHE_FILE = "http_validators.json"
+
+# Scheduler sources besides the subreddits (polled every polling_interval_seconds)
+SITEWIDE_SOURCE = "@sitewide"
+MEGATHREAD_SOURCE = "@megathreads"
+SCHEDULER_STATE_FILE = "poll_schedule.json"
+
+# Search queries for pet feeding topics, run in every monitored subreddit
+SUBREDDIT_SEARCH_QUERIES = (
+    'feeding help',
+    'feeding advice',
+    'meal plan',
+    'feeding schedule',
+    'portion sizes',
+    'diet help',
+    'nutrition questions'
+)
+
+# Per-cycle stage timings, written next to lead_queue.json
+METRICS_SIDECAR_FILE = "cycle_metrics.json"
+PROMETHEUS_TEXTFILE = "radar_metrics.prom"
 
 class RedditLeadRadar:
-    def __init__(self, config_dir: str = "config"):
+    def __init__(self, config_dir: str = "config", backfill: bool = False):
         self.config_dir = Path(config_dir)
         self.db_path = Path("leads.db")
 
+        # Backfill pages searches back `months_back` months once instead of
+        # only fetching items newer than the stored cursors
+        self.backfill = backfill
+        self.backfill_max_pages = 10
+
+        # Per-stage latency histograms (fetch, parse, scoring, writes, queue generation)
+        self.timings = StageTimings()
+        self._fetch_context = threading.local()
+
         # Load configurations
-        self.subreddits_config = self.load_config("subreddits.json")
-        self.intent_phrases = self.load_config("intent_phrases.json")
-        self.seed_questions = self.load_config("seed_questions.json")
-        self.blacklist = self.load_config("blacklist.json")
+        self.load_scoring_configs()
         self.search_queries = self.load_config("search_queries.json")
         self.megathreads = self.load_config("megathreads.json")
 
@@ -35,13 +109,93 @@ class RedditLeadRadar:
         self.reddit_client_secret = os.getenv('REDDIT_CLIENT_SECRET')
         self.reddit_access_token = None
         self.token_expires_at = 0
-
-        # Initialize database
+        self._token_lock = threading.Lock()
+        # Stand-in server and fixture directory from --replay / --record (passed on to shard workers)
+        self.reddit_base_url: Optional[str] = None
+        self.record_dir: Optional[Path] = None
+
+        # Concurrent fetching under one rate limiter driven by Reddit's X-Ratelimit headers
+        fetch_config = self.subreddits_config.get("fetch", {})
+        self.rate_limiter = self.build_rate_limiter(fetch_config)
+        self.rate_limiter.on_wait = self._record_rate_limit_wait
+        max_in_flight = fetch_config.get("max_in_flight", 8)
+        self.fetch_engine = FetchEngine(
+            max_in_flight=max_in_flight,
+            rate_limiter=self.rate_limiter
+        )
+        # One keep-alive session for every Reddit call, pooled wide enough for all fetch threads
+        self.http = create_session(user_agent='RedditLeadRadar/1.0', pool_maxsize=max_in_flight)
+        self.validators = ValidatorCache(Path(__file__).parent / SEMANTIC_CACHE_DIR / VALIDATOR_CACHE_FILE)
+
+        # Per-subreddit poll intervals learned from arrival rate and lead yield
+        self.scheduler = self.build_scheduler()
+
+        # Megathreads are walked in full; later cycles only expand branches not seen yet
+        self.comment_walker = CommentTreeWalker(
+            self._reddit_get,
+            max_more_requests=self.megathreads.get("max_morechildren_requests", 20),
+            parse_json=self._parse_json
+        )
+        # Seen sets of megathreads being walked; after a complete walk only the branch
+        # markers are kept, since the thread's cursor covers every comment ID in it
+        self._thread_seen: Dict[str, Set[str]] = {}
+        self._thread_lock = threading.Lock()
+
+        # lead_queue.json snapshots plus the lead_changes.jsonl delta feed for the dashboard
+        self.publisher = LeadQueuePublisher()
+        metrics_config = self.subreddits_config.get("metrics", {})
+        self.metrics_json_path = self.publisher.snapshot_path.with_name(METRICS_SIDECAR_FILE)
+        prometheus_textfile = metrics_config.get("prometheus_textfile", PROMETHEUS_TEXTFILE)
+        self.prometheus_path = (self.publisher.snapshot_path.parent / prometheus_textfile
+                                if prometheus_textfile else None)
+        # Live lead/review events for --serve dashboards (no-op without subscribers)
+        self.events = EventBroker()
+
+        # Initialize database (one persistent connection, batched writes)
+        storage_config = self.subreddits_config.get("storage", {})
+        self.store = self.build_store(storage_config.get("flush_every", 500))
+        self.store.on_flush = lambda seconds, rows: self.timings.observe('sqlite_write', seconds)
         self.init_database()
 
-        # Tracking
-        self.processed_ids = set()
-        self.load_processed_ids()
+        # Tracking: recent IDs in memory, older ones looked up in leads.db on demand
+        self.processed_ids = self.build_dedup_index(storage_config.get("dedup_cache_size", 50000))
+        self.store.on_written = self.processed_ids.flushed
+
+        # Archival of old rows, body stripping and incremental VACUUM (--compact, or when idle)
+        retention_policy = RetentionPolicy.from_config(self.load_config("retention.json"))
+        self.retention = RetentionEngine(self.store.conn, retention_policy,
+                                         archive_dir=self.db_path.parent / retention_policy.archive_dir)
+
+        # Worker processes for sharded ingestion (--workers); this process stays the only writer
+        self.shard_pool: Optional[ShardPool] = None
+        # Emergency/intent alerts from a quick /new poll between full cycles (continuous mode)
+        self.fast_lane: Optional[FastLane] = None
+
+    @classmethod
+    def for_scoring(cls, config_dir: str = "config") -> "RedditLeadRadar":
+        """A radar that can only score (no database, fetch threads or credentials).
+
+        Used by rescore worker processes, which must not open leads.db for writing.
+        """
+        radar = cls.__new__(cls)
+        radar.config_dir = Path(config_dir)
+        radar.timings = StageTimings()
+        radar.load_scoring_configs()
+        return radar
+
+    def load_scoring_configs(self):
+        """Load the configs scoring depends on and build the matcher and semantic index"""
+        self.subreddits_config = self.load_config("subreddits.json")
+        self.intent_phrases = self.load_config("intent_phrases.json")
+        self.seed_questions = self.load_config("seed_questions.json")
+        self.blacklist = self.load_config("blacklist.json")
+        self.build_matcher()
+        self.build_semantic_engine()
+        self.build_policies()
+
+    def build_policies(self):
+        """Compile subreddits.json into the per-subreddit policy table"""
+        self.policies = PolicyTable(self.subreddits_config, self.seed_questions.get("scoring_config", {}))
 
     def load_config(self, filename: str) -> Dict[str, Any]:
         """Load a configuration file"""
@@ -58,281 +212,178 @@ class RedditLeadRadar:
             print(f"Error parsing {filename}: {e}")
             return {}
 
-    def init_database(self):
-        """Initialize SQLite database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create posts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS posts (
-                id TEXT PRIMARY KEY,
-                subreddit TEXT NOT NULL,
-                author TEXT,
-                title TEXT NOT NULL,
-                body TEXT,
-                url TEXT,
-                score INTEGER,
-                num_comments INTEGER,
-                created_utc REAL,
-                processed_at REAL,
-                intent_score REAL DEFAULT 0,
-                semantic_score REAL DEFAULT 0,
-                final_score REAL DEFAULT 0,
-                is_emergency BOOLEAN DEFAULT 0,
-                species TEXT,
-                tags TEXT,
-                draft_reply TEXT,
-                entities TEXT,
-                intent_matches TEXT
-            )
-        ''')
+    def build_rate_limiter(self, fetch_config: Dict[str, Any], share: float = 1.0) -> RateLimiter:
+        """Rate limiter for Reddit requests, spending `share` of the client's quota"""
+        return RateLimiter(
+            requests_per_minute=fetch_config.get("requests_per_minute", 90),
+            burst=fetch_config.get("burst", 10),
+            share=share
+        )
 
-        # Create comments table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS comments (
-                id TEXT PRIMARY KEY,
-                post_id TEXT,
-                author TEXT,
-                body TEXT,
-                score INTEGER,
-                created_utc REAL,
-                processed_at REAL,
-                intent_score REAL DEFAULT 0,
-                semantic_score REAL DEFAULT 0,
-                final_score REAL DEFAULT 0,
-                is_emergency BOOLEAN DEFAULT 0,
-                species TEXT,
-                tags TEXT,
-                entities TEXT,
-                intent_matches TEXT,
-                FOREIGN KEY (post_id) REFERENCES posts (id)
-            )
-        ''')
+    def build_store(self, flush_every: int) -> LeadStore:
+        """Buffered writer over leads.db"""
+        return LeadStore(self.db_path, flush_every=flush_every)
 
-        # Create leads table for high-scoring opportunities
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS leads (
-                id TEXT PRIMARY KEY,
-                post_id TEXT,
-                comment_id TEXT,
-                subreddit TEXT,
-                author TEXT,
-                title TEXT,
-                content TEXT,
-                url TEXT,
-                score REAL,
-                species TEXT,
-                intent_matches TEXT,
-                semantic_matches TEXT,
-                draft_reply TEXT,
-                entities TEXT,
-                created_at REAL,
-                reviewed BOOLEAN DEFAULT 0,
-                FOREIGN KEY (post_id) REFERENCES posts (id),
-                FOREIGN KEY (comment_id) REFERENCES comments (id)
-            )
-        ''')
+    def build_dedup_index(self, capacity: int) -> DedupIndex:
+        """Processed-ID index the fetchers check before keeping an item"""
+        return DedupIndex(self.db_path, capacity=capacity)
 
-        conn.commit()
-        conn.close()
-
-    def load_processed_ids(self):
-        """Load IDs of already processed posts/comments"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def init_database(self):
+        """Initialize SQLite database"""
+        self.store.create_tables()
 
-        cursor.execute("SELECT id FROM posts")
-        self.processed_ids.update([row[0] for row in cursor.fetchall()])
+    def _config_mtimes(self) -> Dict[str, float]:
+        """Modification times of the configs the matcher is compiled from"""
+        config_path = Path(__file__).parent / self.config_dir
+        mtimes = {}
+        for filename in MATCHER_CONFIGS:
+            try:
+                mtimes[filename] = (config_path / filename).stat().st_mtime
+            except OSError:
+                mtimes[filename] = 0.0
+        return mtimes
+
+    def build_matcher(self):
+        """Compile intent phrases, blacklist, emergency, species and entity keywords into one matcher"""
+        self.matcher = CompiledMatcher(
+            self.intent_phrases.get("high_signal_phrases", []),
+            self.blacklist,
+            self.seed_questions.get("emergency_keywords", []),
+            entity_keywords=ENTITY_KEYWORDS
+        )
+        self._matcher_mtimes = self._config_mtimes()
 
-        cursor.execute("SELECT id FROM comments")
-        self.processed_ids.update([row[0] for row in cursor.fetchall()])
+    def build_semantic_engine(self):
+        """Index the seed questions with the configured semantic engine"""
+        config = self.seed_questions.get("scoring_config", {})
+        options = {}
+        if config.get("embedding_model"):
+            options["model_name"] = config["embedding_model"]
+        self.semantic_engine = create_engine(
+            config.get("semantic_engine", "jaccard"),
+            self.seed_questions,
+            cache_dir=Path(__file__).parent / SEMANTIC_CACHE_DIR,
+            **options
+        )
 
-        conn.close()
+    def build_scheduler(self) -> AdaptiveScheduler:
+        """Adaptive schedule for subreddit polls; sitewide searches and megathreads keep the fixed interval"""
+        polling_interval = self.subreddits_config.get("polling_interval_seconds", 600)
+        scheduler_config = self.subreddits_config.get("scheduler", {})
+        scheduler = AdaptiveScheduler(
+            poll_budget_per_hour=scheduler_config.get("poll_budget_per_hour", 90),
+            min_interval=scheduler_config.get("min_interval_seconds", 180),
+            max_interval=scheduler_config.get("max_interval_seconds", 3600),
+            initial_interval=polling_interval,
+            state_path=Path(__file__).parent / SEMANTIC_CACHE_DIR / SCHEDULER_STATE_FILE
+        )
+        scheduler.add(SITEWIDE_SOURCE, fixed_interval=polling_interval)
+        scheduler.add(MEGATHREAD_SOURCE, fixed_interval=polling_interval)
+        scheduler.sync(policy.name for policy in self.policies if not policy.read_only)
+        return scheduler
 
-        print(f"Loaded {len(self.processed_ids)} processed post/comment IDs")
+    def reload_matcher_if_changed(self) -> bool:
+        """Reload the phrase configs and recompile the matcher if any of them changed on disk"""
+        if self._config_mtimes() == self._matcher_mtimes:
+            return False
 
-    def is_blacklisted(self, text: str, author: str = "") -> bool:
+        self.intent_phrases = self.load_config("intent_phrases.json")
+        self.seed_questions = self.load_config("seed_questions.json")
+        self.blacklist = self.load_config("blacklist.json")
+        self.build_matcher()
+        self.build_semantic_engine()
+        self.build_policies()
+        print(f"Config changed, recompiled matcher ({self.matcher.text_automaton.size} keywords)")
+        return True
+
+    def analyze(self, text: TextInput) -> AnalyzedText:
+        """Analyze a text once for all scorers (already-analyzed texts pass through)"""
+        if isinstance(text, AnalyzedText):
+            return text
+        return analyze_text(text, self.matcher)
+
+    def is_blacklisted(self, text: TextInput, author: str = "") -> bool:
         """Check if content or author is blacklisted"""
-        text_lower = text.lower()
-        author_lower = (author or "").lower()
-
-        # Check banned words
-        for word in self.blacklist.get("banned_words", []):
-            if word.lower() in text_lower:
-                return True
+        if self.analyze(text).hits.is_blacklisted:
+            return True
+        return self.matcher.is_banned_author((author or "").lower())
 
-        # Check banned substrings
-        for substring in self.blacklist.get("banned_substrings", []):
-            if substring.lower() in text_lower:
-                return True
-
-        # Check banned users
-        for banned_user in self.blacklist.get("banned_users", []):
-            if banned_user.lower() in author_lower:
-                return True
-
-        return False
-
-    def is_emergency(self, text: str) -> bool:
+    def is_emergency(self, text: TextInput) -> bool:
         """Check if post indicates a medical emergency"""
-        text_lower = text.lower()
-        emergency_keywords = self.seed_questions.get("emergency_keywords", [])
-
-        for keyword in emergency_keywords:
-            if keyword.lower() in text_lower:
-                return True
-
-        return False
+        return self.analyze(text).hits.is_emergency
 
-    def extract_species(self, text: str) -> Optional[str]:
+    def extract_species(self, text: TextInput) -> Optional[str]:
         """Extract species from text"""
-        text_lower = text.lower()
-
-        species_map = {
-            'reptiles': ['reptile', 'lizard', 'gecko', 'snake', 'dragon', 'beardie', 'turtle', 'tortoise'],
-            'birds': ['bird', 'parrot', 'budgie', 'cockatiel', 'conure', 'chicken', 'duck', 'goose'],
-            'pocket_pets': ['rabbit', 'bunny', 'guinea pig', 'hamster', 'rat', 'ferret', 'hedgehog', 'gerbil'],
-            'dogs': ['dog', 'puppy', 'canine'],
-            'cats': ['cat', 'kitten', 'feline']
-        }
-
-        for species, keywords in species_map.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return species
+        return self.analyze(text).hits.first_species()
 
-        return None
-
-    def extract_entities(self, text: str) -> Dict[str, Any]:
+    def extract_entities(self, text: TextInput) -> Entities:
         """Extract entities like age, weight, conditions from text"""
-        text_lower = text.lower()
-        entities = {
-            'age': None,
-            'weight': None,
-            'weight_unit': None,
-            'conditions': [],
-            'allergies': [],
-            'diet_type': None
-        }
-
-        # Extract age
-        age_patterns = [
-            r'(\d+)\s*(year|yr|month|mo|week|wk)s?\s*old',
-            r'(\d+)\s*(year|yr|month|mo|week|wk)s?\s*old',
-            r'age\s*(\d+)',
-            r'(\d+)\s*years?\s*old',
-            r'(\d+)\s*months?\s*old'
-        ]
-
-        for pattern in age_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                age_num = int(match.group(1))
-                age_unit = match.group(2) if len(match.groups()) > 1 else 'year'
-                entities['age'] = f"{age_num} {age_unit}{'s' if age_num != 1 else ''}"
-                break
-
-        # Extract weight
-        weight_patterns = [
-            r'(\d+(?:\.\d+)?)\s*(lb|lbs|pound|pounds|kg|kgs|kilogram|kilograms|oz|ounces)',
-            r'weigh(?:s|ing)?\s*(\d+(?:\.\d+)?)\s*(lb|lbs|pound|pounds|kg|kgs|kilogram|kilograms|oz|ounces)',
-            r'(\d+(?:\.\d+)?)\s*(lb|lbs|kg|kgs)'
-        ]
-
-        for pattern in weight_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                entities['weight'] = float(match.group(1))
-                entities['weight_unit'] = match.group(2) if len(match.groups()) > 1 else match.group(2)
-                break
-
-        # Extract conditions/health issues
-        health_keywords = [
-            'diarrhea', 'constipation', 'vomiting', 'arthritis', 'joint pain',
-            'skin issues', 'itching', 'allergies', 'ear infection', 'uti',
-            'kidney disease', 'diabetes', 'thyroid', 'cancer', 'obesity',
-            'underweight', 'picky eater', 'food refusal', 'weight loss', 'weight gain'
-        ]
-
-        for keyword in health_keywords:
-            if keyword in text_lower:
-                entities['conditions'].append(keyword)
-
-        # Extract diet preferences
-        diet_keywords = [
-            'raw', 'kibble', 'wet food', 'dry food', 'homemade', 'cooked',
-            'grain free', 'limited ingredient', 'prescription diet', 'hypoallergenic'
-        ]
-
-        for keyword in diet_keywords:
-            if keyword in text_lower:
-                entities['diet_type'] = keyword
-                break
-
-        return entities
-
-    def calculate_intent_score(self, text: str) -> float:
+        analysis = self.analyze(text)
+        if 'entities' not in analysis.memo:
+            hits = analysis.hits
+            analysis.memo['entities'] = extract_entities(analysis.lower, hits.conditions, hits.diets)
+        return analysis.memo['entities']
+
+    def extract_entities_batch(self, analyses: List[AnalyzedText]) -> List[Entities]:
+        """Entities for a batch of analyzed texts, sharing one regex scan across the batch"""
+        pending = [analysis for analysis in analyses if 'entities' not in analysis.memo]
+        extracted = extract_entities_batch(
+            [analysis.lower for analysis in pending],
+            [(analysis.hits.conditions, analysis.hits.diets) for analysis in pending])
+        for analysis, entities in zip(pending, extracted):
+            analysis.memo['entities'] = entities
+        return [analysis.memo['entities'] for analysis in analyses]
+
+    def calculate_intent_score(self, text: TextInput) -> float:
         """Calculate intent score based on high-signal phrases with enhanced matching"""
-        if not text:
+        analysis = self.analyze(text)
+        if not analysis:
+            analysis.memo['intent_matches'] = []
             return 0.0
 
-        text_lower = text.lower()
-        intent_phrases = self.intent_phrases.get("high_signal_phrases", [])
+        text_lower = analysis.lower
         weights = self.intent_phrases.get("scoring_weights", {})
+        matcher = self.matcher
 
         max_score = 0.0
-        matched_phrases = []
-
-        for phrase in intent_phrases:
-            phrase_lower = phrase.lower()
-
-            # Exact match
-            if phrase_lower in text_lower:
-                if phrase_lower == text_lower.strip():
+        exact_ids = analysis.hits.intent_ids
+        if exact_ids:
+            text_stripped = text_lower.strip()
+            for phrase_id in exact_ids:
+                if matcher.intent_phrases_lower[phrase_id] == text_stripped:
                     max_score = max(max_score, weights.get("exact_match", 1.0))
                 else:
                     max_score = max(max_score, weights.get("partial_match", 0.7))
-                matched_phrases.append(phrase)
-                continue
 
-            # Fuzzy partial matching - check for significant word overlap
-            phrase_words = set(phrase_lower.split())
-            text_words = set(text_lower.split())
+        # Fuzzy partial matching - significant word overlap with phrases not matched exactly
+        fuzzy_ids = matcher.fuzzy_intent_ids(analysis.token_set, exclude=exact_ids)
+        if fuzzy_ids:
+            max_score = max(max_score, weights.get("semantic_match", 0.5))
 
-            overlap = len(phrase_words.intersection(text_words))
-            if overlap >= max(1, len(phrase_words) * 0.6):  # 60% word overlap
-                max_score = max(max_score, weights.get("semantic_match", 0.5))
-                matched_phrases.append(f"fuzzy: {phrase}")
+        matched_phrases = [
+            matcher.intent_phrases[phrase_id] if phrase_id in exact_ids
+            else f"fuzzy: {matcher.intent_phrases[phrase_id]}"
+            for phrase_id in sorted(exact_ids | fuzzy_ids)
+        ]
 
-        # Store for debugging
-        self._last_intent_matches = matched_phrases
+        analysis.memo['intent_matches'] = matched_phrases
 
         return min(max_score, 1.0)
 
-    def calculate_semantic_score(self, text: str, species: Optional[str] = None) -> float:
+    def calculate_semantic_score(self, text: TextInput, species: Optional[str] = None) -> float:
         """Calculate semantic similarity to seed questions"""
         if not text or not species:
             return 0.0
+        return self.calculate_semantic_scores([text], [species])[0]
 
-        # Simple TF-IDF style matching (could be upgraded to embeddings)
-        text_words = set(text.lower().split())
-        max_score = 0.0
-
-        for seed_question in self.seed_questions.get(species, []):
-            seed_words = set(seed_question.lower().split())
-            intersection = text_words.intersection(seed_words)
-            union = text_words.union(seed_words)
-
-            if union:
-                jaccard_similarity = len(intersection) / len(union)
-                max_score = max(max_score, jaccard_similarity)
+    def calculate_semantic_scores(self, texts: List[TextInput],
+                                  species: List[Optional[str]]) -> List[float]:
+        """Semantic similarity for a batch of texts (one engine call per batch)"""
+        return self.semantic_engine.score_batch([self.analyze(t) for t in texts], species)
 
-        return max_score
-
-    def calculate_freshness_score(self, created_utc: float) -> float:
+    def calculate_freshness_score(self, created_utc: float, now: Optional[float] = None) -> float:
         """Calculate freshness score (newer posts score higher)"""
-        now = time.time()
+        now = time.time() if now is None else now
         hours_old = (now - created_utc) / 3600
 
         # Exponential decay: posts from last hour = 1.0, older decay
@@ -344,7 +395,7 @@ class RedditLeadRadar:
             return 0.1  # Very old posts get low freshness
 
     def calculate_final_score(self, intent_score: float, semantic_score: float,
-                            freshness_score: float, subreddit_tags: List[str]) -> float:
+                            freshness_score: float, policy: SubredditPolicy) -> float:
         """Calculate final lead score"""
         config = self.seed_questions.get("scoring_config", {})
 
@@ -359,16 +410,108 @@ class RedditLeadRadar:
             freshness_score * freshness_weight
         )
 
-        # Boost for link-allowed subreddits
-        if "allowed_link" in subreddit_tags:
-            final_score *= 1.2
-
-        # Penalty for no-promo subreddits
-        if "no_promo" in subreddit_tags:
-            final_score *= 0.8
+        # Tag boosts/penalties (TAG_MULTIPLIERS), one at a time in table order
+        for multiplier in policy.multipliers:
+            final_score *= multiplier
 
         return round(final_score, 3)
 
+    def calculate_freshness_scores(self, created_utcs: List[float],
+                                   now: Optional[Union[float, List[float]]] = None) -> List[float]:
+        """Freshness scores for a batch of timestamps (same decay as calculate_freshness_score).
+
+        ``now`` is one reference time for the whole batch or one per item (rescoring
+        measures freshness as of when each row was first processed).
+        """
+        now = time.time() if now is None else now
+        if np is None:
+            nows = now if isinstance(now, (list, tuple)) else [now] * len(created_utcs)
+            return [self.calculate_freshness_score(created_utc, item_now)
+                    for created_utc, item_now in zip(created_utcs, nows)]
+
+        hours_old = (np.asarray(now, dtype=float) - np.asarray(created_utcs, dtype=float)) / 3600
+        freshness = np.where(hours_old <= 1, 1.0,
+                             np.where(hours_old <= 24, 0.8 ** (hours_old / 6), 0.1))
+        return freshness.tolist()
+
+    def calculate_final_scores(self, intent_scores: List[float], semantic_scores: List[float],
+                               freshness_scores: List[float], policies: List[SubredditPolicy]) -> List[float]:
+        """Final lead scores for a batch (same weighting as calculate_final_score)"""
+        if np is None:
+            return [self.calculate_final_score(intent, semantic, freshness, policy)
+                    for intent, semantic, freshness, policy in
+                    zip(intent_scores, semantic_scores, freshness_scores, policies)]
+
+        config = self.seed_questions.get("scoring_config", {})
+        final_scores = (
+            np.asarray(intent_scores, dtype=float) * config.get("intent_phrase_weight", 0.4) +
+            np.asarray(semantic_scores, dtype=float) * config.get("semantic_similarity_weight", 0.4) +
+            np.asarray(freshness_scores, dtype=float) * config.get("freshness_weight", 0.2)
+        )
+
+        # Each policy's multipliers applied one at a time, as in the per-item path
+        # (a missing step multiplies by 1.0, which leaves the float unchanged)
+        for step in range(max((len(policy.multipliers) for policy in policies), default=0)):
+            final_scores = final_scores * np.array(
+                [policy.multipliers[step] if step < len(policy.multipliers) else 1.0 for policy in policies])
+
+        # Python's round() so batch and per-item scores agree exactly
+        return [round(score, 3) for score in final_scores.tolist()]
+
+    def get_subreddit_tags(self, subreddit: Optional[str]) -> List[str]:
+        """Tags configured for a subreddit (empty if it isn't configured)"""
+        return list(self.policies.get(subreddit).tags)
+
+    def score_batch(self, items: List[Dict[str, Any]],
+                    now: Optional[Union[float, List[float]]] = None) -> List[Dict[str, Any]]:
+        """Score a batch of posts and/or comments.
+
+        Posts are scored on "title body", comments on their body. Returns one dict
+        per item, in order, with species, entities, the component and final scores,
+        the emergency flag, subreddit tags and whether the item qualifies as a lead.
+        ``now`` is the freshness reference time: one value or one per item.
+        """
+        if not items:
+            return []
+
+        timed = self.timings.time
+        with timed('score', scorer='analyze'):
+            analyses = [self.analyze(f"{item['title']} {item.get('body', '')}" if 'title' in item
+                                     else item.get('body', '')) for item in items]
+        with timed('score', scorer='species'):
+            species = [self.extract_species(analysis) for analysis in analyses]
+        policies = [self.policies.get(item.get('subreddit')) for item in items]
+
+        with timed('score', scorer='intent'):
+            intent_scores = [self.calculate_intent_score(analysis) for analysis in analyses]
+        with timed('score', scorer='semantic'):
+            semantic_scores = self.calculate_semantic_scores(analyses, species)
+        with timed('score', scorer='final'):
+            freshness_scores = self.calculate_freshness_scores([item['created_utc'] for item in items], now)
+            final_scores = self.calculate_final_scores(intent_scores, semantic_scores,
+                                                       freshness_scores, policies)
+        with timed('score', scorer='emergency'):
+            emergencies = [self.is_emergency(analysis) for analysis in analyses]
+        with timed('score', scorer='entities'):
+            entities = self.extract_entities_batch(analyses)
+
+        results = []
+        for i, analysis in enumerate(analyses):
+            is_emergency = emergencies[i]
+            results.append({
+                'species': species[i],
+                'entities': entities[i],
+                'intent_matches': analysis.memo.get('intent_matches', []),
+                'intent_score': intent_scores[i],
+                'semantic_score': semantic_scores[i],
+                'freshness_score': freshness_scores[i],
+                'final_score': final_scores[i],
+                'is_emergency': is_emergency,
+                'subreddit_tags': list(policies[i].tags),
+                'is_lead': final_scores[i] >= policies[i].min_score_threshold and not is_emergency
+            })
+        return results
+
     def generate_draft_reply(self, post_data: Dict[str, Any], subreddit_tags: List[str]) -> str:
         """Generate a draft reply in Paws & Plates voice with appropriate style based on subreddit rules"""
         species = post_data.get('species', 'pet')
@@ -396,158 +539,134 @@ class RedditLeadRadar:
 
         return reply
 
-    def save_comment(self, comment_data: Dict[str, Any]):
-        """Process and save a comment to database"""
-        # Calculate scores
-        intent_score = self.calculate_intent_score(comment_data.get('body', ''))
-        semantic_score = self.calculate_semantic_score(f"{comment_data.get('body', '')}",
-                                                      self.extract_species(comment_data.get('body', '')))
-        freshness_score = self.calculate_freshness_score(comment_data['created_utc'])
-
-        # Get subreddit config
-        subreddit_config = next((s for s in self.subreddits_config.get("subreddits", [])
-                               if s["name"] == comment_data['subreddit']), {})
-        subreddit_tags = subreddit_config.get("tags", [])
-
-        final_score = self.calculate_final_score(intent_score, semantic_score, freshness_score, subreddit_tags)
-
-        # Check if it's a high-scoring lead
-        min_threshold = self.seed_questions.get("scoring_config", {}).get("min_score_threshold", 0.6)
-        is_lead = final_score >= min_threshold and not self.is_emergency(comment_data.get('body', ''))
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT OR REPLACE INTO comments
-            (id, post_id, author, body, score, created_utc, processed_at,
-             intent_score, semantic_score, final_score, is_emergency, species, tags, entities, intent_matches)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            comment_data['id'],
-            comment_data['post_id'],
-            comment_data.get('author'),
-            comment_data.get('body'),
-            comment_data.get('score'),
-            comment_data['created_utc'],
-            time.time(),
-            intent_score,
-            semantic_score,
-            final_score,
-            self.is_emergency(comment_data.get('body', '')),
-            self.extract_species(comment_data.get('body', '')),
-            json.dumps(subreddit_tags),
-            json.dumps(self.extract_entities(comment_data.get('body', ''))),
-            json.dumps(getattr(self, '_last_intent_matches', []))
-        ))
+    def save_comment(self, comment_data: Dict[str, Any], scored: Optional[Dict[str, Any]] = None) -> bool:
+        """Buffer a comment for the next database flush; returns True if it became a lead.
+
+        ``scored`` is the comment's score_batch() result; it is computed here if omitted.
+        """
+        if scored is None:
+            scored = self.score_batch([comment_data])[0]
+        species = scored['species']
+        subreddit_tags = scored['subreddit_tags']
+        final_score = scored['final_score']
+        entity_columns = scored['entities'].columns()
+
+        self.store.add_comment({
+            'id': comment_data['id'],
+            'post_id': comment_data['post_id'],
+            'author': comment_data.get('author'),
+            'body': comment_data.get('body'),
+            'score': comment_data.get('score'),
+            'created_utc': comment_data['created_utc'],
+            'processed_at': time.time(),
+            'intent_score': scored['intent_score'],
+            'semantic_score': scored['semantic_score'],
+            'final_score': final_score,
+            'is_emergency': scored['is_emergency'],
+            'species': species,
+            'tags': json.dumps(subreddit_tags),
+            'intent_matches': json.dumps(scored['intent_matches']),
+            **entity_columns
+        })
 
         # Save to leads if high score
-        if is_lead:
-            cursor.execute('''
-                INSERT OR REPLACE INTO leads
-                (id, post_id, comment_id, subreddit, author, title, content, url, score, species,
-                 intent_matches, semantic_matches, draft_reply, entities, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"lead_comment_{comment_data['id']}",
-                comment_data['post_id'],
-                comment_data['id'],
-                comment_data['subreddit'],
-                comment_data.get('author'),
-                f"Comment about: {self.extract_species(comment_data.get('body', ''))} feeding",  # Generate descriptive title
-                comment_data.get('body', ''),
-                f"https://reddit.com/r/{comment_data['subreddit']}/comments/{comment_data['post_id']}/_/{comment_data['id']}",
-                final_score,
-                self.extract_species(comment_data.get('body', '')),
-                json.dumps([]),  # Would store matched phrases
-                json.dumps([]),  # Would store semantic matches
-                self.generate_draft_reply(comment_data, subreddit_tags),
-                json.dumps(self.extract_entities(comment_data.get('body', ''))),
-                time.time()
-            ))
-
-        conn.commit()
-        conn.close()
-
-    def save_post(self, post_data: Dict[str, Any]):
-        """Save post to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Calculate scores
-        full_text = f"{post_data['title']} {post_data.get('body', '')}"
-        species = self.extract_species(full_text)
-        intent_score = self.calculate_intent_score(full_text)
-        semantic_score = self.calculate_semantic_score(full_text, species)
-        freshness_score = self.calculate_freshness_score(post_data['created_utc'])
-
-        # Extract entities
-        entities = self.extract_entities(full_text)
-
-        # Get subreddit config
-        subreddit_config = next((s for s in self.subreddits_config.get("subreddits", [])
-                               if s["name"] == post_data['subreddit']), {})
-        subreddit_tags = subreddit_config.get("tags", [])
-
-        final_score = self.calculate_final_score(intent_score, semantic_score, freshness_score, subreddit_tags)
-
-        # Check if it's a high-scoring lead
-        min_threshold = self.seed_questions.get("scoring_config", {}).get("min_score_threshold", 0.6)
-        is_lead = final_score >= min_threshold and not self.is_emergency(f"{post_data['title']} {post_data.get('body', '')}")
-
-        cursor.execute('''
-            INSERT OR REPLACE INTO posts
-            (id, subreddit, author, title, body, url, score, num_comments, created_utc, processed_at,
-             intent_score, semantic_score, final_score, is_emergency, species, tags, draft_reply, entities, intent_matches)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            post_data['id'],
-            post_data['subreddit'],
-            post_data.get('author'),
-            post_data['title'],
-            post_data.get('body'),
-            post_data.get('url'),
-            post_data.get('score'),
-            post_data.get('num_comments'),
-            post_data['created_utc'],
-            time.time(),
-            intent_score,
-            semantic_score,
-            final_score,
-            self.is_emergency(f"{post_data['title']} {post_data.get('body', '')}"),
-            species,
-            json.dumps(subreddit_tags),
-            self.generate_draft_reply(post_data, subreddit_tags) if is_lead else None,
-            json.dumps(entities),
-            json.dumps(getattr(self, '_last_intent_matches', []))
-        ))
+        if scored['is_lead']:
+            self._add_lead({
+                'id': f"lead_comment_{comment_data['id']}",
+                'post_id': comment_data['post_id'],
+                'comment_id': comment_data['id'],
+                'subreddit': comment_data['subreddit'],
+                'author': comment_data.get('author'),
+                'title': f"Comment about: {species} feeding",  # Generate descriptive title
+                'content': comment_data.get('body', ''),
+                'url': f"https://reddit.com/r/{comment_data['subreddit']}/comments/{comment_data['post_id']}/_/{comment_data['id']}",
+                'score': final_score,
+                'species': species,
+                'intent_matches': json.dumps(scored['intent_matches']),
+                'semantic_matches': json.dumps([]),  # Would store semantic matches
+                'draft_reply': self.generate_draft_reply(comment_data, subreddit_tags),
+                'created_at': time.time(),
+                **entity_columns
+            })
+
+        return scored['is_lead']
+
+    def save_post(self, post_data: Dict[str, Any], scored: Optional[Dict[str, Any]] = None) -> bool:
+        """Buffer a post for the next database flush; returns True if it became a lead.
+
+        ``scored`` is the post's score_batch() result; it is computed here if omitted.
+        """
+        if scored is None:
+            scored = self.score_batch([post_data])[0]
+        species = scored['species']
+        subreddit_tags = scored['subreddit_tags']
+        final_score = scored['final_score']
+        entity_columns = scored['entities'].columns()
+        draft_reply = self.generate_draft_reply(post_data, subreddit_tags) if scored['is_lead'] else None
+
+        self.store.add_post({
+            'id': post_data['id'],
+            'subreddit': post_data['subreddit'],
+            'author': post_data.get('author'),
+            'title': post_data['title'],
+            'body': post_data.get('body'),
+            'url': post_data.get('url'),
+            'score': post_data.get('score'),
+            'num_comments': post_data.get('num_comments'),
+            'created_utc': post_data['created_utc'],
+            'processed_at': time.time(),
+            'intent_score': scored['intent_score'],
+            'semantic_score': scored['semantic_score'],
+            'final_score': final_score,
+            'is_emergency': scored['is_emergency'],
+            'species': species,
+            'tags': json.dumps(subreddit_tags),
+            'draft_reply': draft_reply,
+            'intent_matches': json.dumps(scored['intent_matches']),
+            **entity_columns
+        })
 
         # Save to leads if high score
-        if is_lead:
-            cursor.execute('''
-                INSERT OR REPLACE INTO leads
-                (id, post_id, subreddit, author, title, content, url, score, species,
-                 intent_matches, semantic_matches, draft_reply, entities, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"lead_{post_data['id']}",
-                post_data['id'],
-                post_data['subreddit'],
-                post_data.get('author'),
-                post_data['title'],
-                post_data.get('body', ''),
-                post_data.get('url'),
-                final_score,
-                species,
-                json.dumps([]),  # Would store matched phrases
-                json.dumps([]),  # Would store semantic matches
-                self.generate_draft_reply(post_data, subreddit_tags),
-                json.dumps(entities),
-                time.time()
-            ))
-
-        conn.commit()
-        conn.close()
+        if scored['is_lead']:
+            self._add_lead({
+                'id': f"lead_{post_data['id']}",
+                'post_id': post_data['id'],
+                'subreddit': post_data['subreddit'],
+                'author': post_data.get('author'),
+                'title': post_data['title'],
+                'content': post_data.get('body', ''),
+                'url': post_data.get('url'),
+                'score': final_score,
+                'species': species,
+                'intent_matches': json.dumps(scored['intent_matches']),
+                'semantic_matches': json.dumps([]),  # Would store semantic matches
+                'draft_reply': draft_reply,
+                'created_at': time.time(),
+                **entity_columns
+            })
+
+        return scored['is_lead']
+
+    def _reddit_get(self, url: str, limiter: Optional[RateLimiter] = None, **kwargs) -> requests.Response:
+        """GET a Reddit endpoint through the cycle's rate limiter, or `limiter` (retries 429s)"""
+        endpoint = endpoint_name(url)
+
+        def timed_get(request_url: str, **request_kwargs) -> requests.Response:
+            with self.timings.time('http_fetch', endpoint=endpoint):
+                return self.http.get(request_url, **request_kwargs)
+
+        return (limiter or self.rate_limiter).request(timed_get, url, **kwargs)
+
+    def _parse_json(self, response: requests.Response) -> Any:
+        """Decode a JSON response, timed per endpoint"""
+        with self.timings.time('parse', format='json', endpoint=endpoint_name(response.url or '')):
+            return response.json()
+
+    def _record_rate_limit_wait(self, seconds: float):
+        """Attribute a rate-limiter wait to the source whose fetch thread waited"""
+        if seconds > 0:
+            self.timings.observe('rate_limit_wait', seconds,
+                                 source=getattr(self._fetch_context, 'source', 'other'))
 
     def fetch_reddit_rss(self, subreddit: str) -> List[Dict[str, Any]]:
         """Fetch posts from Reddit RSS feed"""
@@ -555,15 +674,20 @@ class RedditLeadRadar:
         headers = {'User-Agent': 'RedditLeadRadar/1.0'}
 
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            # Unchanged since the last poll (304 or same body): nothing new to parse
+            response = conditional_get(self._reddit_get, url, self.validators,
+                                       headers=headers, timeout=10)
+            if response is None:
+                return []
 
-            feed = feedparser.parse(response.content)
+            with self.timings.time('parse', format='rss', endpoint='rss'):
+                feed = feedparser.parse(response.content)
             posts = []
+            seen_ids = self.processed_ids.seen_among(self.extract_post_id(entry) for entry in feed.entries)
 
             for entry in feed.entries:
                 post_id = self.extract_post_id(entry)
-                if not post_id or post_id in self.processed_ids:
+                if not post_id or post_id in seen_ids:
                     continue
 
                 # Skip blacklisted content
@@ -586,10 +710,12 @@ class RedditLeadRadar:
 
                 posts.append(post_data)
                 self.processed_ids.add(post_id)
+                seen_ids.add(post_id)
 
             return posts
 
         except Exception as e:
+            self.validators.forget(url)
             print(f"Error fetching RSS for r/{subreddit}: {e}")
             return []
 
@@ -611,6 +737,11 @@ class RedditLeadRadar:
             print("Reddit API credentials not set. Set REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET environment variables.")
             return None
 
+        with self._token_lock:
+            return self._refresh_access_token()
+
+    def _refresh_access_token(self) -> Optional[str]:
+        """Return the cached token or fetch a new one (caller holds the token lock)"""
         # Check if token is still valid (with 5 minute buffer)
         if self.reddit_access_token and time.time() < (self.token_expires_at - 300):
             return self.reddit_access_token
@@ -621,8 +752,9 @@ class RedditLeadRadar:
             data = {'grant_type': 'client_credentials'}
             headers = {'User-Agent': 'RedditLeadRadar/1.0'}
 
-            response = requests.post('https://www.reddit.com/api/v1/access_token',
-                                   auth=auth, data=data, headers=headers, timeout=10)
+            with self.timings.time('http_fetch', endpoint='token'):
+                response = self.http.post('https://www.reddit.com/api/v1/access_token',
+                                          auth=auth, data=data, headers=headers, timeout=10)
             response.raise_for_status()
 
             token_data = response.json()
@@ -656,10 +788,10 @@ class RedditLeadRadar:
                 'sort': 'new'
             }
 
-            response = requests.get(url, headers=headers, params=params, timeout=15)
+            response = self._reddit_get(url, headers=headers, params=params, timeout=15)
             response.raise_for_status()
 
-            data = response.json()
+            data = self._parse_json(response)
 
             # Reddit API returns [post_data, comments_data]
             if len(data) < 2:
@@ -672,40 +804,141 @@ class RedditLeadRadar:
                 if comment_item['kind'] != 't1':  # t1 = comment
                     continue
 
-                comment_data = comment_item['data']
+                comment_info = self._comment_info(comment_item['data'], post_id, subreddit)
+                if comment_info:
+                    comments.append(comment_info)
 
-                # Skip deleted/removed comments
-                if comment_data.get('body') in ['[deleted]', '[removed]']:
-                    continue
+            return comments
 
-                # Skip blacklisted content
-                body = comment_data.get('body', '')
-                author = comment_data.get('author', '')
-                if self.is_blacklisted(f"{body}", author):
-                    continue
+        except Exception as e:
+            print(f"Error fetching comments for post {post_id} in r/{subreddit}: {e}")
+            return []
 
-                comment_info = {
-                    'id': comment_data['id'],
-                    'post_id': post_id,
-                    'subreddit': subreddit,
-                    'author': author,
-                    'body': body,
-                    'score': comment_data.get('score', 0),
-                    'created_utc': comment_data.get('created_utc', time.time()),
-                    'parent_id': comment_data.get('parent_id', '').split('_')[1] if comment_data.get('parent_id') else None,
-                    'depth': comment_data.get('depth', 0)
-                }
+    def _comment_info(self, comment_data: Dict[str, Any], post_id: str,
+                      subreddit: str) -> Optional[Dict[str, Any]]:
+        """Comment fields the pipeline stores, or None for deleted/removed/blacklisted comments"""
+        # Skip deleted/removed comments
+        if comment_data.get('body') in ['[deleted]', '[removed]']:
+            return None
 
-                comments.append(comment_info)
+        # Skip blacklisted content
+        body = comment_data.get('body', '')
+        author = comment_data.get('author', '')
+        if self.is_blacklisted(f"{body}", author):
+            return None
 
+        return {
+            'id': comment_data['id'],
+            'post_id': post_id,
+            'subreddit': subreddit,
+            'author': author,
+            'body': body,
+            'score': comment_data.get('score', 0),
+            'created_utc': comment_data.get('created_utc', time.time()),
+            'parent_id': comment_data.get('parent_id', '').split('_')[1] if comment_data.get('parent_id') else None,
+            'depth': comment_data.get('depth', 0)
+        }
+
+    def _seen_in_thread(self, post_id: str) -> Set[str]:
+        """Comment IDs already walked in a thread (seeded from leads.db on first use)"""
+        with self._thread_lock:
+            seen = self._thread_seen.get(post_id)
+        if seen is None:
+            seen = self.processed_ids.comment_ids_for_post(post_id)
+            with self._thread_lock:
+                seen = self._thread_seen.setdefault(post_id, seen)
+        return seen
+
+    def fetch_thread_comments(self, post_id: str, subreddit: str) -> List[Dict[str, Any]]:
+        """Fetch the comments of a whole thread (expanding `more` stubs) not seen on earlier cycles"""
+        access_token = self.get_reddit_access_token()
+        if not access_token:
+            return []
+
+        headers = {
+            'Authorization': f'bearer {access_token}',
+            'User-Agent': 'RedditLeadRadar/1.0'
+        }
+        cursor_source = f"{THREAD_CURSOR_PREFIX}{post_id}"
+
+        try:
+            cursor = self.store.get_cursor(cursor_source, '')
+            high_water_id = None
+            if cursor and cursor['newest_fullname']:
+                high_water_id = cursor['newest_fullname'].split('_', 1)[-1]
+
+            walk = self.comment_walker.walk(post_id, subreddit, headers,
+                                            self._seen_in_thread(post_id), high_water_id)
+
+            comments = []
+            seen_ids = self.processed_ids.seen_among(c['id'] for c in walk.comments)
+            for comment_data in walk.comments:
+                if comment_data['id'] in seen_ids:
+                    continue
+                comment_info = self._comment_info(comment_data, post_id, subreddit)
+                if comment_info:
+                    comments.append(comment_info)
+                    self.processed_ids.add(comment_info['id'])
+
+            # Only a complete walk may advance the high-water mark: deferred branches
+            # below it would otherwise be skipped for good
+            if walk.complete and walk.newest_id:
+                newest_created = max([c.get('created_utc') or 0 for c in walk.comments] +
+                                     [(cursor or {}).get('newest_created_utc') or 0])
+                self.store.stage_cursor(cursor_source, '', f"t1_{walk.newest_id}", newest_created)
+                with self._thread_lock:
+                    self._thread_seen[post_id] = branch_markers(self._thread_seen.get(post_id, set()))
+
+            print(f"Thread {post_id} in r/{subreddit}: {len(comments)} new comments "
+                  f"({walk.requests} requests"
+                  f"{f', {walk.deferred} unexpanded left for next cycle' if walk.deferred else ''})")
             return comments
 
         except Exception as e:
-            print(f"Error fetching comments for post {post_id} in r/{subreddit}: {e}")
+            print(f"Error walking comment tree for post {post_id} in r/{subreddit}: {e}")
             return []
 
+    def _fetch_listing_since_cursor(self, url: str, headers: Dict[str, str], params: Dict[str, Any],
+                                    source: str, query: str, start_epoch: float = 0) -> List[Dict[str, Any]]:
+        """Fetch listing items newer than the stored (source, query) cursor.
+
+        Normal cycles only ask Reddit for items newer than the cursor (`before=`).
+        In backfill mode the listing is paged with `after=` back to start_epoch.
+        The newest item returned is staged as the new cursor.
+        """
+        cursor = self.store.get_cursor(source, query)
+        params = dict(params)
+        newer_than = 0
+        if cursor and not self.backfill:
+            params['before'] = cursor['newest_fullname']
+            newer_than = cursor['newest_created_utc'] or 0
+
+        items = []
+        max_pages = self.backfill_max_pages if self.backfill else 1
+        for _ in range(max_pages):
+            response = self._reddit_get(url, headers=headers, params=params, timeout=15)
+            response.raise_for_status()
+
+            listing = self._parse_json(response).get('data', {})
+            page = [child['data'] for child in listing.get('children', [])]
+            items.extend(page)
+
+            after = listing.get('after')
+            if not after or not page or page[-1].get('created_utc', 0) < start_epoch:
+                break
+            params.pop('before', None)
+            params['after'] = after
+
+        # Reddit ignores `before` if the cursor item was deleted, so filter on time as well
+        items = [item for item in items if item.get('created_utc', 0) > newer_than]
+        if items:
+            newest = max(items, key=lambda item: item.get('created_utc', 0))
+            self.store.stage_cursor(source, query, newest.get('name') or f"t3_{newest['id']}",
+                                    newest.get('created_utc', 0))
+        return items
+
     def search_reddit_api(self, subreddit: str, months_back: int = 6) -> List[Dict[str, Any]]:
-        """Search Reddit using API for posts from last N months"""
+        """Search Reddit using API for posts newer than the last one seen (or the last N months)"""
         access_token = self.get_reddit_access_token()
         if not access_token:
             print(f"Falling back to RSS for r/{subreddit}")
@@ -720,22 +953,10 @@ class RedditLeadRadar:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months_back * 30)  # Approximate months to days
         start_epoch = int(start_date.timestamp())
-        end_epoch = int(end_date.timestamp())
-
-        # Search queries for pet feeding topics
-        search_queries = [
-            'feeding help',
-            'feeding advice',
-            'meal plan',
-            'feeding schedule',
-            'portion sizes',
-            'diet help',
-            'nutrition questions'
-        ]
 
         all_posts = []
 
-        for query in search_queries:
+        for query in SUBREDDIT_SEARCH_QUERIES:
             try:
                 # Reddit search API
                 search_url = f'https://oauth.reddit.com/r/{subreddit}/search'
@@ -747,19 +968,16 @@ class RedditLeadRadar:
                     'restrict_sr': 'true'  # Restrict to this subreddit
                 }
 
-                response = requests.get(search_url, headers=headers, params=params, timeout=15)
-                response.raise_for_status()
+                posts_data = self._fetch_listing_since_cursor(search_url, headers, params,
+                                                              subreddit, query, start_epoch)
+                seen_ids = self.processed_ids.seen_among(p['id'] for p in posts_data)
 
-                data = response.json()
-                posts_data = data.get('data', {}).get('children', [])
-
-                for post_item in posts_data:
-                    post_data = post_item['data']
+                for post_data in posts_data:
                     post_id = post_data['id']
 
                     # Skip if already processed or too old
                     created_utc = post_data.get('created_utc', 0)
-                    if post_id in self.processed_ids or created_utc < start_epoch:
+                    if post_id in seen_ids or created_utc < start_epoch:
                         continue
 
                     # Skip blacklisted content
@@ -785,9 +1003,7 @@ class RedditLeadRadar:
 
                     all_posts.append(post_info)
                     self.processed_ids.add(post_id)
-
-                # Rate limiting between queries
-                time.sleep(1)
+                    seen_ids.add(post_id)
 
             except Exception as e:
                 print(f"Reddit API search error for r/{subreddit} query '{query}': {e}")
@@ -804,7 +1020,7 @@ class RedditLeadRadar:
         return unique_posts
 
     def search_reddit_sitewide(self, query: str, max_results: int = 25) -> List[Dict[str, Any]]:
-        """Search across all of Reddit for specific queries"""
+        """Search across all of Reddit for posts newer than the last one seen for a query"""
         access_token = self.get_reddit_access_token()
         if not access_token:
             print(f"No Reddit API access for sitewide search: {query}")
@@ -826,19 +1042,16 @@ class RedditLeadRadar:
                 'type': 'link'  # Only posts, not comments
             }
 
-            response = requests.get(search_url, headers=headers, params=params, timeout=15)
-            response.raise_for_status()
-
-            data = response.json()
-            posts_data = data.get('data', {}).get('children', [])
+            posts_data = self._fetch_listing_since_cursor(search_url, headers, params,
+                                                          SITEWIDE_CURSOR_SOURCE, query)
+            seen_ids = self.processed_ids.seen_among(p['id'] for p in posts_data)
 
             posts = []
-            for post_item in posts_data:
-                post_data = post_item['data']
+            for post_data in posts_data:
                 post_id = post_data['id']
 
                 # Skip if already processed
-                if post_id in self.processed_ids:
+                if post_id in seen_ids:
                     continue
 
                 # Skip blacklisted content
@@ -865,6 +1078,7 @@ class RedditLeadRadar:
 
                 posts.append(post_info)
                 self.processed_ids.add(post_id)
+                seen_ids.add(post_id)
 
             return posts
 
@@ -874,39 +1088,16 @@ class RedditLeadRadar:
 
     def monitor_megathreads(self) -> tuple[int, int]:
         """Monitor comments in known megathread posts"""
-        total_comments = 0
-        total_leads = 0
-
-        megathreads = self.megathreads.get("megathreads", [])
-        for megathread in megathreads:
-            subreddit = megathread["subreddit"]
-            post_id = megathread["post_id"]
-
-            print(f"Monitoring megathread in r/{subreddit}: {post_id}")
-
-            # Fetch recent comments from this megathread
-            comments = self.fetch_reddit_comments(post_id, subreddit)
-
-            for comment in comments:
-                self.save_comment(comment)
-                total_comments += 1
-
-                # Check if comment became a lead
-                if comment.get('final_score', 0) >= self.seed_questions.get("scoring_config", {}).get("min_score_threshold", 0.6):
-                    total_leads += 1
-
-            # Rate limiting between megathreads
-            time.sleep(1)
+        metrics = self._new_cycle_metrics()
+        pending: Dict[Future, tuple] = {}
+        self._submit_megathreads(pending)
+        self._drain_fetches(pending, metrics)
 
-        return total_comments, total_leads
+        return metrics['megathread_comments'], metrics['leads_found']
 
-    def run_ingestion_cycle(self):
-        """Run one complete ingestion cycle with comprehensive metrics"""
-        start_time = time.time()
-        print(f"Starting ingestion cycle at {datetime.now().strftime('%H:%M:%S')}")
-
-        # Metrics tracking
-        metrics = {
+    def _new_cycle_metrics(self) -> Dict[str, Any]:
+        """Empty metrics dict for one ingestion cycle"""
+        return {
             'subreddit_posts': 0,
             'subreddit_comments': 0,
             'sitewide_posts': 0,
@@ -914,95 +1105,182 @@ class RedditLeadRadar:
             'total_processed': 0,
             'leads_found': 0,
             'subreddit_breakdown': {},
-            'start_time': start_time
+            'arrivals': {},  # created_utc of new posts per subreddit, for the scheduler
+            'start_time': time.time()
         }
 
-        # Process subreddit streams
-        for subreddit_config in self.subreddits_config.get("subreddits", []):
-            subreddit_name = subreddit_config["name"]
-            subreddit_posts = 0
-            subreddit_comments = 0
-            subreddit_leads = 0
+    def _submit(self, pending: Dict[Future, tuple], stage: str, source: str, fn, *args, **kwargs):
+        """Queue one fetch on the engine and remember which pipeline stage consumes it"""
+        def task():
+            # Rate-limit waits on this thread are charged to the source
+            self._fetch_context.source = source
+            with self.timings.time('source_fetch', stage=stage, source=source):
+                return fn(*args, **kwargs)
+
+        pending[self.fetch_engine.submit(task)] = (stage, source)
 
+    def _submit_subreddits(self, pending: Dict[Future, tuple], only: Optional[Collection[str]] = None):
+        """Queue the post search for every non read-only subreddit (or just those in only)"""
+        for policy in self.policies:
             # Skip read-only subreddits
-            if "read_only" in subreddit_config.get("tags", []):
+            if policy.read_only:
+                continue
+            if only is not None and policy.name not in only:
                 continue
 
-            print(f"Processing r/{subreddit_name}...")
-
+            subreddit_name = policy.name
+            print(f"Queueing r/{subreddit_name}...")
             # Fetch posts (try API first, fallback to RSS)
-            posts = self.search_reddit_api(subreddit_name, months_back=6)
-
-            for post in posts:
-                self.save_post(post)
-                subreddit_posts += 1
-                metrics['subreddit_posts'] += 1
-
-                # Check if it became a lead
-                if post.get('final_score', 0) >= self.seed_questions.get("scoring_config", {}).get("min_score_threshold", 0.6):
-                    subreddit_leads += 1
-                    metrics['leads_found'] += 1
-
-                # Fetch and process comments for this post
-                if self.subreddits_config.get("include_comments", True):
-                    comments = self.fetch_reddit_comments(post['id'], subreddit_name)
-                    for comment in comments:
-                        self.save_comment(comment)
-                        subreddit_comments += 1
+            self._submit(pending, 'subreddit', subreddit_name,
+                         self.search_reddit_api, subreddit_name, months_back=6)
+
+    def _submit_sitewide(self, pending: Dict[Future, tuple]):
+        """Queue every configured sitewide search"""
+        max_results = self.search_queries.get("max_results_per_query", 25)
+        for query_config in self.search_queries.get("queries", []):
+            query = query_config["query"]
+            print(f"Queueing sitewide search for: '{query}'")
+            self._submit(pending, 'sitewide', query, self.search_reddit_sitewide, query, max_results)
+
+    def _submit_megathreads(self, pending: Dict[Future, tuple]):
+        """Queue a comment fetch for every known megathread"""
+        for megathread in self.megathreads.get("megathreads", []):
+            subreddit = megathread["subreddit"]
+            post_id = megathread["post_id"]
+            print(f"Queueing megathread in r/{subreddit}: {post_id}")
+            self._submit(pending, 'megathread', f"{subreddit}/{post_id}",
+                         self.fetch_thread_comments, post_id, subreddit)
+
+    def _drain_fetches(self, pending: Dict[Future, tuple], metrics: Dict[str, Any]):
+        """Score and persist fetch results as they complete, fanning out comment fetches.
+
+        Fetching happens on the engine's worker threads; scoring and the database writes
+        stay on this thread, so the store keeps a single writer.
+        """
+        include_comments = self.subreddits_config.get("include_comments", True)
+        # A sitewide hit in one of these may reach us before that subreddit's own search
+        # does; it gets the comment fetch that search would have given it
+        polled = {policy.name.lower() for policy in self.policies if not policy.read_only}
+
+        # Outstanding fetches per source, so each source is committed in one transaction
+        outstanding: Dict[str, int] = {}
+        for stage, source in pending.values():
+            outstanding[source] = outstanding.get(source, 0) + 1
+
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, source = pending.pop(future)
+                outstanding[source] -= 1
+
+                try:
+                    items = future.result()
+                except Exception as e:
+                    print(f"Fetch error in {stage} stage for {source}: {e}")
+                    items = []
+
+                if stage in ('subreddit', 'subreddit_comments'):
+                    breakdown = metrics['subreddit_breakdown'].setdefault(
+                        source, {'posts': 0, 'comments': 0, 'leads': 0})
+                if stage == 'subreddit':
+                    metrics['arrivals'].setdefault(source, []).extend(
+                        item.get('created_utc') for item in items)
+
+                # Score each fetched listing as one batch
+                for item, scored in zip(items, self.score_batch(items)):
+                    if stage in ('subreddit', 'sitewide'):
+                        is_lead = self.save_post(item, scored)
+                    else:
+                        is_lead = self.save_comment(item, scored)
+                    metrics['total_processed'] += 1
+
+                    if is_lead:
+                        metrics['leads_found'] += 1
+
+                    if stage == 'subreddit':
+                        metrics['subreddit_posts'] += 1
+                        breakdown['posts'] += 1
+                        breakdown['leads'] += is_lead
+
+                        # Fetch and process comments for this post
+                        if include_comments:
+                            self._submit(pending, 'subreddit_comments', source,
+                                         self.fetch_reddit_comments, item['id'], source)
+                            outstanding[source] += 1
+                    elif stage == 'subreddit_comments':
                         metrics['subreddit_comments'] += 1
+                        breakdown['comments'] += 1
+                        breakdown['leads'] += is_lead
+                    elif stage == 'sitewide':
+                        metrics['sitewide_posts'] += 1
+
+                        # Fetch comments for high-scoring posts from sitewide search
+                        if include_comments and (scored['final_score'] >= 0.3 or
+                                                 item['subreddit'].lower() in polled):
+                            self._submit(pending, 'sitewide_comments', source,
+                                         self.fetch_reddit_comments, item['id'], item['subreddit'])
+                            outstanding[source] += 1
+                    elif stage == 'megathread':
+                        metrics['megathread_comments'] += 1
+
+                # Cursors only advance once the items they cover are buffered
+                if stage == 'subreddit':
+                    self.store.release_cursors(source)
+                elif stage == 'sitewide':
+                    self.store.release_cursors(SITEWIDE_CURSOR_SOURCE, source)
+                elif stage == 'megathread':
+                    self.store.release_cursors(THREAD_CURSOR_PREFIX + source.split('/', 1)[1])
+
+                # One transaction per source once all of its fetches are in
+                if outstanding[source] == 0:
+                    self.store.flush()
+
+    def fetch_and_score(self, metrics: Dict[str, Any], due: Optional[Collection[str]] = None):
+        """Fetch, score and buffer every source (or only the due ones) in this process"""
+        # All three streams share one pipeline: subreddit posts (+ comments),
+        # sitewide searches and megathread comments
+        pending: Dict[Future, tuple] = {}
+        self._submit_subreddits(pending, only=due)
+        if due is None or SITEWIDE_SOURCE in due:
+            self._submit_sitewide(pending)
+        if due is None or MEGATHREAD_SOURCE in due:
+            self._submit_megathreads(pending)
+        self._drain_fetches(pending, metrics)
+
+    def start_shards(self, workers: int):
+        """Fetch and score in worker processes from now on (see sharding.py)"""
+        self.shard_pool = ShardPool(self, workers)
+
+    def write_shard_rows(self, batch: Dict[str, List[Dict[str, Any]]]):
+        """Write rows a shard worker scored and push its leads to live dashboards"""
+        self.store.write_batch(batch)
+        for row in batch.get('leads', []):
+            self.events.publish('lead', self.lead_payload(row))
+
+    def run_ingestion_cycle(self, due: Optional[Collection[str]] = None) -> Dict[str, Any]:
+        """Run one ingestion cycle with comprehensive metrics (all sources, or only the due ones)"""
+        start_time = time.time()
+        print(f"Starting ingestion cycle at {datetime.now().strftime('%H:%M:%S')}")
+        self.reload_matcher_if_changed()
 
-                        # Check if comment became a lead
-                        if comment.get('final_score', 0) >= self.seed_questions.get("scoring_config", {}).get("min_score_threshold", 0.6):
-                            subreddit_leads += 1
-                            metrics['leads_found'] += 1
+        # Metrics tracking
+        metrics = self._new_cycle_metrics()
+        self.timings.reset_cycle()
 
-            metrics['total_processed'] += subreddit_posts + subreddit_comments
-            metrics['subreddit_breakdown'][subreddit_name] = {
-                'posts': subreddit_posts,
-                'comments': subreddit_comments,
-                'leads': subreddit_leads
-            }
+        if self.shard_pool:
+            self.shard_pool.run_cycle(due, metrics)
+        else:
+            self.fetch_and_score(metrics, due)
 
-            # Rate limiting
-            time.sleep(2)
+        # Make sure everything scored this cycle is on disk before the queue is built
+        self.store.flush()
+        self.validators.save()
+        self._record_polls(due, metrics)
 
-        # Perform sitewide searches
-        print("Performing sitewide searches...")
-        search_queries = self.search_queries.get("queries", [])
-        for query_config in search_queries:
-            query = query_config["query"]
-            max_results = self.search_queries.get("max_results_per_query", 25)
-
-            print(f"Searching sitewide for: '{query}'")
-            search_posts = self.search_reddit_sitewide(query, max_results)
-
-            for post in search_posts:
-                self.save_post(post)
-                metrics['sitewide_posts'] += 1
-                metrics['total_processed'] += 1
-
-                # Check if it became a lead
-                if post.get('final_score', 0) >= self.seed_questions.get("scoring_config", {}).get("min_score_threshold", 0.6):
-                    metrics['leads_found'] += 1
-
-                # Fetch comments for high-scoring posts from sitewide search
-                if self.subreddits_config.get("include_comments", True) and post.get('final_score', 0) >= 0.3:
-                    comments = self.fetch_reddit_comments(post['id'], post['subreddit'])
-                    for comment in comments:
-                        self.save_comment(comment)
-                        metrics['total_processed'] += 1
-                        if comment.get('final_score', 0) >= self.seed_questions.get("scoring_config", {}).get("min_score_threshold", 0.6):
-                            metrics['leads_found'] += 1
-
-            # Rate limiting between searches
-            time.sleep(2)
-
-        # Monitor megathreads
-        print("Monitoring megathread comments...")
-        megathread_comments, megathread_leads = self.monitor_megathreads()
-        metrics['megathread_comments'] += megathread_comments
-        metrics['total_processed'] += megathread_comments
-        metrics['leads_found'] += megathread_leads
+        # Backfill is one-time; later cycles only follow the cursors
+        if self.backfill:
+            print("Backfill complete, switching to incremental cursor ingestion")
+            self.backfill = False
 
         # Calculate and display comprehensive metrics
         end_time = time.time()
@@ -1039,80 +1317,187 @@ class RedditLeadRadar:
         print("PERFORMANCE METRICS:")
         print(f"  Items/second: {metrics['total_processed']/duration:.1f}")
         print(f"  Leads/second: {metrics['leads_found']/duration:.2f}")
+        print(f"  Rate-limit waits: {self.rate_limiter.wait_seconds:.1f}s total, {self.rate_limiter.throttled} throttled (429) responses")
+        if self.validators.not_modified or self.validators.unchanged_bodies:
+            print(f"  Unchanged RSS feeds skipped: {self.validators.not_modified} not modified (304), "
+                  f"{self.validators.unchanged_bodies} identical bodies")
+        print()
+
+        # Fetch stages run on several threads at once, so their totals can exceed the duration
+        print("TIME BY STAGE (summed across threads):")
+        for stage, histogram in self.timings.stage_totals():
+            print(f"  {stage}: {histogram.sum:.2f}s in {histogram.count} "
+                  f"(p50 {histogram.quantile(0.5) * 1000:.0f} ms, p95 {histogram.quantile(0.95) * 1000:.0f} ms)")
+        for labels, histogram in self.timings.slowest('source_fetch'):
+            print(f"  slowest source: {labels['source']} ({labels['stage']}) "
+                  f"{histogram.sum:.2f}s in {histogram.count} fetches")
         print(f"{'='*60}")
 
         # Generate lead queue JSON
-        self.generate_lead_queue(metrics)
+        with self.timings.time('queue_generation'):
+            self.generate_lead_queue(metrics)
+        self.export_metrics(metrics, duration)
+        return metrics
+
+    def export_metrics(self, metrics: Dict[str, Any], duration: float):
+        """Write the cycle's stage timings to the JSON sidecar and the Prometheus textfile"""
+        cycle = {
+            'duration_seconds': round(duration, 3),
+            'items_processed': metrics['total_processed'],
+            'leads_found': metrics['leads_found'],
+            'rate_limit_wait_seconds': round(self.rate_limiter.wait_seconds, 3),
+            'throttled': self.rate_limiter.throttled,
+        }
+        gauges = {
+            'last_cycle_duration_seconds': ('Wall time of the last ingestion cycle', duration),
+            'last_cycle_items': ('Items processed in the last ingestion cycle', metrics['total_processed']),
+            'last_cycle_leads': ('Leads found in the last ingestion cycle', metrics['leads_found']),
+            'last_cycle_timestamp_seconds': ('When the last ingestion cycle finished', time.time()),
+        }
+        if self.fast_lane:
+            gauges['fast_lane_alerts'] = ('Fast-lane alerts sent since startup', self.fast_lane.sink.sent)
+        try:
+            self.timings.export(self.prometheus_path, self.metrics_json_path, cycle, gauges)
+        except Exception as e:
+            print(f"Failed to export cycle metrics: {e}")
 
     def generate_lead_queue(self, metrics=None):
         """Generate lead queue JSON file"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.store.flush()
+        cursor = self.store.conn.cursor()
 
-        cursor.execute('''
-            SELECT * FROM leads
+        cursor.execute(f'''
+            SELECT {', '.join(LEAD_COLUMNS)} FROM leads
             WHERE reviewed = 0
             ORDER BY score DESC, created_at DESC
             LIMIT 50
         ''')
 
-        leads = []
-        for row in cursor.fetchall():
-            # Determine engagement mode based on subreddit
-            subreddit_config = next((s for s in self.subreddits_config.get("subreddits", [])
-                                   if s["name"] == row[3]), {})
-            engagement_mode = "no_promo" if "no_promo" in subreddit_config.get("tags", []) else "link_ok"
-
-            lead = {
-                'id': row[0],
-                'post_id': row[1],
-                'comment_id': row[2],  # New field for comments
-                'subreddit': row[3],
-                'author': row[4],
-                'title': row[5],
-                'content': row[6],
-                'url': row[7],
-                'score': row[8],
-                'species': row[9],
-                'intent_matches': json.loads(row[10] or '[]'),
-                'semantic_matches': json.loads(row[11] or '[]'),
-                'draft_reply': row[12],
-                'entities': json.loads(row[14] or '{}'),  # Extracted age, weight, conditions
-                'engagement_mode': engagement_mode,  # no_promo or link_ok
-                'created_at': row[13]
-            }
-            leads.append(lead)
-
-        with open('lead_queue.json', 'w') as f:
-            json.dump({
-                'leads': leads,
-                'generated_at': time.time(),
-                'stats': {
-                    'total_scanned': metrics.get('total_processed', 0) if metrics else 0,
-                    'leads_found': metrics.get('leads_found', 0) if metrics else 0,
-                    'high_intent': len([l for l in leads if l.get('score', 0) > 0.8]),
-                    'emergencies': 0  # Could be tracked separately if needed
-                }
-            }, f, indent=2)
+        leads = [self.lead_payload(row) for row in cursor.fetchall()]
 
-        conn.close()
+        stats = {
+            'total_scanned': metrics.get('total_processed', 0) if metrics else 0,
+            'leads_found': metrics.get('leads_found', 0) if metrics else 0,
+            'high_intent': len([l for l in leads if l.get('score', 0) > 0.8]),
+            'emergencies': 0  # Could be tracked separately if needed
+        }
+        changes = self.publisher.publish(leads, stats, self._reviewed_lead_ids)
 
         if leads:
-            print(f"Generated lead queue with {len(leads)} high-potential opportunities")
+            print(f"Generated lead queue with {len(leads)} high-potential opportunities "
+                  f"({changes} changes, feed seq {self.publisher.seq})")
             # Could add notification here (email, Discord webhook, etc.)
 
-    def run_continuous(self):
-        """Run continuous monitoring"""
+    def lead_payload(self, lead: Union[tuple, Dict[str, Any]]) -> Dict[str, Any]:
+        """Dashboard/API shape of a leads row (a LEAD_COLUMNS tuple or a buffered row dict)"""
+        if not isinstance(lead, dict):
+            lead = dict(zip(LEAD_COLUMNS, lead))
+        return {
+            'id': lead['id'],
+            'post_id': lead.get('post_id'),
+            'comment_id': lead.get('comment_id'),  # New field for comments
+            'subreddit': lead.get('subreddit'),
+            'author': lead.get('author'),
+            'title': lead.get('title'),
+            'content': lead.get('content'),
+            'url': lead.get('url'),
+            'score': lead.get('score'),
+            'species': lead.get('species'),
+            'intent_matches': json.loads(lead.get('intent_matches') or '[]'),
+            'semantic_matches': json.loads(lead.get('semantic_matches') or '[]'),
+            'draft_reply': lead.get('draft_reply'),
+            'entities': Entities.from_columns(lead).to_dict(),  # Extracted age, weight, conditions
+            # Determine engagement mode based on subreddit
+            'engagement_mode': self.policies.get(lead.get('subreddit')).engagement_mode,  # no_promo or link_ok
+            'created_at': lead.get('created_at')
+        }
+
+    def _add_lead(self, row: Dict[str, Any]):
+        """Buffer a lead row and push it to any live dashboards"""
+        self.store.add_lead(row)
+        self.events.publish('lead', self.lead_payload(row))
+
+    def mark_reviewed(self, lead_ids: List[str], reviewed: bool = True) -> int:
+        """Set the reviewed flag on leads (called from API threads); returns rows updated"""
+        lead_ids = list(lead_ids)
+        updated = 0
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                for start in range(0, len(lead_ids), MAX_REVIEW_IDS):
+                    chunk = lead_ids[start:start + MAX_REVIEW_IDS]
+                    placeholders = ', '.join('?' * len(chunk))
+                    updated += conn.execute(
+                        f'UPDATE leads SET reviewed = ? WHERE id IN ({placeholders})',
+                        [1 if reviewed else 0] + chunk
+                    ).rowcount
+        finally:
+            conn.close()
+        self.events.publish('review', {'ids': lead_ids, 'reviewed': reviewed})
+        return updated
+
+    def _reviewed_lead_ids(self, lead_ids: List[str]) -> Set[str]:
+        """Which of these leads have been marked reviewed"""
+        placeholders = ', '.join('?' * len(lead_ids))
+        rows = self.store.conn.execute(
+            f'SELECT id FROM leads WHERE reviewed = 1 AND id IN ({placeholders})', lead_ids
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def _record_polls(self, due: Optional[Collection[str]], metrics: Dict[str, Any]):
+        """Feed this cycle's arrivals and leads back into the poll schedule"""
+        polled = list(self.scheduler.sources) if due is None else due
+        for source in polled:
+            if source in (SITEWIDE_SOURCE, MEGATHREAD_SOURCE):
+                self.scheduler.record(source, [])
+                continue
+            breakdown = metrics['subreddit_breakdown'].get(source, {})
+            self.scheduler.record(source, metrics['arrivals'].get(source, []),
+                                  leads=breakdown.get('leads', 0))
+        self.scheduler.save()
+
+    def start_fast_lane(self) -> Optional[FastLane]:
+        """Start the emergency fast lane unless fast_lane.enabled is false in subreddits.json"""
+        config = self.subreddits_config.get("fast_lane", {})
+        if self.fast_lane is None and config.get("enabled", True):
+            self.fast_lane = FastLane(self, config)
+            # Cycle fetches (or shard workers, from their next cycle) keep what the fast lane doesn't
+            self.rate_limiter.set_share(self.cycle_rate_share())
+            self.fast_lane.start()
+        return self.fast_lane
+
+    def cycle_rate_share(self) -> float:
+        """Fraction of the client's rate limit left for ingestion cycles"""
+        return 1.0 - self.fast_lane.rate_share if self.fast_lane else 1.0
+
+    def run_continuous(self, fast_lane: bool = True):
+        """Run continuous monitoring, polling each source when the adaptive schedule says it is due"""
         polling_interval = self.subreddits_config.get("polling_interval_seconds", 600)
+        scheduler = self.scheduler
 
         print(f"Reddit Lead Radar starting continuous monitoring")
-        print(f"Checking every {polling_interval} seconds")
+        print(f"Subreddits: adaptive, every {scheduler.min_interval:.0f}-{scheduler.max_interval:.0f} seconds "
+              f"within {scheduler.poll_budget_per_hour:.0f} polls/hour")
+        print(f"Sitewide searches and megathreads: every {polling_interval} seconds")
+        if fast_lane:
+            self.start_fast_lane()
         print(f"Press Ctrl+C to stop\n")
 
         while True:
             try:
-                self.run_ingestion_cycle()
-                time.sleep(polling_interval)
+                # Sources falling due within the next minute share one round
+                due = scheduler.due(horizon=60)
+                if due:
+                    self.run_ingestion_cycle(due)
+                    print("FASTEST POLLED SUBREDDITS:")
+                    for line in scheduler.summary():
+                        print(f"  r/{line}")
+                    print(f"Planned polls/hour: {scheduler.polls_per_hour():.0f}\n")
+                idle = scheduler.seconds_until_due()
+                if idle >= self.retention.policy.min_idle_seconds and self.retention.is_due():
+                    # Finish well before the next poll is due
+                    self.compact(deadline=time.time() + idle - 30)
+                time.sleep(max(scheduler.seconds_until_due(), 1.0))
             except KeyboardInterrupt:
                 print("\nStopping monitoring...")
                 break
@@ -1124,17 +1509,166 @@ class RedditLeadRadar:
         """Run a single ingestion cycle"""
         self.run_ingestion_cycle()
 
-def main():
-    """Main entry point"""
-    import sys
+    def compact(self, deadline: Optional[float] = None, full: bool = False):
+        """Apply the retention policy: archive old rows, strip low-score bodies, VACUUM.
+
+        A database created before incremental auto-vacuum was the default is converted
+        by the first compaction, scheduled or not (a one-time full VACUUM). ``full``
+        (--compact) also merges the search index.
+        """
+        self.store.flush()
+        start = time.time()
+        size_before = self.retention.database_bytes()
+        if self.retention.enable_incremental_vacuum():
+            print("Converted leads.db to incremental auto-vacuum (one-time full VACUUM)")
+        try:
+            stats = self.retention.run(deadline=deadline, optimize=full)
+        except Exception as e:
+            print(f"Compaction failed: {e}")
+            return
+        size_after = self.retention.database_bytes()
+        print(f"Compaction finished in {time.time() - start:.1f}s: "
+              f"archived {stats.get('posts_archived', 0)} posts, {stats.get('comments_archived', 0)} comments, "
+              f"{stats.get('leads_archived', 0)} reviewed leads; stripped {stats.get('bodies_stripped', 0)} bodies; "
+              f"freed {stats.get('pages_freed', 0)} pages; leads.db {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+    def explain_query_plans(self):
+        """Print SQLite's plan for each hot query, to check index usage"""
+        print(f"leads.db schema version {self.store.schema_version}")
+        for name, plan in explain_queries(self.store.conn).items():
+            print(f"\n{name}:")
+            for line in plan:
+                print(f"  {line}")
+
+    def print_search(self, text: str, target: str = 'all', subreddit: Optional[str] = None,
+                     species: Optional[str] = None, since_days: Optional[float] = None,
+                     limit: int = 20):
+        """Print BM25-ranked full-text matches from leads.db"""
+        start = time.time()
+        results = search(self.store.conn, text, target, subreddit=subreddit, species=species,
+                         since=days_ago(since_days), limit=limit)
+        print(f"{len(results)} matches for {text!r} in {target} ({(time.time() - start) * 1000:.0f} ms)")
+        for result in results:
+            created = datetime.fromtimestamp(result['created_at']).strftime('%Y-%m-%d') \
+                if result['created_at'] else '?'
+            print(f"\n[{result['type']}] r/{result['subreddit'] or '?'} {created} "
+                  f"score {result['score'] or 0:.2f} {result['species'] or ''}")
+            if result['title']:
+                print(f"  {result['title']}")
+            print(f"  {result['snippet']}")
+            if result['url']:
+                print(f"  {result['url']}")
+
+    def use_reddit_at(self, base_url: str):
+        """Send all Reddit traffic to a stand-in server (replay.py) instead of reddit.com"""
+        redirect_to(self.http, base_url, pool_maxsize=self.fetch_engine.max_in_flight)
+        self.reddit_base_url = base_url
+        # The stand-in accepts any credentials
+        self.reddit_client_id = self.reddit_client_id or 'replay'
+        self.reddit_client_secret = self.reddit_client_secret or 'replay'
+        self.reddit_access_token = None
 
-    radar = RedditLeadRadar()
+    def record_responses(self, directory: Union[str, Path]) -> Path:
+        """Append every Reddit response from now on to a fixture file for --replay"""
+        # One file per process, so shard workers never interleave their writes
+        path = Path(directory) / f"reddit-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"
+        record_to(self.http, path)
+        self.record_dir = Path(directory)
+        return path
+
+    def close(self):
+        """Stop fetch threads and shard workers, flush buffered rows and release the database connection"""
+        if self.fast_lane:
+            self.fast_lane.stop()
+            self.fast_lane = None
+        if self.shard_pool:
+            self.shard_pool.close()
+            self.shard_pool = None
+        self.fetch_engine.shutdown(cancel_pending=True)
+        self.http.close()
+        self.validators.save()
+        self.scheduler.save()
+        self.processed_ids.close()
+        self.store.close()
 
-    if len(sys.argv) > 1 and sys.argv[1] == '--once':
-        print("Running single ingestion cycle...")
-        radar.run_once()
-    else:
-        radar.run_continuous()
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Reddit Lead Radar for Paws & Plates")
+    parser.add_argument('--once', action='store_true', help="Run a single ingestion cycle")
+    parser.add_argument('--backfill', action='store_true',
+                        help="Page subreddit searches back 6 months on the first cycle "
+                             "instead of only fetching items newer than the stored cursors")
+    parser.add_argument('--rescore', action='store_true',
+                        help="Rescore every stored post and comment with the current configs, "
+                             "rebuild the leads table and lead_queue.json, then exit")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for --rescore (default: CPU count), or to shard "
+                             "fetching and scoring across for --once and continuous runs (default: off)")
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help="Rows per rescore chunk (default: 2000)")
+    parser.add_argument('--explain', action='store_true',
+                        help="Print EXPLAIN QUERY PLAN for the hot leads.db queries and exit")
+    parser.add_argument('--compact', action='store_true',
+                        help="Archive old rows, strip low-score bodies and VACUUM leads.db "
+                             "per config/retention.json, then exit")
+    parser.add_argument('--search', metavar='QUERY',
+                        help="Full-text search stored posts, comments and leads, then exit")
+    parser.add_argument('--search-in', choices=SEARCH_TARGETS + ('all',), default='all',
+                        help="What --search looks in (default: all)")
+    parser.add_argument('--subreddit', help="Only --search results from this subreddit")
+    parser.add_argument('--species', help="Only --search results for this species")
+    parser.add_argument('--since-days', type=float, help="Only --search results from the last N days")
+    parser.add_argument('--limit', type=int, default=20, help="Maximum --search results (default: 20)")
+    parser.add_argument('--serve', action='store_true',
+                        help="Serve the dashboard, lead API and live event stream while running")
+    parser.add_argument('--host', default='127.0.0.1', help="Address for --serve (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port for --serve (default: 8765)")
+    parser.add_argument('--no-fast-lane', action='store_true',
+                        help="Don't poll /new for emergency and intent alerts between full cycles")
+    parser.add_argument('--record', metavar='DIR',
+                        help="Save every Reddit response to a fixture file in DIR (for --replay)")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Answer Reddit requests from fixtures recorded with --record instead of reddit.com")
+    args = parser.parse_args()
+
+    radar = RedditLeadRadar(backfill=args.backfill)
+    server = None
+    fixture_server = None
+    if args.serve:
+        server = LeadServer(radar, host=args.host, port=args.port)
+        server.start()
+    if args.replay:
+        fixtures = RecordedFixtures(args.replay)
+        fixture_server = FixtureServer(fixtures).start()
+        radar.use_reddit_at(fixture_server.url)
+        print(f"Replaying {len(fixtures)} recorded responses from {args.replay}")
+    if args.record:
+        print(f"Recording Reddit responses to {radar.record_responses(args.record)}")
+    ingesting = not (args.explain or args.compact or args.search or args.rescore)
+    if args.workers and args.workers > 1 and ingesting:
+        radar.start_shards(args.workers)
+
+    try:
+        if args.explain:
+            radar.explain_query_plans()
+        elif args.compact:
+            radar.compact(full=True)
+        elif args.search:
+            radar.print_search(args.search, args.search_in, subreddit=args.subreddit,
+                               species=args.species, since_days=args.since_days, limit=args.limit)
+        elif args.rescore:
+            rescore_database(radar, workers=args.workers, chunk_size=args.chunk_size)
+        elif args.once:
+            print("Running single ingestion cycle...")
+            radar.run_once()
+        else:
+            radar.run_continuous(fast_lane=not args.no_fast_lane)
+    finally:
+        if server:
+            server.stop()
+        if fixture_server:
+            fixture_server.stop()
+        radar.close()
 
 if __name__ == '__main__':
     main()
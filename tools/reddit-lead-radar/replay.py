@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Record/replay for Reddit Lead Radar
+Records the Reddit responses a radar run receives (OAuth listings, searches,
+comment trees, RSS) into JSONL fixtures, and serves them back from a local HTTP
+server that stands in for oauth.reddit.com and www.reddit.com. The same server
+can generate a synthetic corpus of any size, which benchmark.py uses.
+
+    python replay.py serve --fixtures fixtures/ --port 8766
+    python replay.py serve --synthetic 10000 --port 0
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from bisect import bisect_left
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+REDDIT_HOSTS = ('https://oauth.reddit.com', 'https://www.reddit.com')
+
+# Paging cursors: a replayed listing is matched without them
+VOLATILE_PARAMS = ('before', 'after', 'count')
+
+# Response headers worth keeping in a fixture
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+TOKEN_PATH = '/api/v1/access_token'
+
+# Reddit's /new listings stop about this many posts back
+NEW_LISTING_DEPTH = 1000
+
+# (status, headers, body)
+Reply = Tuple[int, Dict[str, str], bytes]
+
+
+def fixture_key(method: str, url: str, ignore: Sequence[str] = ()) -> str:
+    """Stable lookup key for a request: method, host, path and sorted query"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k not in ignore)
+    return f"{method.upper()} {parts.netloc}{parts.path}?{urlencode(query)}"
+
+
+def record_to(session: requests.Session, path: Union[str, Path]):
+    """Append every response the session receives to a JSONL fixture file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = threading.Lock()
+
+    def save(response: requests.Response, *args, **kwargs):
+        request = response.request
+        url = getattr(request, 'reddit_url', request.url)  # before any RedirectAdapter rewrite
+        if not url.startswith(REDDIT_HOSTS) or url.endswith(TOKEN_PATH):
+            return  # never store credentials
+        record = {
+            'key': fixture_key(request.method, url),
+            'url': url,
+            'status': response.status_code,
+            'headers': {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers},
+            'body': response.text,
+            'recorded_at': time.time()
+        }
+        with lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+    session.hooks['response'].append(save)
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Sends requests for a Reddit host to base_url/<host>/<path> instead"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.reddit_url = request.url
+        request.url = f"{self.base_url}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+        return super().send(request, **kwargs)
+
+
+def redirect_to(session: requests.Session, base_url: str, pool_maxsize: int = 10):
+    """Point a session's Reddit traffic at a FixtureServer"""
+    for host in REDDIT_HOSTS:
+        session.mount(host, RedirectAdapter(base_url, pool_maxsize=pool_maxsize))
+
+
+def _json_reply(payload: Any, status: int = 200) -> Reply:
+    return status, {'Content-Type': 'application/json'}, json.dumps(payload).encode()
+
+
+def _token_reply() -> Reply:
+    return _json_reply({'access_token': 'replay', 'token_type': 'bearer', 'expires_in': 86400})
+
+
+class RecordedFixtures:
+    """Serves recorded responses, falling back to a match that ignores paging cursors"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.exact: Dict[str, Reply] = {}
+        self.loose: Dict[str, Reply] = {}
+        for path in sorted(Path(directory).glob('*.jsonl')):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    reply = (record['status'], record.get('headers', {}), record['body'].encode('utf-8'))
+                    # Later recordings of the same request win
+                    self.exact[record['key']] = reply
+                    self.loose[fixture_key('GET', record['url'], VOLATILE_PARAMS)] = reply
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def respond(self, method: str, url: str) -> Optional[Reply]:
+        if url.endswith(TOKEN_PATH):
+            return _token_reply()
+        return (self.exact.get(fixture_key(method, url)) or
+                self.loose.get(fixture_key(method, url, VOLATILE_PARAMS)))
+
+
+def _base36(value: int) -> str:
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while value:
+        value, remainder = divmod(value, 36)
+        out = digits[remainder] + out
+    return out or '0'
+
+
+SPECIES = ('dog', 'cat', 'puppy', 'kitten', 'rabbit', 'bearded dragon', 'parrot', 'hamster', 'ferret')
+CONDITIONS = ('allergies', 'kidney disease', 'a sensitive stomach', 'diabetes', 'pancreatitis')
+FOODS = ('chicken and rice', 'raw food', 'homemade meals', 'kibble', 'fresh vegetables')
+LEAD_TITLES = (
+    'What should I feed my {age} year old {species}?',
+    'Homemade diet for my {species} with {condition}?',
+    'How much {food} should a {weight} lb {species} eat?',
+    'Need a meal plan for my {species}',
+    'Is {food} safe for a {species} with {condition}?',
+)
+OTHER_TITLES = (
+    'Look at my {species} sleeping',
+    'Vet visit went well today',
+    'My {species} learned a new trick',
+    'Best toys for a bored {species}?',
+    'Adopted a {species} last week!',
+)
+BODIES = (
+    'My {age} year old {species} weighs {weight} lbs and has {condition}.',
+    'We have been feeding {food} but she seems hungry all the time.',
+    'The vet suggested changing the diet, any advice on portions?',
+    'Just wanted to share, thanks for reading.',
+    'He is doing great and loves the new routine.',
+)
+
+
+class SyntheticReddit:
+    """Deterministic fake Reddit: `posts` posts spread over subreddits and search queries.
+
+    Post i lives in subreddit i % len(subreddits) and matches query
+    (i // len(subreddits)) % len(queries); lower indexes are newer. Listings
+    honour limit, before and after, so cursor ingestion and backfill paging work.
+    """
+
+    def __init__(self, posts: int, subreddits: Sequence[str], queries: Sequence[str],
+                 comments_per_post: int = 2, seed: int = 0, now: Optional[float] = None,
+                 spacing_seconds: float = 20.0):
+        self.posts = posts
+        self.subreddits = list(subreddits)
+        self.queries = list(queries)
+        self.comments_per_post = comments_per_post
+        self.seed = seed
+        self.now = now if now is not None else time.time()
+        self.spacing = spacing_seconds
+        self._subreddit_index = {name.lower(): i for i, name in enumerate(self.subreddits)}
+        self._query_index = {query: i for i, query in enumerate(self.queries)}
+
+    def post_id(self, index: int) -> str:
+        return f"p{_base36(index)}"
+
+    def post_index(self, post_id: str) -> Optional[int]:
+        try:
+            return int(post_id[1:], 36) if post_id.startswith('p') else None
+        except ValueError:
+            return None
+
+    def _fill(self, rng: random.Random, template: str) -> str:
+        return template.format(species=rng.choice(SPECIES), condition=rng.choice(CONDITIONS),
+                               food=rng.choice(FOODS), age=rng.randint(1, 14),
+                               weight=rng.randint(2, 90))
+
+    def post(self, index: int) -> Dict[str, Any]:
+        rng = random.Random(self.seed * 1000003 + index)
+        subreddit = self.subreddits[index % len(self.subreddits)]
+        titles = LEAD_TITLES if rng.random() < 0.3 else OTHER_TITLES
+        post_id = self.post_id(index)
+        return {
+            'id': post_id,
+            'name': f't3_{post_id}',
+            'subreddit': subreddit,
+            'author': f'user{rng.randint(1, 5000)}',
+            'title': self._fill(rng, rng.choice(titles)),
+            'selftext': ' '.join(self._fill(rng, rng.choice(BODIES)) for _ in range(rng.randint(1, 3))),
+            'permalink': f'/r/{subreddit}/comments/{post_id}/synthetic/',
+            'score': rng.randint(0, 50),
+            'num_comments': self.comments_per_post,
+            'created_utc': self.now - index * self.spacing
+        }
+
+    def comments(self, post_id: str) -> List[Dict[str, Any]]:
+        index = self.post_index(post_id) or 0
+        rng = random.Random(self.seed * 7919 + index)
+        created = self.now - index * self.spacing
+        return [{'kind': 't1', 'data': {
+            'id': f'{post_id}c{j}',
+            'name': f't1_{post_id}c{j}',
+            'parent_id': f't3_{post_id}',
+            'author': f'user{rng.randint(1, 5000)}',
+            'body': self._fill(rng, rng.choice(BODIES)),
+            'score': rng.randint(0, 20),
+            'created_utc': created + 60 * (j + 1),
+            'depth': 0
+        }} for j in range(self.comments_per_post)]
+
+    def _bucket(self, subreddit: Optional[int], query: Optional[int]) -> range:
+        """Post indexes in one (subreddit, query) listing, newest first"""
+        if subreddit is None:
+            return range(0, self.posts)
+        start = subreddit
+        step = len(self.subreddits)
+        if query is not None:
+            start += query * step
+            step *= len(self.queries)
+        return range(start, self.posts, step)
+
+    def _new_indexes(self, names: str) -> Sequence[int]:
+        """Post indexes in /r/<names>/new, where names may be a multireddit (a+b+c)"""
+        selected = {self._subreddit_index[name] for name in names.lower().split('+')
+                    if name in self._subreddit_index}
+        if len(selected) == len(self.subreddits):
+            return self._bucket(None, None)
+        if len(selected) == 1:
+            return self._bucket(selected.pop(), None)
+        step = len(self.subreddits)
+        return [i for i in range(min(self.posts, NEW_LISTING_DEPTH)) if i % step in selected]
+
+    def _listing(self, indexes: Sequence[int], params: Dict[str, str]) -> Dict[str, Any]:
+        limit = min(int(params.get('limit', 25)), 100)
+        position = 0
+        if params.get('after'):
+            after = self.post_index(params['after'].split('_', 1)[-1])
+            position = len(indexes) if after is None else _bisect_range(indexes, after + 1)
+            page = indexes[position:position + limit]
+        elif params.get('before'):
+            before = self.post_index(params['before'].split('_', 1)[-1])
+            end = 0 if before is None else _bisect_range(indexes, before)
+            page = indexes[max(0, end - limit):end]
+        else:
+            page = indexes[:limit]
+        children = [{'kind': 't3', 'data': self.post(i)} for i in page]
+        more = len(page) == limit and page[-1] != indexes[-1] if page else False
+        return {'kind': 'Listing', 'data': {
+            'children': children,
+            'after': children[-1]['data']['name'] if more else None,
+            'before': None
+        }}
+
+    def _rss(self, indexes: Sequence[int]) -> bytes:
+        entries = []
+        for index in indexes[:25]:
+            post = self.post(index)
+            updated = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(post['created_utc']))
+            entries.append(
+                f"<entry><id>t3_{post['id']}</id><title>{escape(post['title'])}</title>"
+                f"<link href=\"https://www.reddit.com{post['permalink']}\"/>"
+                f"<author><name>/u/{post['author']}</name></author>"
+                f"<category term=\"{post['subreddit']}\" label=\"r/{post['subreddit']}\"/>"
+                f"<published>{updated}</published><updated>{updated}</updated>"
+                f"<content type=\"html\">{escape(post['selftext'])}</content></entry>")
+        feed = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<feed xmlns="http://www.w3.org/2005/Atom">' + ''.join(entries) + '</feed>')
+        return feed.encode('utf-8')
+
+    def respond(self, method: str, url: str) -> Optional[Reply]:
+        parts = urlsplit(url)
+        params = dict(parse_qsl(parts.query))
+        segments = [s for s in parts.path.split('/') if s]
+        if parts.path.endswith(TOKEN_PATH):
+            return _token_reply()
+
+        if segments[:1] == ['r'] and len(segments) >= 2:
+            if segments[2:3] == ['new']:
+                indexes = self._new_indexes(segments[1])
+                if parts.path.endswith('.rss'):
+                    return 200, {'Content-Type': 'application/atom+xml'}, self._rss(indexes)
+                return _json_reply(self._listing(indexes, params))
+            subreddit = self._subreddit_index.get(segments[1].lower())
+            if subreddit is None:
+                return _json_reply({'kind': 'Listing', 'data': {'children': [], 'after': None}})
+            if segments[2:3] == ['search']:
+                query = self._query_index.get(params.get('q', ''))
+                return _json_reply(self._listing(self._bucket(subreddit, query), params))
+            if segments[2:3] == ['comments'] and len(segments) >= 4:
+                post_id = segments[3]
+                index = self.post_index(post_id)
+                post = [{'kind': 't3', 'data': self.post(index)}] if index is not None and index < self.posts else []
+                return _json_reply([{'kind': 'Listing', 'data': {'children': post}},
+                                    {'kind': 'Listing', 'data': {'children': self.comments(post_id)}}])
+        if segments == ['search']:
+            # Sitewide search: the newest posts across all subreddits (mostly already seen)
+            return _json_reply(self._listing(self._bucket(None, None), params))
+        if segments == ['api', 'morechildren']:
+            return _json_reply({'json': {'data': {'things': []}}})
+        return None
+
+
+def _bisect_range(indexes: Sequence[int], value: int) -> int:
+    """Position of the first index >= value in an ascending range (or sorted list)"""
+    if not isinstance(indexes, range):
+        return bisect_left(indexes, value)
+    if value <= indexes.start:
+        return 0
+    return min(len(indexes), -(-(value - indexes.start) // indexes.step))
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Maps /<reddit host>/<path>?<query> to the backend's reply"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    backend = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, method: str):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        host, _, rest = self.path.lstrip('/').partition('/')
+        reply = self.backend.respond(method, f"https://{host}/{rest}")
+        if reply is None:
+            reply = _json_reply({'error': 404, 'message': 'no fixture'}, 404)
+        status, headers, body = reply
+
+        if status == 200 and 'ETag' in headers and self.headers.get('If-None-Match') == headers['ETag']:
+            status, body = 304, b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply('GET')
+
+    def do_POST(self):
+        self._reply('POST')
+
+
+class FixtureServer:
+    """Local stand-in for Reddit, on a background thread"""
+
+    def __init__(self, backend, host: str = '127.0.0.1', port: int = 0):
+        handler = type('BoundFixtureHandler', (FixtureHandler,), {'backend': backend})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fixture-http', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def synthetic_backend(posts: int, comments_per_post: int = 2, seed: int = 0,
+                      config_dir: Union[str, Path] = 'config') -> SyntheticReddit:
+    """A SyntheticReddit over the radar's configured subreddits and search queries"""
+    from reddit_lead_radar import SUBREDDIT_SEARCH_QUERIES
+
+    config_path = Path(__file__).parent / config_dir / 'subreddits.json'
+    with open(config_path, 'r', encoding='utf-8') as f:
+        subreddits = [s['name'] for s in json.load(f).get('subreddits', [])]
+    return SyntheticReddit(posts, subreddits, SUBREDDIT_SEARCH_QUERIES,
+                           comments_per_post=comments_per_post, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic Reddit responses")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="Run the stand-in server until interrupted")
+    source = serve.add_mutually_exclusive_group(required=True)
+    source.add_argument('--fixtures', help="Directory of recorded *.jsonl fixtures")
+    source.add_argument('--synthetic', type=int, metavar='POSTS', help="Generate a corpus of POSTS posts")
+    serve.add_argument('--comments-per-post', type=int, default=2)
+    serve.add_argument('--seed', type=int, default=0)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8766, help="0 picks a free port")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        backend = RecordedFixtures(args.fixtures)
+        description = f"{len(backend)} recorded responses from {args.fixtures}"
+    else:
+        backend = synthetic_backend(args.synthetic, args.comments_per_post, args.seed)
+        description = f"synthetic corpus of {args.synthetic} posts"
+
+    server = FixtureServer(backend, args.host, args.port)
+    # First line is read by benchmark.py to find the port
+    print(f"Serving {description} at {server.url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
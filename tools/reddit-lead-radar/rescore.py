@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Offline rescoring for Reddit Lead Radar
+Streams posts and comments out of leads.db in rowid-ordered chunks, scores them
+in a process pool with the current configs, writes the new scores back in one
+transaction per chunk and re-decides which rows are leads.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from entities import ENTITY_COLUMNS
+from storage import connect
+
+# Keyset pagination: each chunk starts after the last rowid of the previous one,
+# so memory stays bounded and no OFFSET scans are needed
+CHUNK_QUERIES = {
+    'posts': '''
+        SELECT rowid, id, subreddit, author, title, body, url, created_utc, processed_at
+        FROM posts
+        WHERE rowid > ?
+        ORDER BY rowid
+        LIMIT ?
+    ''',
+    # Comments don't store their subreddit: take it from the parent post or the
+    # comment's existing lead row (megathread posts are resolved from the config)
+    'comments': '''
+        SELECT c.rowid, c.id, c.post_id, c.author, c.body, c.created_utc, c.processed_at,
+               COALESCE(p.subreddit, l.subreddit)
+        FROM comments c
+        LEFT JOIN posts p ON p.id = c.post_id
+        LEFT JOIN leads l ON l.id = 'lead_comment_' || c.id
+        WHERE c.rowid > ?
+        ORDER BY c.rowid
+        LIMIT ?
+    ''',
+}
+
+# Typed entity columns (storage migration 4) as SQL fragments
+ENTITY_NAMES = ', '.join(ENTITY_COLUMNS)
+ENTITY_PARAMS = ', '.join(f':{c}' for c in ENTITY_COLUMNS)
+ENTITY_SET = ', '.join(f'{c} = :{c}' for c in ENTITY_COLUMNS)
+ENTITY_EXCLUDED = ', '.join(f'{c} = excluded.{c}' for c in ENTITY_COLUMNS)
+
+UPDATE_POST_SQL = f'''
+    UPDATE posts SET intent_score = :intent_score, semantic_score = :semantic_score,
+        final_score = :final_score, is_emergency = :is_emergency, species = :species,
+        tags = :tags, draft_reply = :draft_reply, intent_matches = :intent_matches,
+        {ENTITY_SET}
+    WHERE id = :id
+'''
+
+UPDATE_COMMENT_SQL = f'''
+    UPDATE comments SET intent_score = :intent_score, semantic_score = :semantic_score,
+        final_score = :final_score, is_emergency = :is_emergency, species = :species,
+        tags = :tags, intent_matches = :intent_matches,
+        {ENTITY_SET}
+    WHERE id = :id
+'''
+
+# Existing leads keep their reviewed flag and original created_at
+UPSERT_LEAD_SQL = f'''
+    INSERT INTO leads (id, post_id, comment_id, subreddit, author, title, content, url,
+                       score, species, intent_matches, semantic_matches, draft_reply,
+                       created_at, {ENTITY_NAMES})
+    VALUES (:id, :post_id, :comment_id, :subreddit, :author, :title, :content, :url,
+            :score, :species, :intent_matches, :semantic_matches, :draft_reply,
+            :created_at, {ENTITY_PARAMS})
+    ON CONFLICT(id) DO UPDATE SET
+        subreddit = excluded.subreddit,
+        title = excluded.title,
+        score = excluded.score,
+        species = excluded.species,
+        intent_matches = excluded.intent_matches,
+        draft_reply = excluded.draft_reply,
+        {ENTITY_EXCLUDED}
+'''
+
+# Reviewed leads are history; only unreviewed ones drop out of the queue
+DELETE_LEAD_SQL = 'DELETE FROM leads WHERE id = ? AND reviewed = 0'
+
+# Per-process state, set up once by _init_worker
+_radar = None
+_megathread_subreddits: Dict[str, str] = {}
+
+
+def _init_worker(config_dir: str, megathread_subreddits: Dict[str, str]):
+    """Build a scoring-only radar in each worker process"""
+    global _radar, _megathread_subreddits
+    from reddit_lead_radar import RedditLeadRadar
+
+    _radar = RedditLeadRadar.for_scoring(config_dir)
+    _megathread_subreddits = megathread_subreddits
+
+
+def _items_from_rows(table: str, rows: List[tuple]) -> List[Dict[str, Any]]:
+    if table == 'posts':
+        return [{
+            'id': row[1], 'subreddit': row[2], 'author': row[3], 'title': row[4] or '',
+            'body': row[5] or '', 'url': row[6], 'created_utc': row[7] or 0.0,
+            'processed_at': row[8]
+        } for row in rows]
+
+    return [{
+        'id': row[1], 'post_id': row[2], 'author': row[3], 'body': row[4] or '',
+        'created_utc': row[5] or 0.0, 'processed_at': row[6],
+        'subreddit': row[7] or _megathread_subreddits.get(row[2])
+    } for row in rows]
+
+
+def _score_chunk(table: str, rows: List[tuple]) -> Dict[str, Any]:
+    """Score one chunk in a worker; returns the row updates and lead changes to apply"""
+    items = _items_from_rows(table, rows)
+    # Freshness as of when each row was first processed, so old rows aren't all demoted
+    nows = [item['processed_at'] or time.time() for item in items]
+    scored_items = _radar.score_batch(items, now=nows)
+
+    updates, leads, demoted = [], [], []
+    for item, scored in zip(items, scored_items):
+        tags = scored['subreddit_tags']
+        entity_columns = scored['entities'].columns()
+        draft_reply = _radar.generate_draft_reply(item, tags) if scored['is_lead'] else None
+        update = {
+            'id': item['id'],
+            'intent_score': scored['intent_score'],
+            'semantic_score': scored['semantic_score'],
+            'final_score': scored['final_score'],
+            'is_emergency': scored['is_emergency'],
+            'species': scored['species'],
+            'tags': json.dumps(tags),
+            'intent_matches': json.dumps(scored['intent_matches']),
+            **entity_columns
+        }
+        if table == 'posts':
+            update['draft_reply'] = draft_reply
+            lead_id = f"lead_{item['id']}"
+        else:
+            lead_id = f"lead_comment_{item['id']}"
+        updates.append(update)
+
+        if not scored['is_lead']:
+            demoted.append((lead_id,))
+            continue
+
+        if table == 'posts':
+            lead = {
+                'post_id': item['id'], 'comment_id': None, 'title': item['title'],
+                'content': item['body'], 'url': item['url']
+            }
+        else:
+            lead = {
+                'post_id': item['post_id'], 'comment_id': item['id'],
+                'title': f"Comment about: {scored['species']} feeding",
+                'content': item['body'],
+                'url': f"https://reddit.com/r/{item['subreddit']}/comments/{item['post_id']}/_/{item['id']}"
+            }
+        lead.update({
+            'id': lead_id,
+            'subreddit': item['subreddit'],
+            'author': item['author'],
+            'score': scored['final_score'],
+            'species': scored['species'],
+            'intent_matches': json.dumps(scored['intent_matches']),
+            'semantic_matches': json.dumps([]),
+            'draft_reply': draft_reply,
+            'created_at': time.time(),
+            **entity_columns
+        })
+        leads.append(lead)
+
+    return {'updates': updates, 'leads': leads, 'demoted': demoted}
+
+
+def iter_chunks(conn, table: str, chunk_size: int) -> Iterator[List[tuple]]:
+    """Yield rows of a table in rowid order, chunk_size at a time"""
+    last_rowid = 0
+    while True:
+        rows = conn.execute(CHUNK_QUERIES[table], (last_rowid, chunk_size)).fetchall()
+        if not rows:
+            return
+        last_rowid = rows[-1][0]
+        yield rows
+
+
+def _apply_chunk(conn, table: str, result: Dict[str, Any]):
+    """Write one scored chunk back in a single transaction"""
+    with conn:
+        conn.executemany(UPDATE_POST_SQL if table == 'posts' else UPDATE_COMMENT_SQL,
+                         result['updates'])
+        if result['leads']:
+            conn.executemany(UPSERT_LEAD_SQL, result['leads'])
+        if result['demoted']:
+            conn.executemany(DELETE_LEAD_SQL, result['demoted'])
+
+
+def rescore_database(radar, workers: Optional[int] = None, chunk_size: int = 2000) -> Dict[str, Any]:
+    """Rescore every post and comment in the radar's database and rebuild the lead queue"""
+    workers = workers or os.cpu_count() or 1
+    radar.store.flush()
+    write_conn = radar.store.conn
+    read_conn = connect(radar.db_path)
+
+    totals = {table: read_conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in CHUNK_QUERIES}
+    leads_before = read_conn.execute('SELECT COUNT(*) FROM leads').fetchone()[0]
+    megathread_subreddits = {m["post_id"]: m["subreddit"]
+                             for m in radar.megathreads.get("megathreads", [])}
+
+    print(f"Rescoring {totals['posts']} posts and {totals['comments']} comments "
+          f"with {workers} worker processes (chunks of {chunk_size})")
+
+    stats = {'rows': 0, 'leads': 0, 'demoted': 0, 'seconds': 0.0}
+    start = time.time()
+    # Spawned (not forked) workers: the parent has fetch threads and open connections
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(str(radar.config_dir), megathread_subreddits)) as pool:
+        for table in CHUNK_QUERIES:
+            done_rows = 0
+            chunks = iter_chunks(read_conn, table, chunk_size)
+            pending = set()
+            exhausted = False
+
+            while True:
+                # Keep a bounded window of chunks in flight
+                while not exhausted and len(pending) < workers * 2:
+                    rows = next(chunks, None)
+                    if rows is None:
+                        exhausted = True
+                    else:
+                        pending.add(pool.submit(_score_chunk, table, rows))
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    _apply_chunk(write_conn, table, result)
+
+                    done_rows += len(result['updates'])
+                    stats['rows'] += len(result['updates'])
+                    stats['leads'] += len(result['leads'])
+                    stats['demoted'] += len(result['demoted'])
+
+                    elapsed = time.time() - start
+                    rate = stats['rows'] / elapsed if elapsed > 0 else 0.0
+                    print(f"  {table}: {done_rows}/{totals[table]} rescored "
+                          f"({rate:.0f} rows/s overall)")
+
+    read_conn.close()
+    stats['seconds'] = time.time() - start
+    leads_after = write_conn.execute('SELECT COUNT(*) FROM leads').fetchone()[0]
+
+    print(f"Rescored {stats['rows']} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows'] / max(stats['seconds'], 1e-9):.0f} rows/s)")
+    print(f"Leads: {leads_before} before, {leads_after} after "
+          f"({stats['leads']} qualifying rows)")
+
+    radar.generate_lead_queue()
+    return stats
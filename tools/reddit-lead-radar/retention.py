@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Retention and compaction for Reddit Lead Radar
+Moves old rows out of leads.db into compressed monthly JSONL archives (items
+that never produced a lead go first, lead-bearing ones much later), drops the
+bodies of old low-score items, records archived IDs so they are never
+re-ingested, and hands freed pages back to the filesystem with incremental
+VACUUM.
+"""
+
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from storage import AUTO_VACUUM_INCREMENTAL
+
+try:
+    import zstandard
+except ImportError:  # gzip is always available
+    zstandard = None
+
+DAY = 86400
+
+# Created-time column and the leads join that marks a row as lead-bearing
+ARCHIVE_TABLES = {
+    'posts': ('created_utc', 'leads.post_id = posts.id'),
+    'comments': ('created_utc', 'leads.comment_id = comments.id'),
+}
+
+
+
+@dataclass
+class RetentionPolicy:
+    """Settings from config/retention.json"""
+    archive_after_days: float = 90        # items that never produced a lead
+    lead_archive_after_days: float = 365  # lead-bearing items, once their leads are reviewed
+    strip_body_after_days: float = 30
+    strip_body_below_score: float = 0.3
+    archive_dir: str = 'archive'
+    batch_size: int = 2000
+    vacuum_pages: int = 4000              # pages released per incremental VACUUM run
+    compact_every_hours: float = 24
+    min_idle_seconds: float = 120         # continuous mode only compacts when idle this long
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RetentionPolicy":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in config.items() if k in known})
+
+
+def _compress(data: bytes) -> bytes:
+    """One zstd frame or gzip member; either can be appended to an existing archive"""
+    if zstandard:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def iter_archive(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Rows stored in one archive file (.jsonl.zst or .jsonl.gz)"""
+    path = Path(path)
+    with open(path, 'rb') as raw:
+        if path.suffix == '.zst':
+            if zstandard is None:
+                raise RuntimeError(f"Reading {path.name} needs the zstandard package")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = gzip.GzipFile(fileobj=raw)
+        for line in io.TextIOWrapper(stream, encoding='utf-8'):
+            if line.strip():
+                yield json.loads(line)
+
+
+class RetentionEngine:
+    """Applies a RetentionPolicy to leads.db in small transactions"""
+
+    def __init__(self, conn: sqlite3.Connection, policy: RetentionPolicy, archive_dir: Union[str, Path]):
+        self.conn = conn
+        self.policy = policy
+        self.archive_dir = Path(archive_dir)
+        self.suffix = '.jsonl.zst' if zstandard else '.jsonl.gz'
+        self.last_run = 0.0
+
+    def is_due(self, now: Optional[float] = None) -> bool:
+        now = now if now is not None else time.time()
+        return now - self.last_run >= self.policy.compact_every_hours * 3600
+
+    def run(self, now: Optional[float] = None, deadline: Optional[float] = None,
+            optimize: bool = False) -> Dict[str, int]:
+        """One retention pass; stops between batches once deadline (unix time) passes"""
+        now = now if now is not None else time.time()
+        policy = self.policy
+        stats: Dict[str, int] = defaultdict(int)
+
+        def out_of_time() -> bool:
+            return deadline is not None and time.time() >= deadline
+
+        # Non-lead items first: they are the bulk of the database and nobody looks at them again
+        cutoff = now - policy.archive_after_days * DAY
+        for table, (created, lead_join) in ARCHIVE_TABLES.items():
+            stats[f'{table}_archived'] += self._archive(
+                table, f'{created} < ? AND NOT EXISTS (SELECT 1 FROM leads WHERE {lead_join})',
+                [cutoff], created, out_of_time)
+
+        # Then the items behind reviewed leads, and the leads themselves. Items go first so a
+        # rescore can't resurrect an archived lead; unreviewed leads are never archived.
+        lead_cutoff = now - policy.lead_archive_after_days * DAY
+        for table, (created, lead_join) in ARCHIVE_TABLES.items():
+            stats[f'{table}_archived'] += self._archive(
+                table, f'{created} < ? AND NOT EXISTS '
+                       f'(SELECT 1 FROM leads WHERE {lead_join} AND leads.reviewed = 0)',
+                [lead_cutoff], created, out_of_time)
+        if not out_of_time():
+            stats['leads_archived'] += self._archive(
+                'leads', 'reviewed = 1 AND created_at < ?', [lead_cutoff], 'created_at', out_of_time)
+
+        if not out_of_time():
+            stats['bodies_stripped'] = self._strip_bodies(now - policy.strip_body_after_days * DAY,
+                                                          out_of_time)
+        if optimize and not out_of_time():
+            self.optimize_search_index()
+        if not out_of_time():
+            stats['pages_freed'] = self.incremental_vacuum(policy.vacuum_pages)
+
+        self.last_run = now
+        return dict(stats)
+
+    def _archive(self, table: str, where: str, params: List[Any], created_column: str,
+                 out_of_time) -> int:
+        """Archive and delete matching rows in rowid-ordered batches"""
+        archived = 0
+        last_rowid = 0
+        while not out_of_time():
+            cursor = self.conn.execute(
+                f'SELECT rowid, * FROM {table} WHERE {where} AND rowid > ? ORDER BY rowid LIMIT ?',
+                params + [last_rowid, self.policy.batch_size])
+            columns = [d[0] for d in cursor.description][1:]
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            records = [dict(zip(columns, row[1:])) for row in rows]
+
+            # The archive is written (and synced) before the rows go, so a crash can at
+            # worst archive a batch twice, never lose it
+            self._write_archive(table, records, created_column)
+            rowids = [row[0] for row in rows]
+            placeholders = ', '.join('?' * len(rowids))
+            archived_at = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO archived_ids (id, kind, archived_at) VALUES (?, ?, ?)',
+                    [(record['id'], table, archived_at) for record in records])
+                self.conn.execute(f'DELETE FROM {table} WHERE rowid IN ({placeholders})', rowids)
+            archived += len(rows)
+        return archived
+
+    def _write_archive(self, table: str, records: List[Dict[str, Any]], created_column: str):
+        """Append records to <table>-<YYYY-MM> files by creation month"""
+        by_month: Dict[str, List[str]] = defaultdict(list)
+        for record in records:
+            month = time.strftime('%Y-%m', time.gmtime(record.get(created_column) or 0))
+            by_month[month].append(json.dumps(record, separators=(',', ':')) + '\n')
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        for month, lines in by_month.items():
+            path = self.archive_dir / f'{table}-{month}{self.suffix}'
+            with open(path, 'ab') as f:
+                f.write(_compress(''.join(lines).encode('utf-8')))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _strip_bodies(self, cutoff: float, out_of_time) -> int:
+        """Drop the text of old low-score items that never produced a lead (IDs and scores stay)"""
+        threshold = self.policy.strip_body_below_score
+        statements = (
+            '''UPDATE posts SET body = NULL, draft_reply = NULL WHERE rowid IN (
+                   SELECT rowid FROM posts
+                   WHERE created_utc < ? AND final_score < ?
+                     AND (body IS NOT NULL OR draft_reply IS NOT NULL)
+                     AND NOT EXISTS (SELECT 1 FROM leads WHERE leads.post_id = posts.id)
+                   LIMIT ?)''',
+            '''UPDATE comments SET body = NULL WHERE rowid IN (
+                   SELECT rowid FROM comments
+                   WHERE created_utc < ? AND final_score < ? AND body IS NOT NULL
+                     AND NOT EXISTS (SELECT 1 FROM leads WHERE leads.comment_id = comments.id)
+                   LIMIT ?)''',
+        )
+        stripped = 0
+        for sql in statements:
+            while not out_of_time():
+                with self.conn:
+                    count = self.conn.execute(sql, (cutoff, threshold, self.policy.batch_size)).rowcount
+                stripped += count
+                if count < self.policy.batch_size:
+                    break
+        return stripped
+
+    def optimize_search_index(self):
+        """Merge the full-text index segments left behind by large deletes"""
+        with self.conn:
+            for table in ('posts', 'comments', 'leads'):
+                self.conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')")
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """Release up to `pages` free pages; returns how many were released"""
+        if self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return 0
+        before = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        # execute() stops after the first step (one page); executescript() runs it to completion
+        self.conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+        after = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return before - after
+
+    def enable_incremental_vacuum(self) -> bool:
+        """Switch leads.db to incremental auto-vacuum (a one-time full VACUUM); True if it ran"""
+        if self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return False
+        self.conn.execute(f'PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}')
+        self.conn.execute('VACUUM')
+        return True
+
+    def database_bytes(self) -> int:
+        """Allocated size of leads.db (page count x page size)"""
+        page_count = self.conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+        return page_count * page_size
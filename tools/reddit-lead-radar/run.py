@@ -7,11 +7,12 @@ Starts ingestion, scoring, and serves the dashboard
 import os
 import sys
 import subprocess
-import threading
 import time
 import webbrowser
 from pathlib import Path
 
+DASHBOARD_PORT = 8765
+
 def start_radar():
     """Start the Reddit Lead Radar system"""
     print("Starting Reddit Lead Radar for Paws & Plates")
@@ -50,30 +51,27 @@ def start_radar():
 
     print("\nStarting ingestion system...")
 
-    # Start the radar in a separate thread
-    def run_radar():
-        os.system('python reddit_lead_radar.py')
-
-    radar_thread = threading.Thread(target=run_radar, daemon=True)
-    radar_thread.start()
+    # Start the radar with its built-in dashboard server
+    radar_process = subprocess.Popen([sys.executable, 'reddit_lead_radar.py', '--serve',
+                                      '--port', str(DASHBOARD_PORT)])
 
     print("Waiting for first data collection (this may take a minute)...")
     time.sleep(5)  # Give it time to start
 
     # Open dashboard
-    dashboard_path = Path('dashboard.html').absolute()
-    print(f"\nOpening dashboard: {dashboard_path}")
+    dashboard_url = f'http://127.0.0.1:{DASHBOARD_PORT}/'
+    print(f"\nOpening dashboard: {dashboard_url}")
 
     try:
-        webbrowser.open(f'file://{dashboard_path}')
+        webbrowser.open(dashboard_url)
     except Exception as e:
         print(f"Could not auto-open dashboard: {e}")
-        print(f"Manually open: {dashboard_path}")
+        print(f"Manually open: {dashboard_url}")
 
     print("\n" + "=" * 60)
     print("Reddit Lead Radar is RUNNING!")
     print("=" * 60)
-    print("Dashboard: Check browser tab")
+    print(f"Dashboard: {dashboard_url} (live updates)")
     print("Ingestion: Running in background")
     print("Data: lead_queue.json updates automatically")
     print("Stop: Close this terminal or press Ctrl+C")
@@ -83,8 +81,13 @@ def start_radar():
     try:
         while True:
             time.sleep(1)
+            if radar_process.poll() is not None:
+                print(f"Radar exited with code {radar_process.returncode}")
+                sys.exit(radar_process.returncode)
     except KeyboardInterrupt:
         print("\n🛑 Shutting down Reddit Lead Radar...")
+        radar_process.terminate()
+        radar_process.wait()
         print("Thanks for helping pet parents find nutrition guidance!")
         sys.exit(0)
 
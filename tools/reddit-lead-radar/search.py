@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Full-text search for Reddit Lead Radar
+Queries the FTS5 indexes that storage.py keeps over posts, comments and leads,
+ranked by BM25, with optional subreddit / species / date filters applied to the
+matching rows.
+"""
+
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+MAX_RESULTS = 200
+
+# Title hits count more than body hits
+TITLE_WEIGHT = 5.0
+
+SEARCH_TARGETS = ('posts', 'comments', 'leads')
+
+# Per target: joined row columns, BM25 weights and the column used for snippets.
+# Comments don't store a subreddit, so it comes from the parent post.
+SEARCH_QUERIES = {
+    'posts': f'''
+        SELECT p.id, p.subreddit, p.title, snippet(posts_fts, 1, '[', ']', '...', 16),
+               p.url, p.created_utc, p.final_score, p.species,
+               bm25(posts_fts, {TITLE_WEIGHT}, 1.0) AS rank
+        FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid
+        WHERE posts_fts MATCH ? {{filters}}
+        ORDER BY rank LIMIT ?
+    ''',
+    'comments': '''
+        SELECT c.id, p.subreddit, p.title, snippet(comments_fts, 0, '[', ']', '...', 16),
+               c.post_id, c.created_utc, c.final_score, c.species,
+               bm25(comments_fts) AS rank
+        FROM comments_fts JOIN comments c ON c.rowid = comments_fts.rowid
+        LEFT JOIN posts p ON p.id = c.post_id
+        WHERE comments_fts MATCH ? {filters}
+        ORDER BY rank LIMIT ?
+    ''',
+    'leads': f'''
+        SELECT l.id, l.subreddit, l.title, snippet(leads_fts, 1, '[', ']', '...', 16),
+               l.url, l.created_at, l.score, l.species,
+               bm25(leads_fts, {TITLE_WEIGHT}, 1.0) AS rank
+        FROM leads_fts JOIN leads l ON l.rowid = leads_fts.rowid
+        WHERE leads_fts MATCH ? {{filters}}
+        ORDER BY rank LIMIT ?
+    ''',
+}
+
+# Table alias and created-time column the filters apply to
+FILTER_COLUMNS = {
+    'posts': ('p', 'created_utc'),
+    'comments': ('c', 'created_utc'),
+    'leads': ('l', 'created_at'),
+}
+
+TERM_PATTERN = re.compile(r'"([^"]+)"|(\w+\*?)')
+
+
+def match_query(text: str) -> str:
+    """Turn free text into an FTS5 MATCH expression.
+
+    Every word must match (in any order); "quoted phrases" must match as
+    phrases and a trailing * matches a prefix. Everything is quoted, so
+    punctuation and words like NOT or NEAR are searched for, not parsed.
+    """
+    terms = []
+    for phrase, word in TERM_PATTERN.findall(text):
+        if phrase:
+            terms.append('"' + phrase.replace('"', '') + '"')
+        elif word.endswith('*'):
+            terms.append(f'"{word[:-1]}"*')
+        else:
+            terms.append(f'"{word}"')
+    if not terms:
+        raise ValueError('search query has no words')
+    return ' '.join(terms)
+
+
+def search(conn: sqlite3.Connection, text: str, target: str = 'posts',
+           subreddit: Optional[str] = None, species: Optional[str] = None,
+           since: Optional[float] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """BM25-ranked matches for text in one target table (or 'all', merged by rank)"""
+    if target == 'all':
+        results = []
+        for name in SEARCH_TARGETS:
+            results.extend(search(conn, text, name, subreddit, species, since, limit))
+        results.sort(key=lambda r: r['rank'])
+        return results[:limit]
+    if target not in SEARCH_QUERIES:
+        raise ValueError(f"unknown search target {target!r} (expected one of "
+                         f"{', '.join(SEARCH_TARGETS)} or all)")
+
+    alias, created_column = FILTER_COLUMNS[target]
+    filters, args = [], [match_query(text)]
+    if subreddit:
+        # Comments take their subreddit from the joined post
+        column = 'p.subreddit' if target == 'comments' else f'{alias}.subreddit'
+        filters.append(f'AND {column} = ? COLLATE NOCASE')
+        args.append(subreddit)
+    if species:
+        filters.append(f'AND {alias}.species = ?')
+        args.append(species)
+    if since:
+        filters.append(f'AND {alias}.{created_column} >= ?')
+        args.append(since)
+    limit = min(max(int(limit), 1), MAX_RESULTS)
+    args.append(limit)
+
+    sql = SEARCH_QUERIES[target].format(filters=' '.join(filters))
+    results = []
+    for row in conn.execute(sql, args).fetchall():
+        item_id, sub, title, snippet, link, created, score, row_species, rank = row
+        if target == 'comments':
+            link = f"https://reddit.com/r/{sub}/comments/{link}/_/{item_id}" if sub else None
+        results.append({
+            'type': target[:-1],
+            'id': item_id,
+            'subreddit': sub,
+            'title': title,
+            'snippet': snippet,
+            'url': link,
+            'created_at': created,
+            'score': score,
+            'species': row_species,
+            'rank': rank
+        })
+    return results
+
+
+def days_ago(days: Optional[float]) -> Optional[float]:
+    """Unix time ``days`` days back (None passes through)"""
+    return time.time() - days * 86400 if days else None
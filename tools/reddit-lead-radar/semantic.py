@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Semantic similarity engines for Reddit Lead Radar
+Each engine indexes the seed questions once and scores batches of texts against
+the seed questions of each text's species. Engines:
+
+- embedding: sentence-transformers embeddings, cosine similarity (cached .npy)
+- tfidf: scikit-learn TF-IDF vectors, cosine similarity (cached pickle)
+- jaccard: word-set overlap, no dependencies
+
+An engine that can't be built (missing library, model download or load
+failure) falls back down that list. Unreadable caches are discarded and rebuilt.
+"""
+
+import hashlib
+import json
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from text_analysis import AnalyzedText
+
+# seed_questions.json keys that are not species seed lists
+NON_SEED_KEYS = ("emergency_keywords", "scoring_config")
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+SemanticInput = Union[str, AnalyzedText]
+
+
+def seed_index(seed_questions: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Species -> seed questions, skipping the non-seed config sections"""
+    return {
+        species: questions for species, questions in seed_questions.items()
+        if species not in NON_SEED_KEYS and isinstance(questions, list)
+    }
+
+
+def _fingerprint(seeds: Dict[str, List[str]], *extra: str) -> str:
+    """Short hash identifying a seed set (plus engine settings) for cache files"""
+    payload = json.dumps([seeds, extra], sort_keys=True).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+def _discard(cache_path: Path):
+    try:
+        cache_path.unlink()
+    except OSError:
+        pass
+
+
+def _lower(text: SemanticInput) -> str:
+    return text.lower if isinstance(text, AnalyzedText) else (text or '').lower()
+
+
+class JaccardEngine:
+    """Word-set Jaccard similarity against each seed question"""
+    name = "jaccard"
+
+    def __init__(self, seed_questions: Dict[str, List[str]]):
+        self.seed_word_sets = {
+            species: [set(question.lower().split()) for question in questions]
+            for species, questions in seed_questions.items()
+        }
+
+    def score_batch(self, texts: Sequence[SemanticInput],
+                    species: Sequence[Optional[str]]) -> List[float]:
+        """Best Jaccard similarity to the species' seed questions, per text"""
+        scores = []
+        for text, text_species in zip(texts, species):
+            if not text or not text_species:
+                scores.append(0.0)
+                continue
+
+            text_words = text.token_set if isinstance(text, AnalyzedText) else set(_lower(text).split())
+            max_score = 0.0
+            for seed_words in self.seed_word_sets.get(text_species, []):
+                total = len(text_words) + len(seed_words)
+                if total:
+                    intersection = len(text_words.intersection(seed_words))
+                    max_score = max(max_score, intersection / (total - intersection))
+            scores.append(max_score)
+        return scores
+
+
+class _MatrixEngine:
+    """Shared batch scoring for engines that embed seeds into one matrix.
+
+    Subclasses set ``seed_matrix`` (rows L2-normalized) and ``species_rows``
+    (species -> slice of seed_matrix rows) and implement ``_vectorize``.
+    """
+    name = "matrix"
+
+    seed_matrix: Any
+    species_rows: Dict[str, slice]
+
+    def _vectorize(self, texts: List[str]) -> Any:
+        raise NotImplementedError
+
+    def _similarities(self, vectors: Any) -> Any:
+        """Dense (texts x seeds) cosine similarity matrix"""
+        return vectors @ self.seed_matrix.T
+
+    def score_batch(self, texts: Sequence[SemanticInput],
+                    species: Sequence[Optional[str]]) -> List[float]:
+        """Best cosine similarity to the species' seed questions, one matrix multiply per batch"""
+        scores = [0.0] * len(texts)
+        wanted = [i for i, (text, text_species) in enumerate(zip(texts, species))
+                  if text and text_species in self.species_rows]
+        if not wanted:
+            return scores
+
+        similarities = self._similarities(self._vectorize([_lower(texts[i]) for i in wanted]))
+        for row, i in enumerate(wanted):
+            best = float(similarities[row, self.species_rows[species[i]]].max())
+            scores[i] = min(max(best, 0.0), 1.0)
+        return scores
+
+    @staticmethod
+    def _species_rows(seeds: Dict[str, List[str]]) -> Dict[str, slice]:
+        rows, start = {}, 0
+        for species, questions in seeds.items():
+            if questions:
+                rows[species] = slice(start, start + len(questions))
+                start += len(questions)
+        return rows
+
+
+class TfidfEngine(_MatrixEngine):
+    """TF-IDF cosine similarity; the fitted vectorizer and seed matrix are cached on disk"""
+    name = "tfidf"
+
+    def __init__(self, seed_questions: Dict[str, List[str]], cache_dir: Optional[Path] = None):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.species_rows = self._species_rows(seed_questions)
+        corpus = [q for questions in seed_questions.values() for q in questions]
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = Path(cache_dir) / f"tfidf-{_fingerprint(seed_questions)}.pkl"
+
+        cached = self._load(cache_path)
+        if cached is not None:
+            self.vectorizer, self.seed_matrix = cached
+        else:
+            self.vectorizer = TfidfVectorizer(lowercase=False, ngram_range=(1, 2), sublinear_tf=True)
+            self.seed_matrix = self.vectorizer.fit_transform([q.lower() for q in corpus])
+            self._save(cache_path)
+
+        # Sparse products are cheap; transpose once instead of per batch
+        self._seed_matrix_t = self.seed_matrix.T.tocsc()
+
+    def _load(self, cache_path: Optional[Path]):
+        if cache_path is None or not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                vectorizer, seed_matrix = pickle.load(f)
+            if seed_matrix.shape[0] != sum(s.stop - s.start for s in self.species_rows.values()):
+                raise ValueError(f"{seed_matrix.shape[0]} cached seed rows")
+            return vectorizer, seed_matrix
+        except Exception as e:
+            print(f"Discarding unreadable TF-IDF cache {cache_path}: {e}")
+            _discard(cache_path)
+            return None
+
+    def _save(self, cache_path: Optional[Path]):
+        if cache_path is None:
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                pickle.dump((self.vectorizer, self.seed_matrix), f)
+        except Exception as e:
+            print(f"Could not cache TF-IDF index: {e}")
+
+    def _vectorize(self, texts: List[str]) -> Any:
+        return self.vectorizer.transform(texts)
+
+    def _similarities(self, vectors: Any) -> Any:
+        return (vectors @ self._seed_matrix_t).toarray()
+
+
+class EmbeddingEngine(_MatrixEngine):
+    """Sentence-embedding cosine similarity; seed embeddings are cached as .npy"""
+    name = "embedding"
+
+    def __init__(self, seed_questions: Dict[str, List[str]], cache_dir: Optional[Path] = None,
+                 model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 64):
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        self.species_rows = self._species_rows(seed_questions)
+        corpus = [q for questions in seed_questions.values() for q in questions]
+
+        cache_path = None
+        if cache_dir is not None:
+            safe_model = model_name.replace('/', '_')
+            cache_path = Path(cache_dir) / f"embeddings-{safe_model}-{_fingerprint(seed_questions, model_name)}.npy"
+
+        self.seed_matrix = None
+        if cache_path is not None and cache_path.exists():
+            try:
+                self.seed_matrix = np.load(cache_path)
+                if self.seed_matrix.shape[0] != len(corpus):
+                    raise ValueError(f"{self.seed_matrix.shape[0]} cached seed rows")
+            except Exception as e:
+                print(f"Discarding unreadable seed embedding cache {cache_path}: {e}")
+                _discard(cache_path)
+                self.seed_matrix = None
+        if self.seed_matrix is None:
+            self.seed_matrix = self._encode([q.lower() for q in corpus])
+            if cache_path is not None:
+                try:
+                    cache_path.parent.mkdir(parents=True, exist_ok=True)
+                    np.save(cache_path, self.seed_matrix)
+                except Exception as e:
+                    print(f"Could not cache seed embeddings: {e}")
+
+    def _encode(self, texts: List[str]) -> Any:
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                 normalize_embeddings=True, show_progress_bar=False)
+
+    def _vectorize(self, texts: List[str]) -> Any:
+        return self._encode(texts)
+
+
+ENGINES = {
+    "embedding": EmbeddingEngine,
+    "tfidf": TfidfEngine,
+    "jaccard": JaccardEngine,
+}
+
+FALLBACK_ORDER = ("embedding", "tfidf", "jaccard")
+
+
+def create_engine(name: str, seed_questions: Dict[str, Any],
+                  cache_dir: Optional[Path] = None, **options):
+    """Build the configured engine, falling back to lighter ones if it can't be built"""
+    seeds = seed_index(seed_questions)
+    if name not in ENGINES:
+        print(f"Unknown semantic engine '{name}', using jaccard")
+        name = "jaccard"
+
+    for candidate in FALLBACK_ORDER[FALLBACK_ORDER.index(name):]:
+        try:
+            if candidate == "jaccard":
+                return JaccardEngine(seeds)
+            if candidate == "embedding":
+                return EmbeddingEngine(seeds, cache_dir=cache_dir, **options)
+            return TfidfEngine(seeds, cache_dir=cache_dir)
+        except Exception as e:
+            # Missing libraries, but also model downloads and loads that fail
+            print(f"Semantic engine '{candidate}' unavailable ({e}), falling back")
+    return JaccardEngine(seeds)
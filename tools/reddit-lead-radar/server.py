@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Embedded HTTP API for Reddit Lead Radar
+Serves the dashboard, paginated and filterable lead queries straight from
+leads.db, full-text search, a POST to mark leads reviewed, and a
+server-sent-events stream that pushes leads to open dashboards as soon as they
+are scored.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from search import search
+from storage import LEAD_COLUMNS, connect
+
+MAX_PAGE_SIZE = 200
+
+# Lead IDs accepted per review request (one UPDATE ... IN (...) stays well under SQLite's variable limit)
+MAX_REVIEW_IDS = 500
+
+# Events kept for clients reconnecting with Last-Event-ID
+REPLAY_BUFFER = 500
+
+# Seconds between SSE keep-alive comments
+KEEPALIVE_SECONDS = 15
+
+LEAD_SORT = 'ORDER BY score DESC, created_at DESC, id'
+
+
+class EventBroker:
+    """Fan-out of radar events to SSE subscribers; slow subscribers are dropped, not waited on"""
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: List[queue.Queue] = []
+        self._recent: deque = deque(maxlen=REPLAY_BUFFER)
+        self._next_id = 1
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        """Send one event to every subscriber (a no-op when nobody is listening)"""
+        with self._lock:
+            item = (self._next_id, event, data)
+            self._next_id += 1
+            self._recent.append(item)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(item)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+
+    def subscribe(self, last_event_id: int = 0) -> queue.Queue:
+        """New subscriber queue, pre-filled with buffered events after last_event_id"""
+        subscriber: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if last_event_id:
+                for item in self._recent:
+                    if item[0] > last_event_id and not subscriber.full():
+                        subscriber.put_nowait(item)
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+def build_lead_query(params: Dict[str, List[str]]) -> Tuple[str, List[Any], int, int]:
+    """WHERE clause, parameters, limit and offset for a /api/leads query string"""
+    def first(name: str) -> Optional[str]:
+        values = params.get(name)
+        return values[0] if values and values[0] != '' else None
+
+    clauses, args = [], []
+    reviewed = first('reviewed') or '0'
+    if reviewed != 'all':
+        clauses.append('reviewed = ?')
+        args.append(1 if reviewed in ('1', 'true') else 0)
+    if first('subreddit'):
+        clauses.append('subreddit = ? COLLATE NOCASE')
+        args.append(first('subreddit'))
+    if first('species'):
+        clauses.append('species = ?')
+        args.append(first('species'))
+    if first('min_score'):
+        clauses.append('score >= ?')
+        args.append(float(first('min_score')))
+    if first('max_score'):
+        clauses.append('score <= ?')
+        args.append(float(first('max_score')))
+
+    limit = min(max(int(first('limit') or 50), 1), MAX_PAGE_SIZE)
+    offset = max(int(first('offset') or 0), 0)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, args, limit, offset
+
+
+class LeadRequestHandler(BaseHTTPRequestHandler):
+    """Routes for the dashboard, /api/leads, /api/search, /api/leads/review and /api/events"""
+
+    server_version = 'RedditLeadRadar/1.0'
+    # Set on the subclass created by LeadServer
+    radar = None
+    static_files: Dict[str, Path] = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Any, status: int = 200):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == '/api/leads':
+                self._get_leads(parse_qs(url.query))
+            elif url.path == '/api/search':
+                self._search(parse_qs(url.query))
+            elif url.path == '/api/events':
+                self._stream_events()
+            elif url.path in self.static_files:
+                self._send_static(self.static_files[url.path])
+            else:
+                self._send_json({'error': 'not found'}, 404)
+        except (ValueError, TypeError, sqlite3.OperationalError) as e:
+            self._send_json({'error': str(e)}, 400)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _cross_origin(self) -> bool:
+        """True for a browser request from a page on another origin"""
+        origin = self.headers.get('Origin')
+        if not origin:
+            return False
+        # Sandboxed frames and file:// pages send the literal "null"
+        return origin == 'null' or urlparse(origin).netloc.lower() != (self.headers.get('Host') or '').lower()
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/api/leads/review':
+            self._send_json({'error': 'not found'}, 404)
+            return
+        # Another site's page can't send a JSON content type without a CORS
+        # preflight (which this server never grants), and browsers send Origin
+        if self._cross_origin():
+            self._send_json({'error': 'cross-origin requests are not allowed'}, 403)
+            return
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._send_json({'error': 'Content-Type must be application/json'}, 415)
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            ids = [str(lead_id) for lead_id in body.get('ids', [])]
+            reviewed = bool(body.get('reviewed', True))
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json({'error': f'invalid body: {e}'}, 400)
+            return
+        if not ids:
+            self._send_json({'error': 'ids is required'}, 400)
+            return
+        if len(ids) > MAX_REVIEW_IDS:
+            self._send_json({'error': f'at most {MAX_REVIEW_IDS} ids per request'}, 400)
+            return
+
+        updated = self.radar.mark_reviewed(ids, reviewed)
+        self._send_json({'updated': updated})
+
+    def _get_leads(self, params: Dict[str, List[str]]):
+        where, args, limit, offset = build_lead_query(params)
+        conn = connect(self.radar.db_path)
+        try:
+            total = conn.execute(f'SELECT COUNT(*) FROM leads {where}', args).fetchone()[0]
+            rows = conn.execute(f"SELECT {', '.join(LEAD_COLUMNS)} FROM leads {where} {LEAD_SORT} "
+                                'LIMIT ? OFFSET ?',
+                                args + [limit, offset]).fetchall()
+        finally:
+            conn.close()
+
+        leads = [self.radar.lead_payload(row) for row in rows]
+        next_offset = offset + len(leads) if offset + len(leads) < total else None
+        self._send_json({'leads': leads, 'total': total, 'offset': offset,
+                         'limit': limit, 'next_offset': next_offset})
+
+    def _search(self, params: Dict[str, List[str]]):
+        """BM25-ranked matches: q, in (posts/comments/leads/all), subreddit, species, since, limit"""
+        def first(name: str) -> Optional[str]:
+            values = params.get(name)
+            return values[0] if values and values[0] != '' else None
+
+        conn = connect(self.radar.db_path)
+        try:
+            results = search(conn, first('q') or '', first('in') or 'all',
+                             subreddit=first('subreddit'), species=first('species'),
+                             since=float(first('since') or 0) or None,
+                             limit=int(first('limit') or 20))
+        finally:
+            conn.close()
+        self._send_json({'results': results})
+
+    def _send_static(self, path: Path):
+        """Serve a dashboard file, honouring single byte-range requests (for the change feed)"""
+        if not path.exists():
+            self._send_json({'error': 'not found'}, 404)
+            return
+        data = path.read_bytes()
+        content_type = {'.html': 'text/html; charset=utf-8', '.json': 'application/json',
+                        '.jsonl': 'application/x-ndjson'}.get(path.suffix, 'application/octet-stream')
+
+        byte_range = self.headers.get('Range', '')
+        if byte_range.startswith('bytes=') and byte_range.endswith('-'):
+            start = int(byte_range[6:-1] or 0)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(data)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+            data = data[start:]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_events(self):
+        """Server-sent events: 'lead' for newly scored leads, 'review' for reviewed ones"""
+        last_event_id = int(self.headers.get('Last-Event-ID') or 0)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Connection', 'keep-alive')
+        self.end_headers()
+
+        broker = self.radar.events
+        subscriber = broker.subscribe(last_event_id)
+        try:
+            while not self.server.stopping.is_set():
+                try:
+                    event_id, event, data = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                    message = f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+                except queue.Empty:
+                    message = ': keepalive\n\n'
+                self.wfile.write(message.encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            broker.unsubscribe(subscriber)
+
+
+class LeadServer:
+    """Runs the API on a background thread inside the radar process"""
+
+    def __init__(self, radar, host: str = '127.0.0.1', port: int = 8765):
+        static_dir = Path(__file__).parent
+        handler = type('BoundLeadRequestHandler', (LeadRequestHandler,), {
+            'radar': radar,
+            'static_files': {
+                '/': static_dir / 'dashboard.html',
+                '/dashboard.html': static_dir / 'dashboard.html',
+                '/lead_queue.json': radar.publisher.snapshot_path,
+                '/lead_changes.jsonl': radar.publisher.feed_path,
+            }
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name='radar-http', daemon=True)
+        self._thread.start()
+        print(f"Dashboard and API at {self.url}")
+
+    def stop(self):
+        self.httpd.stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
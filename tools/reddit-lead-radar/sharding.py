@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Sharded ingestion for Reddit Lead Radar
+Splits subreddits, sitewide queries and megathreads across worker processes
+that fetch and score their shard in parallel. Scored rows travel back over a
+queue to the radar process, which stays the only writer of leads.db, publishes
+lead events and builds the lead queue. The Reddit rate limit is divided evenly
+between the workers. Item IDs are claimed in a shared registry as listings
+arrive, so a post found by two shards (a sitewide search hit in another
+shard's subreddit) is processed, and its comments fetched, by only one.
+"""
+
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.managers import BaseManager
+from typing import Any, Collection, Dict, Iterable, List, Optional, Set
+
+from reddit_common.ratelimit import RateLimiter
+from reddit_common.scheduler import AdaptiveScheduler
+from reddit_common.conditional import ValidatorCache
+from dedup import DedupIndex
+from storage import LeadStore
+
+# Relative fetch cost per source, for balancing shards: a subreddit runs one search
+# per query plus a comment fetch per new post, a megathread walks a comment tree
+SOURCE_WEIGHTS = {'subreddit': 8.0, 'sitewide': 1.0, 'megathread': 3.0}
+
+# Scored batches in flight before workers block (backpressure on a slow writer)
+MAX_QUEUED_BATCHES = 64
+
+# Tables whose rows are deduplicated across shards within a cycle
+DEDUP_TABLES = ('posts', 'comments', 'leads')
+
+# How long close() waits for workers to finish their in-flight fetches and send their last rows
+SHUTDOWN_TIMEOUT = 60.0
+
+
+@dataclass
+class Shard:
+    """Sources handled by one worker process"""
+    index: int
+    subreddits: List[str] = field(default_factory=list)
+    sitewide_queries: List[Dict[str, Any]] = field(default_factory=list)
+    megathreads: List[Dict[str, Any]] = field(default_factory=list)
+    weight: float = 0.0
+
+    def describe(self) -> str:
+        return (f"{len(self.subreddits)} subreddits, {len(self.sitewide_queries)} sitewide queries, "
+                f"{len(self.megathreads)} megathreads")
+
+
+def partition(subreddits: List[str], sitewide_queries: List[Dict[str, Any]],
+              megathreads: List[Dict[str, Any]], workers: int) -> List[Shard]:
+    """Spread sources over at most `workers` shards, heaviest first onto the lightest shard.
+
+    The assignment only depends on the configured sources, so each shard keeps the
+    same subreddits (and in-memory cursors and dedup state) from cycle to cycle.
+    """
+    sources = ([('subreddit', name) for name in subreddits] +
+               [('sitewide', query) for query in sitewide_queries] +
+               [('megathread', thread) for thread in megathreads])
+    count = max(1, min(workers, len(sources)))
+    shards = [Shard(index=i) for i in range(count)]
+
+    # Stable sort: equal weights keep config order
+    for kind, source in sorted(sources, key=lambda s: -SOURCE_WEIGHTS[s[0]]):
+        shard = min(shards, key=lambda s: (s.weight, s.index))
+        shard.weight += SOURCE_WEIGHTS[kind]
+        if kind == 'subreddit':
+            shard.subreddits.append(source)
+        elif kind == 'sitewide':
+            shard.sitewide_queries.append(source)
+        else:
+            shard.megathreads.append(source)
+    return shards
+
+
+class ClaimRegistry:
+    """IDs claimed by any shard this cycle; whichever shard sees an ID first keeps it"""
+
+    def __init__(self):
+        self._claimed: Set[str] = set()
+        # The manager serves each worker's connection on its own thread
+        self._lock = threading.Lock()
+
+    def claim(self, ids: List[str]) -> List[str]:
+        """Claim ids for the caller; returns the ones already claimed earlier in the cycle"""
+        with self._lock:
+            taken = [item_id for item_id in ids if item_id in self._claimed]
+            self._claimed.update(ids)
+        return taken
+
+    def reset(self):
+        """Forget this cycle's claims (the writer has stored everything they covered)"""
+        with self._lock:
+            self._claimed.clear()
+
+
+class ClaimManager(BaseManager):
+    """Serves one ClaimRegistry to the worker processes"""
+
+
+ClaimManager.register('ClaimRegistry', ClaimRegistry)
+
+
+class ClaimingDedupIndex(DedupIndex):
+    """DedupIndex that also treats IDs claimed by another shard this cycle as seen"""
+
+    def __init__(self, db_path, claims, capacity: int = 50000):
+        super().__init__(db_path, capacity=capacity)
+        self.claims = claims
+        self.claimed_elsewhere = 0
+
+    def seen_among(self, ids: Iterable[str]) -> Set[str]:
+        ids = [item_id for item_id in dict.fromkeys(ids) if item_id]
+        seen = super().seen_among(ids)
+        unseen = [item_id for item_id in ids if item_id not in seen]
+        if not unseen:
+            return seen
+        try:
+            taken = self.claims.claim(unseen)
+        except Exception as e:
+            # Without the registry the writer still drops cross-shard duplicates
+            print(f"Shard claim registry unavailable: {e}")
+            return seen
+        self.claimed_elsewhere += len(taken)
+        return seen | set(taken)
+
+
+class ShardStore(LeadStore):
+    """LeadStore that hands each flush to the writer process instead of writing it.
+
+    The connection is only read (cursors, and dedup lookups by DedupIndex); the
+    writer has already created and migrated the schema.
+    """
+
+    def __init__(self, db_path, results, shard_index: int, flush_every: int = 500):
+        self.results = results
+        self.shard_index = shard_index
+        super().__init__(db_path, flush_every=flush_every)
+
+    def create_tables(self):
+        self.schema_version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        self.load_cursors()
+
+    def flush(self) -> int:
+        count = self.pending_rows
+        if not count:
+            return 0
+        batch = {table: list(rows) for table, rows in self._pending.items() if rows}
+        for rows in self._pending.values():
+            rows.clear()
+        self.results.put(('rows', self.shard_index, batch))
+        self.rows_written += count
+        self.flush_count += 1
+        return count
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+            self.conn = None
+
+
+def _shard_radar_class():
+    """RedditLeadRadar subclass for workers (imported late: the radar module imports this one)"""
+    from reddit_lead_radar import RedditLeadRadar
+
+    class ShardRadar(RedditLeadRadar):
+        """Fetches and scores one shard; rows go to the writer through a ShardStore"""
+
+        def __init__(self, shard: Shard, settings: Dict[str, Any], results, stopping, claims):
+            self.shard = shard
+            self.settings = settings
+            self.results = results
+            self.stopping = stopping
+            self.claims = claims
+            super().__init__(config_dir=settings['config_dir'], backfill=settings['backfill'])
+            # Only this shard's sources
+            self.search_queries = dict(self.search_queries, queries=shard.sitewide_queries)
+            self.megathreads = dict(self.megathreads, megathreads=shard.megathreads)
+            # Validators stay in memory: every worker would overwrite the same cache file
+            self.validators = ValidatorCache()
+            if settings.get('reddit_base_url'):
+                self.use_reddit_at(settings['reddit_base_url'])
+            if settings.get('record_dir'):
+                self.record_responses(settings['record_dir'])
+
+        def load_config(self, filename: str) -> Dict[str, Any]:
+            # subreddits.json as the writer loaded it, including any runtime overrides
+            if filename == "subreddits.json" and 'subreddits_config' in self.settings:
+                return self.settings['subreddits_config']
+            return super().load_config(filename)
+
+        def build_store(self, flush_every: int) -> LeadStore:
+            return ShardStore(self.db_path, self.results, self.shard.index, flush_every=flush_every)
+
+        def build_dedup_index(self, capacity: int) -> DedupIndex:
+            # Posts another shard already took this cycle are skipped before their comments are fetched
+            return ClaimingDedupIndex(self.db_path, self.claims, capacity=capacity)
+
+        def build_rate_limiter(self, fetch_config: Dict[str, Any], share: float = 1.0) -> RateLimiter:
+            # Every worker spends an equal slice of the client's quota (re-set each cycle)
+            return super().build_rate_limiter(fetch_config, share=share / self.settings['workers'])
+
+        def build_scheduler(self) -> AdaptiveScheduler:
+            # The writer process owns the schedule and its state file
+            scheduler = super().build_scheduler()
+            scheduler.state_path = None
+            return scheduler
+
+        def _submit(self, pending, stage: str, source: str, fn, *args, **kwargs):
+            # Once shutting down, fetches that haven't started yet come back empty
+            def unless_stopping(*fn_args, **fn_kwargs):
+                return [] if self.stopping.is_set() else fn(*fn_args, **fn_kwargs)
+
+            super()._submit(pending, stage, source, unless_stopping, *args, **kwargs)
+
+        def _submit_subreddits(self, pending, only: Optional[Collection[str]] = None):
+            mine = self.shard.subreddits if only is None else [s for s in self.shard.subreddits if s in only]
+            super()._submit_subreddits(pending, only=mine)
+
+        def run_shard_cycle(self, due: Optional[Collection[str]], backfill: bool,
+                            rate_share: float) -> Dict[str, Any]:
+            """Fetch and score this shard's due sources; rows are flushed to the writer as they go"""
+            self.reload_matcher_if_changed()
+            self.rate_limiter.set_share(rate_share)
+            self.backfill = backfill
+            self.timings.reset_cycle()
+            metrics = self._new_cycle_metrics()
+            self.fetch_and_score(metrics, due)
+            self.store.flush()
+            # The writer commits these rows before the next cycle starts (and the claims
+            # cover them until then); mid-cycle flushes only queue them
+            self.processed_ids.flushed()
+            return metrics
+
+    return ShardRadar
+
+
+def _ignore_sigint():
+    # Ctrl+C reaches the whole process group; the radar process decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _worker_main(shard: Shard, settings: Dict[str, Any], commands, results, stopping, claims):
+    """Worker process loop: one cycle per command until told to stop (None)"""
+    _ignore_sigint()
+    try:
+        radar = _shard_radar_class()(shard, settings, results, stopping, claims)
+    except Exception as e:
+        results.put(('error', shard.index, f"startup failed: {e}"))
+        results.put(('closed', shard.index, None))
+        return
+
+    try:
+        while True:
+            command = commands.get()
+            if command is None:
+                break
+            due, cycle_backfill, rate_share = command
+            try:
+                metrics = radar.run_shard_cycle(due, cycle_backfill, rate_share)
+                results.put(('done', shard.index, {'metrics': metrics, 'timings': radar.timings.cycle}))
+            except Exception as e:
+                results.put(('error', shard.index, f"cycle failed: {e}"))
+    finally:
+        radar.close()
+        results.put(('closed', shard.index, None))
+
+
+class ShardPool:
+    """Worker processes for a radar; the radar's process writes everything they score"""
+
+    def __init__(self, radar, workers: int):
+        self.radar = radar
+        self.context = multiprocessing.get_context('spawn')
+        subreddits = [policy.name for policy in radar.policies if not policy.read_only]
+        self.shards = partition(subreddits, radar.search_queries.get("queries", []),
+                                radar.megathreads.get("megathreads", []), workers)
+        self.results = self.context.Queue(maxsize=MAX_QUEUED_BATCHES)
+        self.stopping = self.context.Event()
+        # Shared across workers, so a post is fetched (with its comments) by one shard only
+        self.claim_manager = ClaimManager(ctx=self.context)
+        self.claim_manager.start(_ignore_sigint)
+        self.claims = self.claim_manager.ClaimRegistry()
+        # IDs written this cycle, in case two shards still send the same row (e.g. a megathread
+        # comment that the subreddit's own comment fetch also returned)
+        self._written: Dict[str, set] = {table: set() for table in DEDUP_TABLES}
+        self.duplicates = {table: 0 for table in DEDUP_TABLES}
+        self.commands: List[Any] = [None] * len(self.shards)
+        self.processes: List[Any] = [None] * len(self.shards)
+        for shard in self.shards:
+            self._start(shard)
+
+    def _start(self, shard: Shard):
+        # Spawned (not forked) workers: this process has fetch threads and open connections
+        commands = self.context.Queue()
+        process = self.context.Process(
+            target=_worker_main, name=f"radar-shard-{shard.index}", daemon=True,
+            args=(shard, self._settings(), commands, self.results, self.stopping, self.claims))
+        process.start()
+        self.commands[shard.index] = commands
+        self.processes[shard.index] = process
+        print(f"Started shard worker {shard.index} (pid {process.pid}): {shard.describe()}")
+
+    def _settings(self) -> Dict[str, Any]:
+        """What a worker needs from the writer's radar to build its own"""
+        radar = self.radar
+        return {
+            'workers': len(self.shards),
+            'config_dir': str(radar.config_dir),
+            'backfill': radar.backfill,
+            'subreddits_config': radar.subreddits_config,
+            'reddit_base_url': radar.reddit_base_url,
+            'record_dir': str(radar.record_dir) if radar.record_dir else None,
+        }
+
+    def run_cycle(self, due: Optional[Collection[str]], metrics: Dict[str, Any]):
+        """Run one cycle on every worker, writing their rows as they arrive and merging their metrics"""
+        # Last cycle's rows are all written, so the workers' dedup checks find them in leads.db
+        self.claims.reset()
+        # Split what the fast lane (running in this process) leaves of the quota
+        rate_share = self.radar.cycle_rate_share() / len(self.shards)
+        for shard in self.shards:
+            if not self.processes[shard.index].is_alive():
+                print(f"Shard worker {shard.index} exited (code {self.processes[shard.index].exitcode}), restarting")
+                self._start(shard)
+            self.commands[shard.index].put((list(due) if due is not None else None, self.radar.backfill,
+                                            rate_share))
+
+        for written in self._written.values():
+            written.clear()
+        for table in DEDUP_TABLES:
+            self.duplicates[table] = 0
+
+        waiting = {shard.index for shard in self.shards}
+        while waiting:
+            message = self._next_message()
+            if message is None:
+                for index in list(waiting):
+                    if not self.processes[index].is_alive():
+                        print(f"Shard worker {index} died mid-cycle (code {self.processes[index].exitcode})")
+                        waiting.discard(index)
+                continue
+
+            kind, index, payload = message
+            if kind == 'done':
+                self._merge_metrics(metrics, payload['metrics'])
+                self.radar.timings.merge(payload['timings'])
+                waiting.discard(index)
+            elif kind == 'error':
+                print(f"Shard worker {index}: {payload}")
+                waiting.discard(index)
+            elif kind == 'closed':
+                waiting.discard(index)
+
+        # Count each item once in the cycle report
+        duplicate_items = self.duplicates['posts'] + self.duplicates['comments']
+        if duplicate_items:
+            metrics['total_processed'] -= duplicate_items
+            metrics['leads_found'] -= self.duplicates['leads']
+            print(f"Dropped {duplicate_items} items fetched by more than one shard")
+
+    def _next_message(self, timeout: float = 1.0) -> Optional[tuple]:
+        """Next worker message; row batches are written here and not returned"""
+        while True:
+            try:
+                message = self.results.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if message[0] != 'rows':
+                return message
+            self._write(message[2])
+            timeout = 0.05
+
+    def _write(self, batch: Dict[str, List[Dict[str, Any]]]):
+        """Hand a worker's batch to the radar, minus rows another shard already sent this cycle"""
+        for table in DEDUP_TABLES:
+            rows = batch.get(table)
+            if not rows:
+                continue
+            written = self._written[table]
+            fresh = []
+            for row in rows:
+                if row['id'] not in written:
+                    written.add(row['id'])
+                    fresh.append(row)
+            self.duplicates[table] += len(rows) - len(fresh)
+            batch[table] = fresh
+        self.radar.write_shard_rows(batch)
+
+    @staticmethod
+    def _merge_metrics(metrics: Dict[str, Any], shard_metrics: Dict[str, Any]):
+        for key in ('subreddit_posts', 'subreddit_comments', 'sitewide_posts',
+                    'megathread_comments', 'total_processed', 'leads_found'):
+            metrics[key] += shard_metrics[key]
+        for source, stats in shard_metrics['subreddit_breakdown'].items():
+            breakdown = metrics['subreddit_breakdown'].setdefault(
+                source, {'posts': 0, 'comments': 0, 'leads': 0})
+            for key, value in stats.items():
+                breakdown[key] += value
+        for source, arrivals in shard_metrics['arrivals'].items():
+            metrics['arrivals'].setdefault(source, []).extend(arrivals)
+
+    def close(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """Stop the workers (in-flight fetches finish, queued ones are dropped) and write the rows they still hold"""
+        self.stopping.set()
+        for commands in self.commands:
+            commands.put(None)
+
+        running = {shard.index for shard in self.shards if self.processes[shard.index].is_alive()}
+        deadline = time.time() + timeout
+        while running and time.time() < deadline:
+            message = self._next_message()
+            if message is None:
+                running = {index for index in running if self.processes[index].is_alive()}
+            elif message[0] == 'closed':
+                running.discard(message[1])
+
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                print(f"Shard worker {process.name} did not stop in time, terminating")
+                process.terminate()
+                process.join()
+        # Anything a worker sent just before exiting
+        while self._next_message(timeout=0.1) is not None:
+            pass
+        self.results.close()
+        self.claim_manager.shutdown()
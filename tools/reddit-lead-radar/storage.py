@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Storage layer for Reddit Lead Radar
+Holds one long-lived SQLite connection and batches scored rows into transactions.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from entities import ENTITY_COLUMNS
+
+POST_COLUMNS = (
+    'id', 'subreddit', 'author', 'title', 'body', 'url', 'score', 'num_comments',
+    'created_utc', 'processed_at', 'intent_score', 'semantic_score', 'final_score',
+    'is_emergency', 'species', 'tags', 'draft_reply', 'intent_matches', *ENTITY_COLUMNS
+)
+
+COMMENT_COLUMNS = (
+    'id', 'post_id', 'author', 'body', 'score', 'created_utc', 'processed_at',
+    'intent_score', 'semantic_score', 'final_score', 'is_emergency', 'species',
+    'tags', 'intent_matches', *ENTITY_COLUMNS
+)
+
+LEAD_COLUMNS = (
+    'id', 'post_id', 'comment_id', 'subreddit', 'author', 'title', 'content', 'url',
+    'score', 'species', 'intent_matches', 'semantic_matches', 'draft_reply',
+    'created_at', *ENTITY_COLUMNS
+)
+
+CURSOR_COLUMNS = ('source', 'query', 'newest_fullname', 'newest_created_utc', 'updated_at')
+
+# PRAGMA auto_vacuum value that allows PRAGMA incremental_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Pragmas applied to every connection opened on leads.db
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',   # WAL + NORMAL only fsyncs at checkpoints
+    'PRAGMA cache_size = -16000',    # ~16 MB page cache
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA busy_timeout = 5000',
+)
+
+# Full-text indexed columns per table. The *_fts tables are FTS5 external-content
+# indexes (no second copy of the text) kept in sync by triggers.
+FTS_TABLES = {
+    'posts': ('title', 'body'),
+    'comments': ('body',),
+    'leads': ('title', 'content'),
+}
+
+
+def _fts_statements(table: str, columns: tuple) -> tuple:
+    """FTS5 table, sync triggers and one-time backfill for an indexed table"""
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    old_values = ', '.join(f'old.{c}' for c in columns)
+    insert = f'INSERT INTO {fts} (rowid, {names}) VALUES (new.rowid, {new_values});'
+    delete = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.rowid, {old_values});"
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', "
+        f"content_rowid='rowid', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table} '
+        f'BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    )
+
+
+ENTITY_COLUMN_TYPES = {
+    'age_value': 'INTEGER', 'age_unit': 'TEXT', 'weight': 'REAL',
+    'weight_unit': 'TEXT', 'conditions': 'TEXT', 'diet_type': 'TEXT',
+}
+
+
+def _fts_update_trigger_statements(table: str, columns: tuple) -> tuple:
+    """Re-create a table's FTS update trigger so it only fires when the indexed text changes"""
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    changed = ' OR '.join(f'old.{c} IS NOT new.{c}' for c in columns)
+    insert = (f"INSERT INTO {fts} (rowid, {names}) "
+              f"VALUES (new.rowid, {', '.join(f'new.{c}' for c in columns)});")
+    delete = (f"INSERT INTO {fts} ({fts}, rowid, {names}) "
+              f"VALUES ('delete', old.rowid, {', '.join(f'old.{c}' for c in columns)});")
+    return (
+        f'DROP TRIGGER IF EXISTS {fts}_update',
+        f'CREATE TRIGGER {fts}_update AFTER UPDATE OF {names} ON {table} '
+        f'WHEN {changed} BEGIN {delete} {insert} END',
+    )
+
+
+def _entity_column_statements(table: str) -> tuple:
+    """Typed entity columns for a table, backfilled from its old entities JSON.
+
+    The JSON column is emptied rather than dropped, so SQLite builds without
+    DROP COLUMN (< 3.35) can still migrate. Age was stored as "3 years".
+    """
+    age = "json_extract(entities, '$.age')"
+    age_unit = f"substr({age}, instr({age}, ' ') + 1)"
+    return tuple(
+        f'ALTER TABLE {table} ADD COLUMN {column} {ENTITY_COLUMN_TYPES[column]}'
+        for column in ENTITY_COLUMNS
+    ) + (
+        f"""UPDATE {table} SET
+               age_value = CAST({age} AS INTEGER),
+               age_unit = CASE WHEN {age} IS NULL THEN NULL
+                               WHEN CAST({age} AS INTEGER) = 1 THEN {age_unit}
+                               ELSE substr({age_unit}, 1, length({age_unit}) - 1) END,
+               weight = json_extract(entities, '$.weight'),
+               weight_unit = json_extract(entities, '$.weight_unit'),
+               conditions = (SELECT group_concat(value, ',')
+                             FROM json_each(entities, '$.conditions')),
+               diet_type = json_extract(entities, '$.diet_type'),
+               entities = NULL
+           WHERE json_valid(entities)""",
+    )
+
+
+# Versioned schema changes applied on top of the base tables, tracked in
+# PRAGMA user_version. Append new entries; never edit applied ones.
+SCHEMA_MIGRATIONS = (
+    (1, 'secondary indexes for the lead queue, dashboard filters and comment lookups', (
+        'CREATE INDEX IF NOT EXISTS idx_leads_queue ON leads (reviewed, score DESC, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_leads_subreddit ON leads (subreddit, reviewed, score DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_leads_species ON leads (species, reviewed, score DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_subreddit_created ON posts (subreddit, created_utc)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_utc)',
+        'CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_id)',
+        'CREATE INDEX IF NOT EXISTS idx_comments_created ON comments (created_utc)',
+        'ANALYZE',
+    )),
+    (2, 'FTS5 full-text indexes over posts, comments and leads', tuple(
+        statement for table, columns in FTS_TABLES.items()
+        for statement in _fts_statements(table, columns)
+    )),
+    (3, 'archived ID registry and lead reference indexes for retention', (
+        '''CREATE TABLE IF NOT EXISTS archived_ids (
+               id TEXT PRIMARY KEY,
+               kind TEXT,
+               archived_at REAL
+           ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_leads_post ON leads (post_id)',
+        'CREATE INDEX IF NOT EXISTS idx_leads_comment ON leads (comment_id)',
+    )),
+    (4, 'typed entity columns in place of the entities JSON', tuple(
+        statement for table in ('posts', 'comments', 'leads')
+        for statement in _entity_column_statements(table)
+    )),
+    (5, 'full-text index updates only when the indexed text changes', tuple(
+        statement for table, columns in FTS_TABLES.items()
+        for statement in _fts_update_trigger_statements(table, columns)
+    )),
+    (6, 'case-insensitive subreddit index for the lead filters', (
+        'DROP INDEX IF EXISTS idx_leads_subreddit',
+        'CREATE INDEX IF NOT EXISTS idx_leads_subreddit_nocase '
+        'ON leads (subreddit COLLATE NOCASE, reviewed, score DESC, created_at DESC)',
+        'ANALYZE',
+    )),
+)
+
+# Hot read queries, with sample parameters, reported by explain_queries()
+HOT_QUERIES = {
+    'lead_queue': (
+        'SELECT * FROM leads WHERE reviewed = 0 ORDER BY score DESC, created_at DESC LIMIT 50', ()),
+    'leads_by_subreddit': (
+        'SELECT * FROM leads WHERE subreddit = ? COLLATE NOCASE AND reviewed = 0 '
+        'ORDER BY score DESC, created_at DESC LIMIT 50',
+        ('reptiles',)),
+    'leads_by_species': (
+        'SELECT * FROM leads WHERE species = ? AND reviewed = 0 ORDER BY score DESC LIMIT 50',
+        ('birds',)),
+    'comments_for_post': (
+        'SELECT * FROM comments WHERE post_id = ?', ('abc123',)),
+    'recent_posts_in_subreddit': (
+        'SELECT id, final_score FROM posts WHERE subreddit = ? AND created_utc >= ? ORDER BY created_utc DESC',
+        ('reptiles', 0)),
+    'recent_comments': (
+        'SELECT id, final_score FROM comments WHERE created_utc >= ?', (0,)),
+    'search_posts': (
+        'SELECT posts.id FROM posts_fts JOIN posts ON posts.rowid = posts_fts.rowid '
+        'WHERE posts_fts MATCH ? AND posts.species = ? ORDER BY bm25(posts_fts) LIMIT 20',
+        ('kidney', 'cats')),
+}
+
+
+def connect(db_path: Union[str, Path], check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a connection to leads.db with the radar's standard pragmas"""
+    conn = sqlite3.connect(str(db_path), check_same_thread=check_same_thread)
+    # A new database gets incremental auto-vacuum, which has to be chosen before anything
+    # (even the switch to WAL) writes the file; older ones are converted by their first compaction
+    if conn.execute('PRAGMA page_count').fetchone()[0] == 0:
+        conn.execute(f'PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}')
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending SCHEMA_MIGRATIONS in order; returns the resulting schema version"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, description, statements in SCHEMA_MIGRATIONS:
+        if target <= version:
+            continue
+        print(f"Migrating leads.db to schema v{target}: {description}")
+        # sqlite3 only opens a transaction by itself before DML, so CREATE/ALTER would each
+        # commit on their own; an explicit BEGIN makes the whole migration atomic
+        conn.execute('BEGIN')
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA doesn't take parameters; target comes from the table above
+            conn.execute(f'PRAGMA user_version = {int(target)}')
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        version = target
+    return version
+
+
+def explain_queries(conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    """EXPLAIN QUERY PLAN for each hot query, as readable plan lines"""
+    report = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        report[name] = [row[-1] for row in rows]
+    return report
+
+
+def _upsert_sql(table: str, columns: tuple, key: tuple = ('id',), keep: tuple = ()) -> str:
+    """Build an INSERT ... ON CONFLICT DO UPDATE statement with named placeholders.
+
+    Unlike INSERT OR REPLACE the existing row is updated in place, so columns not
+    written here (and those in ``keep``) survive and no DELETE triggers fire.
+    """
+    names = ', '.join(columns)
+    placeholders = ', '.join(f':{c}' for c in columns)
+    updates = ', '.join(f'{c} = excluded.{c}' for c in columns if c not in key and c not in keep)
+    return (f'INSERT INTO {table} ({names}) VALUES ({placeholders}) '
+            f'ON CONFLICT({", ".join(key)}) DO UPDATE SET {updates}')
+
+
+class LeadStore:
+    """Buffered writer over a single persistent leads.db connection"""
+
+    def __init__(self, db_path: Union[str, Path], flush_every: int = 500):
+        self.db_path = Path(db_path)
+        self.flush_every = max(1, flush_every)
+        self.conn = connect(self.db_path)
+
+        self._pending: Dict[str, List[Dict[str, Any]]] = {
+            'posts': [], 'comments': [], 'leads': [], 'cursors': []
+        }
+        self._statements = {
+            'posts': _upsert_sql('posts', POST_COLUMNS),
+            'comments': _upsert_sql('comments', COMMENT_COLUMNS),
+            # A re-scored lead keeps its reviewed flag and original created_at
+            'leads': _upsert_sql('leads', LEAD_COLUMNS, keep=('created_at',)),
+            'cursors': _upsert_sql('cursors', CURSOR_COLUMNS, key=('source', 'query')),
+        }
+
+        # High-water marks per (source, query); read from fetch threads
+        self._cursor_lock = threading.Lock()
+        self._cursors: Dict[tuple, Dict[str, Any]] = {}
+        self._staged_cursors: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        self.schema_version = 0
+        self.rows_written = 0
+        self.flush_count = 0
+        self.flush_seconds = 0.0
+        # Optional hook called with (seconds, rows) after each flush transaction
+        self.on_flush: Optional[Callable[[float, int], None]] = None
+        # Optional hook called with the post and comment IDs each flush committed
+        self.on_written: Optional[Callable[[List[str]], None]] = None
+
+    def create_tables(self):
+        """Create the posts, comments and leads tables if missing"""
+        cursor = self.conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS posts (
+                id TEXT PRIMARY KEY,
+                subreddit TEXT NOT NULL,
+                author TEXT,
+                title TEXT NOT NULL,
+                body TEXT,
+                url TEXT,
+                score INTEGER,
+                num_comments INTEGER,
+                created_utc REAL,
+                processed_at REAL,
+                intent_score REAL DEFAULT 0,
+                semantic_score REAL DEFAULT 0,
+                final_score REAL DEFAULT 0,
+                is_emergency BOOLEAN DEFAULT 0,
+                species TEXT,
+                tags TEXT,
+                draft_reply TEXT,
+                entities TEXT,
+                intent_matches TEXT
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS comments (
+                id TEXT PRIMARY KEY,
+                post_id TEXT,
+                author TEXT,
+                body TEXT,
+                score INTEGER,
+                created_utc REAL,
+                processed_at REAL,
+                intent_score REAL DEFAULT 0,
+                semantic_score REAL DEFAULT 0,
+                final_score REAL DEFAULT 0,
+                is_emergency BOOLEAN DEFAULT 0,
+                species TEXT,
+                tags TEXT,
+                entities TEXT,
+                intent_matches TEXT,
+                FOREIGN KEY (post_id) REFERENCES posts (id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leads (
+                id TEXT PRIMARY KEY,
+                post_id TEXT,
+                comment_id TEXT,
+                subreddit TEXT,
+                author TEXT,
+                title TEXT,
+                content TEXT,
+                url TEXT,
+                score REAL,
+                species TEXT,
+                intent_matches TEXT,
+                semantic_matches TEXT,
+                draft_reply TEXT,
+                entities TEXT,
+                created_at REAL,
+                reviewed BOOLEAN DEFAULT 0,
+                FOREIGN KEY (post_id) REFERENCES posts (id),
+                FOREIGN KEY (comment_id) REFERENCES comments (id)
+            )
+        ''')
+
+        # Newest item seen per (subreddit or "sitewide", search query)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cursors (
+                source TEXT NOT NULL,
+                query TEXT NOT NULL,
+                newest_fullname TEXT,
+                newest_created_utc REAL,
+                updated_at REAL,
+                PRIMARY KEY (source, query)
+            )
+        ''')
+
+        self.conn.commit()
+        self.schema_version = migrate(self.conn)
+        self.load_cursors()
+
+    def load_cursors(self):
+        """Read every stored high-water mark into memory"""
+        cursor = self.conn.execute(f"SELECT {', '.join(CURSOR_COLUMNS)} FROM cursors")
+        with self._cursor_lock:
+            self._cursors = {
+                (row[0], row[1]): dict(zip(CURSOR_COLUMNS, row)) for row in cursor.fetchall()
+            }
+
+    def get_cursor(self, source: str, query: str) -> Optional[Dict[str, Any]]:
+        """Return the newest item seen for a (source, query) pair, if any"""
+        with self._cursor_lock:
+            return self._cursors.get((source, query))
+
+    def stage_cursor(self, source: str, query: str, newest_fullname: str, newest_created_utc: float):
+        """Remember a new high-water mark; it only takes effect on release_cursors().
+
+        Fetch threads stage cursors as soon as a listing comes back, but the mark must
+        not be persisted before the items it covers, so the consumer releases it after
+        buffering them.
+        """
+        with self._cursor_lock:
+            self._staged_cursors.setdefault(source, {})[query] = {
+                'source': source,
+                'query': query,
+                'newest_fullname': newest_fullname,
+                'newest_created_utc': newest_created_utc,
+                'updated_at': time.time()
+            }
+
+    def release_cursors(self, source: str, query: Optional[str] = None):
+        """Queue the staged high-water marks of a source (or one of its queries) for the next flush"""
+        with self._cursor_lock:
+            staged = self._staged_cursors.get(source, {})
+            queries = [query] if query is not None else list(staged)
+            released = [staged.pop(q) for q in queries if q in staged]
+            if not staged:
+                self._staged_cursors.pop(source, None)
+            for row in released:
+                self._cursors[(row['source'], row['query'])] = row
+        for row in released:
+            self._add('cursors', row)
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(len(rows) for rows in self._pending.values())
+
+    def _add(self, table: str, row: Dict[str, Any]):
+        self._pending[table].append(row)
+        if self.pending_rows >= self.flush_every:
+            self.flush()
+
+    def add_post(self, row: Dict[str, Any]):
+        """Buffer a scored post row"""
+        self._add('posts', row)
+
+    def add_comment(self, row: Dict[str, Any]):
+        """Buffer a scored comment row"""
+        self._add('comments', row)
+
+    def add_lead(self, row: Dict[str, Any]):
+        """Buffer a lead row (comment_id may be None for post leads)"""
+        row.setdefault('comment_id', None)
+        self._add('leads', row)
+
+    def write_batch(self, batch: Dict[str, List[Dict[str, Any]]]) -> int:
+        """Write rows buffered by another process (a shard worker's flush) in one transaction"""
+        for table, rows in batch.items():
+            self._pending[table].extend(rows)
+        return self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered rows in one transaction"""
+        count = self.pending_rows
+        if not count:
+            return 0
+
+        start = time.perf_counter()
+        with self.conn:
+            for table in ('posts', 'comments', 'leads', 'cursors'):
+                rows = self._pending[table]
+                if rows:
+                    self.conn.executemany(self._statements[table], rows)
+        written = [row['id'] for table in ('posts', 'comments') for row in self._pending[table]]
+        for rows in self._pending.values():
+            rows.clear()
+        if self.on_written:
+            self.on_written(written)
+
+        elapsed = time.perf_counter() - start
+        self.rows_written += count
+        self.flush_count += 1
+        self.flush_seconds += elapsed
+        if self.on_flush:
+            self.on_flush(elapsed, count)
+        return count
+
+    def close(self):
+        """Flush pending rows and close the connection"""
+        if self.conn is None:
+            return
+        try:
+            self.flush()
+            # Refresh planner statistics for tables that changed a lot this session
+            self.conn.execute('PRAGMA optimize')
+        finally:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,11 @@
+"""Shared pytest setup for the radar tests"""
+
+import sys
+from pathlib import Path
+
+RADAR_DIR = Path(__file__).resolve().parent.parent
+
+# The radar modules import each other by name, and reddit_common lives in tools/
+for path in (RADAR_DIR, RADAR_DIR.parent):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
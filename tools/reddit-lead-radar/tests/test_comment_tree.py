@@ -0,0 +1,138 @@
+"""CommentTreeWalker against a replayed thread"""
+
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from comment_tree import MORECHILDREN_URL, CommentTreeWalker, branch_markers, comment_id_value
+from replay import FixtureServer, _json_reply, redirect_to
+
+POST_ID = 'abc'
+SUBREDDIT = 'reptiles'
+
+
+def comment(comment_id: str, replies: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    data = {'id': comment_id, 'body': f'comment {comment_id}', 'replies': ''}
+    if replies:
+        data['replies'] = {'data': {'children': replies}}
+    return {'kind': 't1', 'data': data}
+
+
+def more(*children: str, parent: str = f't3_{POST_ID}') -> Dict[str, Any]:
+    return {'kind': 'more', 'data': {'children': list(children), 'parent_id': parent}}
+
+
+class ThreadBackend:
+    """Serves one thread's listing, /api/morechildren and "continue this thread" fetches"""
+
+    def __init__(self, listing: List[Dict[str, Any]], extra: Dict[str, Dict[str, Any]],
+                 branches: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.listing = listing
+        self.extra = extra              # comment ID -> thing returned by morechildren
+        self.branches = branches or {}  # parent comment ID -> sub-thread children
+        self.requests: List[str] = []
+
+    def respond(self, method: str, url: str):
+        parts = urlsplit(url)
+        self.requests.append(parts.path)
+        if url.startswith(MORECHILDREN_URL):
+            ids = parse_qs(parts.query)['children'][0].split(',')
+            things = [self.extra[i] for i in ids if i in self.extra]
+            return _json_reply({'json': {'data': {'things': things}}})
+        thread_path = f'/r/{SUBREDDIT}/comments/{POST_ID}'
+        if parts.path == thread_path:
+            children = self.listing
+        elif parts.path.startswith(f'{thread_path}/_/'):
+            children = self.branches[parts.path.rsplit('/', 1)[1]]
+        else:
+            return None
+        return _json_reply([{'data': {'children': []}}, {'data': {'children': children}}])
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(backend: ThreadBackend) -> CommentTreeWalker:
+        server = FixtureServer(backend).start()
+        servers.append(server)
+        session = requests.Session()
+        redirect_to(session, server.url)
+        return CommentTreeWalker(session.get, max_more_requests=5)
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def ids(walk) -> List[str]:
+    return sorted(c['id'] for c in walk.comments)
+
+
+def test_high_water_mark_resumes_walk(serve):
+    backend = ThreadBackend(
+        listing=[comment('a1', [comment('a2')]), comment('a3'), more('a4', 'a5')],
+        extra={'a4': comment('a4'), 'a5': comment('a5')})
+    walker = serve(backend)
+
+    first = walker.walk(POST_ID, SUBREDDIT, {}, set())
+    assert ids(first) == ['a1', 'a2', 'a3', 'a4', 'a5']
+    assert first.complete and first.newest_id == 'a5'
+    assert first.requests == 2
+
+    # A restart keeps only the high-water mark: the old comments and the
+    # already-expanded stub are skipped, only the new reply and stub are fetched
+    backend.listing = [comment('a1', [comment('a2'), comment('a6')]), comment('a3'),
+                       more('a4', 'a5', 'a7')]
+    backend.extra['a7'] = comment('a7')
+    backend.requests.clear()
+
+    second = walker.walk(POST_ID, SUBREDDIT, {}, set(), high_water_id=first.newest_id)
+    assert ids(second) == ['a6', 'a7']
+    assert second.complete and second.newest_id == 'a7'
+    assert backend.requests.count('/api/morechildren') == 1
+
+    # Nothing new: one listing request, no comments, the mark stays put
+    backend.requests.clear()
+    third = walker.walk(POST_ID, SUBREDDIT, {}, set(), high_water_id=second.newest_id)
+    assert third.comments == [] and third.newest_id == 'a7'
+    assert backend.requests == [f'/r/{SUBREDDIT}/comments/{POST_ID}']
+
+
+def test_budget_defers_remaining_stubs(serve):
+    stub_ids = [f'b{i:02d}' for i in range(150)]
+    backend = ThreadBackend(listing=[comment('a1'), more(*stub_ids)],
+                            extra={i: comment(i) for i in stub_ids})
+    walker = serve(backend)
+    walker.max_more_requests = 1
+
+    seen = set()
+    partial = walker.walk(POST_ID, SUBREDDIT, {}, seen)
+    assert not partial.complete
+    assert partial.deferred == 50
+    assert len(partial.comments) == 101
+
+    # Resuming with the seen set (not a high-water mark) picks up the rest
+    rest = walker.walk(POST_ID, SUBREDDIT, {}, seen)
+    assert rest.complete and len(rest.comments) == 50
+    assert comment_id_value(rest.newest_id) == comment_id_value(stub_ids[-1])
+
+
+def test_continue_branch_followed_once(serve):
+    backend = ThreadBackend(
+        listing=[comment('a1', [more(parent='t1_a1')])],
+        extra={},
+        branches={'a1': [comment('a2')]})
+    walker = serve(backend)
+
+    seen = set()
+    first = walker.walk(POST_ID, SUBREDDIT, {}, seen)
+    assert ids(first) == ['a1', 'a2']
+
+    # The pruned seen set keeps the branch marker, so the old branch isn't fetched again
+    backend.requests.clear()
+    again = walker.walk(POST_ID, SUBREDDIT, {}, branch_markers(seen), high_water_id=first.newest_id)
+    assert again.comments == []
+    assert len(backend.requests) == 1
@@ -0,0 +1,93 @@
+"""KeywordAutomaton and CompiledMatcher against the per-keyword regex matching they replaced"""
+
+import json
+import random
+import re
+from pathlib import Path
+
+import pytest
+
+from matcher import SPECIES_KEYWORDS, CompiledMatcher, KeywordAutomaton
+
+CONFIG_DIR = Path(__file__).resolve().parent.parent / 'config'
+
+
+def load_config(name: str):
+    with open(CONFIG_DIR / name, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+INTENT_PHRASES = load_config('intent_phrases.json').get('high_signal_phrases', [])
+BLACKLIST = load_config('blacklist.json')
+EMERGENCY_KEYWORDS = load_config('seed_questions.json').get('emergency_keywords', [])
+BLACKLIST_TERMS = BLACKLIST.get('banned_words', []) + BLACKLIST.get('banned_substrings', [])
+ALL_KEYWORDS = sorted({k.lower() for k in INTENT_PHRASES + BLACKLIST_TERMS + EMERGENCY_KEYWORDS +
+                       [k for keywords in SPECIES_KEYWORDS.values() for k in keywords]})
+
+
+def regex_matches(keywords, text: str):
+    """The old matching: one search per keyword"""
+    return {keyword for keyword in keywords if re.search(re.escape(keyword), text)}
+
+
+def legacy_species(text_lower: str):
+    for species, keywords in SPECIES_KEYWORDS.items():
+        for keyword in keywords:
+            if re.search(re.escape(keyword), text_lower):
+                return species
+    return None
+
+
+def sample_texts(count: int = 300, seed: int = 7):
+    """Texts mixing whole keywords, keyword fragments and filler, so matches overlap"""
+    rng = random.Random(seed)
+    filler = ['my', 'the', 'and', 'help', 'food', 'a', 'scat', 'rattle', 'dogma', 'bunnyhop', '', ' ']
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 12)):
+            keyword = rng.choice(ALL_KEYWORDS)
+            choice = rng.random()
+            if choice < 0.4:
+                parts.append(keyword)
+            elif choice < 0.7:
+                start = rng.randrange(len(keyword))
+                parts.append(keyword[start:start + rng.randint(1, len(keyword))])
+            else:
+                parts.append(rng.choice(filler))
+        texts.append(rng.choice([' ', '', '-']).join(parts))
+    return texts
+
+
+@pytest.mark.parametrize('text', [
+    '', 'she', 'he', 'hers', 'ushers', 'aaaa', 'abcab',
+])
+def test_automaton_overlapping_keywords(text):
+    keywords = ['he', 'she', 'his', 'hers', 'a', 'aa', 'aaa', 'abc', 'bca', 'cab']
+    automaton = KeywordAutomaton((k, k) for k in keywords)
+    assert automaton.find(text) == regex_matches(keywords, text)
+    expected_count = sum(len(re.findall(f'(?={re.escape(k)})', text)) for k in keywords)
+    assert len(list(automaton.iter_matches(text))) == expected_count
+
+
+def test_automaton_matches_regex_on_config_keywords():
+    automaton = KeywordAutomaton((k, k) for k in ALL_KEYWORDS)
+    for text in sample_texts():
+        assert automaton.find(text) == regex_matches(ALL_KEYWORDS, text), text
+
+
+def test_compiled_matcher_matches_legacy_checks():
+    matcher = CompiledMatcher(INTENT_PHRASES, BLACKLIST, EMERGENCY_KEYWORDS)
+    intent_lower = [phrase.lower() for phrase in INTENT_PHRASES]
+    banned_users = [user.lower() for user in BLACKLIST.get('banned_users', [])]
+
+    for text in sample_texts(seed=11):
+        hits = matcher.scan(text)
+        assert {intent_lower[i] for i in hits.intent_ids} == regex_matches(intent_lower, text)
+        assert hits.is_blacklisted == bool(regex_matches([t.lower() for t in BLACKLIST_TERMS], text))
+        assert hits.is_emergency == bool(regex_matches([k.lower() for k in EMERGENCY_KEYWORDS], text))
+        assert hits.first_species() == legacy_species(text)
+
+    for user in banned_users:
+        assert matcher.is_banned_author(f'x{user}x')
+    assert not matcher.is_banned_author('an_ordinary_pet_owner')
@@ -0,0 +1,76 @@
+"""ClaimRegistry exclusivity across threads and shard processes"""
+
+import multiprocessing
+import queue
+import threading
+
+from sharding import ClaimingDedupIndex, ClaimManager, ClaimRegistry
+from storage import LeadStore
+
+IDS = [f'id{i}' for i in range(2000)]
+
+
+def claim_all(claims, offset: int, results):
+    """Claim every ID in small overlapping batches; report the ones this caller kept"""
+    kept = []
+    order = IDS[offset:] + IDS[:offset]
+    for start in range(0, len(order), 50):
+        batch = order[start:start + 50]
+        taken = set(claims.claim(batch))
+        kept.extend(item_id for item_id in batch if item_id not in taken)
+    results.put(kept)
+
+
+def assert_exclusive(kept_lists):
+    kept = [item_id for kept_ids in kept_lists for item_id in kept_ids]
+    assert sorted(kept) == sorted(IDS)
+
+
+def test_registry_claims_are_exclusive_across_threads():
+    registry = ClaimRegistry()
+    results = queue.Queue()
+    threads = [threading.Thread(target=claim_all, args=(registry, i * 300, results)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_exclusive([results.get() for _ in threads])
+
+
+def test_registry_claims_are_exclusive_across_processes():
+    context = multiprocessing.get_context('spawn')
+    manager = ClaimManager(ctx=context)
+    manager.start()
+    try:
+        claims = manager.ClaimRegistry()
+        results = context.Queue()
+        processes = [context.Process(target=claim_all, args=(claims, i * 500, results))
+                     for i in range(3)]
+        for process in processes:
+            process.start()
+        kept_lists = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join(timeout=30)
+        assert_exclusive(kept_lists)
+
+        # A new cycle starts with nothing claimed
+        claims.reset()
+        assert claims.claim(IDS[:10]) == []
+    finally:
+        manager.shutdown()
+
+
+def test_claiming_index_treats_other_shards_claims_as_seen(tmp_path):
+    db_path = tmp_path / 'leads.db'
+    store = LeadStore(db_path)
+    store.create_tables()
+    store.close()
+
+    registry = ClaimRegistry()
+    first = ClaimingDedupIndex(db_path, registry)
+    second = ClaimingDedupIndex(db_path, registry)
+
+    assert first.seen_among(['p1', 'p2']) == set()
+    assert second.seen_among(['p2', 'p3']) == {'p2'}
+    assert second.claimed_elsewhere == 1
+    assert first.claimed_elsewhere == 0
@@ -0,0 +1,120 @@
+"""Schema migrations and upserts in storage.py"""
+
+import json
+
+import pytest
+
+import storage
+from storage import SCHEMA_MIGRATIONS, LeadStore, connect, migrate
+
+LATEST = SCHEMA_MIGRATIONS[-1][0]
+
+
+def user_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def index_names(conn, table: str):
+    return {row[1] for row in conn.execute(f'PRAGMA index_list({table})')}
+
+
+def lead_row(lead_id: str, **values):
+    row = {column: None for column in storage.LEAD_COLUMNS}
+    row.update(id=lead_id, post_id=lead_id, subreddit='reptiles', title='Gecko diet',
+               content='what should my gecko eat', score=0.8, created_at=1000.0)
+    row.update(values)
+    return row
+
+
+@pytest.fixture
+def v0_db(tmp_path, monkeypatch):
+    """A leads.db with the original tables and no migrations applied"""
+    db_path = tmp_path / 'leads.db'
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, 'migrate', lambda conn: 0)
+        store = LeadStore(db_path)
+        store.create_tables()
+        store.close()
+
+    conn = connect(db_path)
+    conn.execute("INSERT INTO posts (id, subreddit, title, body, entities) VALUES (?, ?, ?, ?, ?)",
+                 ('p1', 'cats', 'Kidney diet', 'senior cat with kidney disease',
+                  json.dumps({'age': '3 years', 'weight': 9.5, 'weight_unit': 'lbs',
+                              'conditions': ['kidney disease', 'vomiting'], 'diet_type': 'wet food'})))
+    conn.execute("INSERT INTO leads (id, post_id, subreddit, title, content, entities, reviewed) "
+                 "VALUES ('p1', 'p1', 'cats', 'Kidney diet', 'senior cat', ?, 1)",
+                 (json.dumps({'age': '1 month'}),))
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_migrate_from_v0(v0_db):
+    assert user_version(v0_db) == 0
+
+    assert migrate(v0_db) == LATEST
+    assert user_version(v0_db) == LATEST
+
+    post = v0_db.execute('SELECT age_value, age_unit, weight, weight_unit, conditions, diet_type, '
+                         'entities FROM posts WHERE id = ?', ('p1',)).fetchone()
+    assert post == (3, 'year', 9.5, 'lbs', 'kidney disease,vomiting', 'wet food', None)
+    lead = v0_db.execute("SELECT age_value, age_unit, reviewed FROM leads WHERE id = 'p1'").fetchone()
+    assert lead == (1, 'month', 1)
+
+    # Rows written before the FTS migration are indexed too
+    hits = v0_db.execute("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'kidney'").fetchall()
+    assert len(hits) == 1
+    assert 'idx_leads_subreddit_nocase' in index_names(v0_db, 'leads')
+    assert 'idx_leads_subreddit' not in index_names(v0_db, 'leads')
+
+
+def test_migrate_from_partial_version(v0_db, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, 'SCHEMA_MIGRATIONS', SCHEMA_MIGRATIONS[:3])
+        assert storage.migrate(v0_db) == 3
+    assert 'idx_leads_subreddit' in index_names(v0_db, 'leads')
+
+    assert migrate(v0_db) == LATEST
+    assert 'idx_leads_subreddit_nocase' in index_names(v0_db, 'leads')
+    assert v0_db.execute("SELECT conditions FROM posts WHERE id = 'p1'").fetchone()[0] == \
+        'kidney disease,vomiting'
+
+    # Running again is a no-op
+    assert migrate(v0_db) == LATEST
+
+
+def test_failed_migration_rolls_back(v0_db, monkeypatch):
+    migrate(v0_db)
+    broken = (LATEST + 1, 'broken', (
+        'CREATE TABLE half_done (id TEXT)',
+        'ALTER TABLE no_such_table ADD COLUMN x TEXT',
+    ))
+    monkeypatch.setattr(storage, 'SCHEMA_MIGRATIONS', SCHEMA_MIGRATIONS + (broken,))
+
+    with pytest.raises(Exception):
+        storage.migrate(v0_db)
+
+    assert user_version(v0_db) == LATEST
+    tables = {row[0] for row in v0_db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'half_done' not in tables
+
+
+def test_lead_upsert_keeps_reviewed_and_created_at(tmp_path):
+    store = LeadStore(tmp_path / 'leads.db')
+    store.create_tables()
+    try:
+        store.add_lead(lead_row('l1'))
+        store.flush()
+        store.conn.execute("UPDATE leads SET reviewed = 1 WHERE id = 'l1'")
+        store.conn.commit()
+
+        store.add_lead(lead_row('l1', score=0.95, created_at=2000.0, content='rescored'))
+        store.flush()
+
+        row = store.conn.execute(
+            "SELECT score, content, created_at, reviewed FROM leads WHERE id = 'l1'").fetchone()
+        assert row == (0.95, 'rescored', 1000.0, 1)
+        hits = store.conn.execute("SELECT rowid FROM leads_fts WHERE leads_fts MATCH 'rescored'")
+        assert len(hits.fetchall()) == 1
+    finally:
+        store.close()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Single-pass text analysis for Reddit Lead Radar
+An AnalyzedText is built once per post/comment and handed to every scorer, so
+the text is lowercased, tokenized and scanned by the matcher only once.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Union
+
+from matcher import CompiledMatcher, TextHits
+
+
+@dataclass
+class AnalyzedText:
+    """Normalized views of one item's text plus memoized per-item results"""
+    text: str
+    lower: str
+    tokens: List[str]
+    token_set: FrozenSet[str]
+    hits: TextHits
+    memo: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+
+def analyze_text(text: str, matcher: CompiledMatcher) -> AnalyzedText:
+    """Lowercase, tokenize and keyword-scan a text once"""
+    text = text or ''
+    lower = text.lower()
+    tokens = lower.split()
+    return AnalyzedText(
+        text=text,
+        lower=lower,
+        tokens=tokens,
+        token_set=frozenset(tokens),
+        hits=matcher.scan(lower)
+    )
+
+
+TextInput = Union[str, AnalyzedText]
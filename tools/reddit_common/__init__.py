@@ -0,0 +1,11 @@
+"""
+Shared Reddit helpers for the Paws & Plates monitoring tools
+(reddit-lead-radar, pet-help-monitor and the outreach monitor bots).
+"""
+
+from .conditional import ValidatorCache, conditional_get
+from .http_client import create_session
+from .ratelimit import RateLimiter
+from .scheduler import AdaptiveScheduler
+
+__all__ = ['AdaptiveScheduler', 'RateLimiter', 'ValidatorCache', 'conditional_get', 'create_session']
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Conditional GETs for polled feeds
+Remembers each URL's ETag, Last-Modified and a fingerprint of the last body, sends
+If-None-Match / If-Modified-Since on the next poll, and tells the caller when
+nothing changed (a 304, or a 200 with the same content) so it can skip parsing.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+# Atom feeds carry a feed-level <updated> stamp ahead of the entries that can move
+# without any entry changing; it is left out of the body fingerprint
+FEED_UPDATED = re.compile(rb'<updated>[^<]*</updated>')
+
+
+def body_fingerprint(content: bytes) -> str:
+    """Short stable hash of a response body (ignoring the feed-level <updated> stamp)"""
+    content = FEED_UPDATED.sub(b'', content or b'', count=1)
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class ValidatorCache:
+    """Per-URL HTTP validators, optionally persisted to a JSON file between runs"""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.not_modified = 0      # 304 responses
+        self.unchanged_bodies = 0  # 200 responses identical to the last poll
+        self.changed = 0
+
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+            except Exception as e:
+                print(f"Ignoring unreadable validator cache {self.path}: {e}")
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for a URL (empty on the first poll)"""
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url: str, response: Any) -> bool:
+        """Record a response's validators; True if it is a 304 or repeats the last body"""
+        if response.status_code == 304:
+            with self._lock:
+                self.not_modified += 1
+            return True
+
+        fingerprint = body_fingerprint(response.content)
+        entry = {'body_hash': fingerprint}
+        if response.headers.get('ETag'):
+            entry['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            entry['last_modified'] = response.headers['Last-Modified']
+
+        with self._lock:
+            previous = self._entries.get(url)
+            self._entries[url] = entry
+            if previous != entry:
+                self._dirty = True
+            if previous and previous.get('body_hash') == fingerprint:
+                self.unchanged_bodies += 1
+                return True
+            self.changed += 1
+            return False
+
+    def forget(self, url: str):
+        """Drop a URL's validators so the next poll is unconditional (e.g. after a parse error)"""
+        with self._lock:
+            if self._entries.pop(url, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Write the validators to disk if anything changed (atomic replace)"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self._entries)
+            self._dirty = False
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Failed to save validator cache {self.path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def conditional_get(get: Callable[..., Any], url: str, cache: ValidatorCache,
+                    headers: Optional[Dict[str, str]] = None, **kwargs) -> Optional[Any]:
+    """GET a URL conditionally; returns None when it hasn't changed since the last poll.
+
+    ``get`` is ``session.get`` or a wrapper with the same signature (e.g. one that
+    goes through a RateLimiter). Error statuses raise via ``raise_for_status``.
+    """
+    request_headers = dict(headers or {})
+    request_headers.update(cache.request_headers(url))
+    response = get(url, headers=request_headers, **kwargs)
+    if response.status_code != 304:
+        response.raise_for_status()
+    if cache.is_unchanged(url, response):
+        return None
+    return response
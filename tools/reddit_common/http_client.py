@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP client for the Reddit tools
+One requests.Session per client keeps TLS connections alive between calls,
+negotiates gzip and retries transient connection errors and 5xx responses.
+429s are left to RateLimiter, which knows Reddit's quota headers.
+"""
+
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_USER_AGENT = 'PawsAndPlatesTools/1.0'
+
+# Statuses retried by the adapter (429 is deliberately absent, see RateLimiter)
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def create_session(user_agent: Optional[str] = None, pool_connections: int = 10,
+                   pool_maxsize: int = 10, retries: int = 3,
+                   backoff_factor: float = 0.5) -> requests.Session:
+    """Build a keep-alive Session with sized connection pools and a retry policy.
+
+    ``pool_maxsize`` should be at least the number of threads sharing the session,
+    otherwise extra connections are opened and thrown away instead of reused.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': user_agent or DEFAULT_USER_AGENT,
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return session
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Token-bucket rate limiter for Reddit API clients
+Paced by the X-Ratelimit-Remaining / X-Ratelimit-Reset headers Reddit sends on
+OAuth responses, with jittered backoff when a request still comes back 429.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Mapping, Optional
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every request a client makes.
+
+    Until Reddit reports its quota the bucket refills at ``requests_per_minute``.
+    Once X-Ratelimit headers arrive, the refill rate becomes "requests left in this
+    window / seconds until reset", so the whole quota gets spent evenly instead of
+    sleeping a fixed amount between calls.
+
+    When several processes share one client's quota, each gets a limiter with
+    ``share`` set to its fraction; rates and reported quotas are scaled by it.
+    ``set_share`` changes the fraction later, e.g. when another limiter takes a
+    fixed slice of the same quota.
+    """
+
+    def __init__(self, requests_per_minute: float = 60, burst: int = 5,
+                 max_retries: int = 4, backoff_base: float = 2.0, backoff_cap: float = 120.0,
+                 share: float = 1.0):
+        self.burst = burst
+        self.share = min(max(share, 0.01), 1.0)
+        self.default_rate = max(requests_per_minute, 1) / 60.0 * self.share
+        self.rate = self.default_rate
+        self.capacity = max(1, round(burst * self.share))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._window_reset_at = 0.0
+        self._cond = threading.Condition()
+
+        # Running totals, useful for cycle reports
+        self.requests_sent = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        # Optional hook called with each wait, on the waiting thread (for per-source timings)
+        self.on_wait: Optional[Callable[[float], None]] = None
+
+    def _refill(self, now: float):
+        """Top up tokens for the time elapsed (caller holds the lock)"""
+        if self._window_reset_at and now >= self._window_reset_at:
+            # Reddit's window rolled over: back to the configured pace until told otherwise
+            self.rate = self.default_rate
+            self._window_reset_at = 0.0
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_share(self, share: float):
+        """Re-scale the configured and currently reported pace to a new fraction of the quota"""
+        share = min(max(share, 0.01), 1.0)
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            factor = share / self.share
+            self.share = share
+            self.default_rate *= factor
+            self.rate *= factor
+            self.capacity = max(1, round(self.burst * share))
+            self._tokens = min(self._tokens * factor, self.capacity)
+            self._cond.notify_all()
+
+    def acquire(self) -> float:
+        """Block until one request may be sent; returns seconds spent waiting"""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                else:
+                    delay = (1 - self._tokens) / self.rate
+                self._cond.wait(delay)
+            self.requests_sent += 1
+            waited = time.monotonic() - start
+            self.wait_seconds += waited
+
+        if self.on_wait:
+            self.on_wait(waited)
+        return waited
+
+    def update(self, headers: Optional[Mapping[str, str]]):
+        """Re-pace the bucket from Reddit's rate-limit response headers"""
+        if not headers:
+            return
+        remaining = headers.get('X-Ratelimit-Remaining')
+        reset = headers.get('X-Ratelimit-Reset')
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = float(remaining) * self.share
+            reset = max(float(reset), 1.0)
+        except (TypeError, ValueError):
+            return
+
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining < 1:
+                # Quota exhausted: nothing goes out until the window resets
+                self._tokens = 0.0
+                self._blocked_until = max(self._blocked_until, now + reset)
+            else:
+                self.rate = remaining / reset
+                self._tokens = min(self._tokens, remaining)
+            self._window_reset_at = now + reset
+            self._cond.notify_all()
+
+    def backoff(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Pause every caller after a 429; returns the chosen delay in seconds"""
+        retry_after = None
+        if headers:
+            for name in ('Retry-After', 'X-Ratelimit-Reset'):
+                try:
+                    retry_after = float(headers[name])
+                    break
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, 1)
+        else:
+            ceiling = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+            delay = random.uniform(ceiling / 2, ceiling)
+
+        with self._cond:
+            self.throttled += 1
+            self._tokens = 0.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        return delay
+
+    def request(self, send: Callable[..., Any], url: str, **kwargs) -> Any:
+        """Send a request through the limiter, retrying 429s with backoff.
+
+        ``send`` is ``requests.get``, ``session.post`` or anything with the same
+        signature; the final response is returned whatever its status.
+        """
+        response = None
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            response = send(url, **kwargs)
+            headers = getattr(response, 'headers', None)
+            self.update(headers)
+            if getattr(response, 'status_code', None) != 429:
+                return response
+            if attempt < self.max_retries:
+                delay = self.backoff(attempt, headers)
+                print(f"Rate limited by {url}, retrying in {delay:.1f}s")
+        return response
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Adaptive polling scheduler for the Reddit monitors
+Keeps a next-due time per source (usually a subreddit) in a priority queue and
+re-derives each source's interval from its observed post arrival rate and lead
+yield. A global poll budget is split across sources by the square root of their
+value, so busy, high-yield subreddits are polled often and quiet ones rarely,
+always within [min_interval, max_interval].
+"""
+
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+
+@dataclass
+class SourceState:
+    """What the scheduler knows about one polled source"""
+    name: str
+    interval: float
+    next_due: float = 0.0
+    fixed: bool = False
+    arrival_rate: Optional[float] = None  # EWMA of new posts per second
+    lead_yield: float = 0.0               # EWMA of leads per new post
+    last_polled: Optional[float] = None
+    watermark: float = 0.0                # newest created_utc seen so far
+    polls: int = 0
+
+
+class AdaptiveScheduler:
+    """Priority-queue poll scheduler with per-source intervals learned from arrivals and leads.
+
+    ``poll_budget_per_hour`` bounds the total polls of adaptive sources. Each source's
+    value is ``arrival_rate * (yield_floor + lead_yield)``; its share of the budget is
+    proportional to ``sqrt(value)``, which minimizes the average age of unseen posts
+    for a fixed number of polls. Fixed sources keep their own interval and sit
+    outside the budget.
+    """
+
+    def __init__(self, poll_budget_per_hour: float, min_interval: float = 120,
+                 max_interval: float = 3600, initial_interval: float = 600,
+                 smoothing: float = 0.3, yield_floor: float = 0.05,
+                 state_path: Optional[Union[str, Path]] = None):
+        self.poll_budget_per_hour = max(poll_budget_per_hour, 1.0)
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.initial_interval = min(max(initial_interval, self.min_interval), self.max_interval)
+        self.smoothing = smoothing
+        self.yield_floor = yield_floor
+        self.state_path = Path(state_path) if state_path else None
+
+        self.sources: Dict[str, SourceState] = {}
+        self._heap: List[tuple] = []
+        self._lock = threading.Lock()
+        self._saved: Dict[str, Dict] = self._load_state()
+
+    def _load_state(self) -> Dict[str, Dict]:
+        if not self.state_path or not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable scheduler state {self.state_path}: {e}")
+            return {}
+
+    def _push(self, source: SourceState):
+        """Queue a source at its next_due (stale heap entries are skipped on pop)"""
+        heapq.heappush(self._heap, (source.next_due, source.name))
+
+    def add(self, name: str, fixed_interval: Optional[float] = None, now: Optional[float] = None):
+        """Register a source; new ones are due immediately, known ones keep their schedule"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            if name in self.sources:
+                source = self.sources[name]
+                if fixed_interval is not None:
+                    source.fixed, source.interval = True, fixed_interval
+                return
+
+            source = SourceState(name=name, interval=fixed_interval or self.initial_interval,
+                                 next_due=now, fixed=fixed_interval is not None)
+            saved = self._saved.get(name)
+            if saved and not source.fixed:
+                # Learned rates survive restarts; the first poll still happens right away
+                source.arrival_rate = saved.get('arrival_rate')
+                source.lead_yield = saved.get('lead_yield', 0.0)
+                source.last_polled = saved.get('last_polled')
+                source.watermark = saved.get('watermark', 0.0)
+                source.polls = saved.get('polls', 0)
+            self.sources[name] = source
+            self._push(source)
+            self._rebalance()
+
+    def sync(self, names: Iterable[str], now: Optional[float] = None):
+        """Make the adaptive source set match names (e.g. after a config reload)"""
+        names = list(dict.fromkeys(names))
+        for name in names:
+            self.add(name, now=now)
+        keep = set(names)
+        with self._lock:
+            for name in [n for n, s in self.sources.items() if not s.fixed and n not in keep]:
+                del self.sources[name]
+            self._rebalance()
+
+    def due(self, now: Optional[float] = None, horizon: float = 0.0) -> List[str]:
+        """Pop every source due within ``horizon`` seconds, most overdue first.
+
+        Each popped source is provisionally rescheduled one interval out, so a poll
+        that fails before record() is called is retried rather than lost. A horizon
+        batches sources that fall due close together into one poll round.
+        """
+        now = now if now is not None else time.time()
+        names = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now + horizon:
+                next_due, name = heapq.heappop(self._heap)
+                source = self.sources.get(name)
+                if source is None or source.next_due != next_due or name in names:
+                    continue
+                names.append(name)
+                source.next_due = now + source.interval
+                self._push(source)
+        return names
+
+    def seconds_until_due(self, now: Optional[float] = None) -> float:
+        """Seconds until the next source is due (0 if one already is)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            while self._heap:
+                next_due, name = self._heap[0]
+                source = self.sources.get(name)
+                if source is not None and source.next_due == next_due:
+                    return max(0.0, next_due - now)
+                heapq.heappop(self._heap)
+        return self.max_interval
+
+    def record(self, name: str, created_times: Iterable[float], leads: int = 0,
+               now: Optional[float] = None):
+        """Feed back one poll: creation times of the posts it returned and leads found"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            source = self.sources.get(name)
+            if source is None:
+                return
+            created = sorted(t for t in created_times if t)
+            new = [t for t in created if t > source.watermark]
+            if created:
+                source.watermark = max(source.watermark, created[-1])
+
+            if not source.fixed:
+                sample = None
+                if source.last_polled is not None and now > source.last_polled:
+                    sample = len(new) / (now - source.last_polled)
+                elif len(new) >= 2 and now > new[0]:
+                    # First poll: estimate from the span the returned listing covers
+                    sample = len(new) / (now - new[0])
+                if sample is not None:
+                    source.arrival_rate = (sample if source.arrival_rate is None else
+                                           self.smoothing * sample +
+                                           (1 - self.smoothing) * source.arrival_rate)
+                if new:
+                    leads_per_post = min(1.0, leads / len(new))
+                    source.lead_yield = (leads_per_post if source.polls == 0 else
+                                         self.smoothing * leads_per_post +
+                                         (1 - self.smoothing) * source.lead_yield)
+
+            source.last_polled = now
+            source.polls += 1
+            self._rebalance()
+            source.next_due = now + source.interval
+            self._push(source)
+
+    def _rebalance(self):
+        """Split the poll budget across adaptive sources (caller holds the lock)"""
+        adaptive = [s for s in self.sources.values() if not s.fixed]
+        learned = [s for s in adaptive if s.arrival_rate is not None]
+        if not learned:
+            return
+
+        # Sources still being learned poll at the initial interval out of the same budget
+        budget = self.poll_budget_per_hour / 3600.0
+        budget -= (len(adaptive) - len(learned)) / self.initial_interval
+        budget = max(budget, len(learned) / self.max_interval)
+
+        weights = {s.name: math.sqrt(max(s.arrival_rate, 1e-9) * (self.yield_floor + s.lead_yield))
+                   for s in learned}
+        total_weight = sum(weights.values())
+        intervals = {}
+        for source in learned:
+            polls_per_second = budget * weights[source.name] / total_weight
+            intervals[source.name] = min(max(1.0 / polls_per_second, self.min_interval),
+                                         self.max_interval)
+
+        # Sources pinned at min_interval can push the total over budget: stretch everyone
+        total_rate = sum(1.0 / interval for interval in intervals.values())
+        if total_rate > budget:
+            stretch = total_rate / budget
+            intervals = {name: min(interval * stretch, self.max_interval)
+                         for name, interval in intervals.items()}
+
+        for source in learned:
+            source.interval = intervals[source.name]
+
+    def polls_per_hour(self) -> float:
+        """Planned polls per hour across all sources at the current intervals"""
+        return sum(3600.0 / s.interval for s in self.sources.values())
+
+    def summary(self, limit: int = 5) -> List[str]:
+        """Human-readable lines for the fastest-polled adaptive sources"""
+        adaptive = sorted((s for s in self.sources.values() if not s.fixed),
+                          key=lambda s: s.interval)
+        lines = []
+        for source in adaptive[:limit]:
+            rate = (f"{source.arrival_rate * 3600:.1f} posts/h"
+                    if source.arrival_rate is not None else "learning")
+            lines.append(f"{source.name}: every {source.interval / 60:.0f} min "
+                         f"({rate}, {source.lead_yield:.0%} lead yield)")
+        return lines
+
+    def save(self):
+        """Persist learned rates so a restart doesn't start from scratch (atomic replace)"""
+        if not self.state_path:
+            return
+        with self._lock:
+            data = {name: {k: v for k, v in asdict(s).items()
+                           if k not in ('name', 'next_due', 'fixed', 'interval')}
+                    for name, s in self.sources.items() if not s.fixed}
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"Failed to save scheduler state {self.state_path}: {e}")